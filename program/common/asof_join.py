@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# --- As-of joins between per-ticker time series ---
+# asof_join gives every row of one table the newest row of another for the same ticker
+# at or before its date (or the next one at or after it), like pd.merge_asof, but
+# without having to sort the left table first. Both tables are turned into a single
+# sorted array of (ticker, date) keys and every left row finds its match with one binary
+# search, so memory stays linear in the two tables' sizes.
+# roll_to_sessions moves rows dated on non-trading days (weekends, holidays) to the
+# ticker's next trading session, so they aren't lost in an exact-date merge.
+
+def _keys(left_by, left_on, right_by, right_on):
+    """
+    Numbers (ticker, date) pairs of both sides so that comparing numbers compares
+    tickers first and dates second. Tickers and dates are replaced by their ranks.
+    """
+    codes, _ = pd.factorize(np.concatenate([left_by, right_by]))
+    _, date_ranks = np.unique(np.concatenate([left_on, right_on]), return_inverse=True)
+    keys = codes.astype(np.int64) * (int(date_ranks.max(initial=0)) + 1) + date_ranks
+    return keys[:len(left_by)], keys[len(left_by):], codes[:len(left_by)], codes[len(left_by):]
+
+def asof_match(left, right, on='date', by='ticker', tolerance=None, direction='backward', allow_exact_matches=True):
+    """
+    Returns, for every row of left (in its order), the position in right of its match:
+    the right row with the same by value and the latest on value at or before the left
+    row's (direction='backward') or the earliest at or after it ('forward'), at most
+    tolerance apart (a Timedelta). -1 where there is none. Of right rows with the same
+    by and on values, the last one matches backward and the first one forward.
+    """
+    if direction not in ('backward', 'forward'):
+        raise ValueError(f"direction must be 'backward' or 'forward', not {direction!r}")
+
+    left_on = pd.to_datetime(left[on]).to_numpy(dtype='datetime64[ns]')
+    right_on = pd.to_datetime(right[on]).to_numpy(dtype='datetime64[ns]')
+    left_keys, right_keys, left_codes, right_codes = _keys(
+        left[by].astype(str).to_numpy(), left_on, right[by].astype(str).to_numpy(), right_on)
+
+    if len(right_keys) == 0:
+        return np.full(len(left_keys), -1)
+
+    # Stable, so equal keys keep right's row order
+    order = np.argsort(right_keys, kind='stable')
+    sorted_keys = right_keys[order]
+
+    if direction == 'backward':
+        pos = np.searchsorted(sorted_keys, left_keys, side='right' if allow_exact_matches else 'left') - 1
+    else:
+        pos = np.searchsorted(sorted_keys, left_keys, side='left' if allow_exact_matches else 'right')
+    found = (pos >= 0) & (pos < len(order))
+    match = order[np.clip(pos, 0, len(order) - 1)]
+
+    # The nearest key may belong to a neighbouring ticker
+    found &= right_codes[match] == left_codes
+    found &= ~np.isnat(left_on) & ~np.isnat(right_on[match])
+    if tolerance is not None:
+        found &= np.abs(left_on - right_on[match]) <= pd.Timedelta(tolerance).to_timedelta64()
+    return np.where(found, match, -1)
+
+def asof_join(left, right, on='date', by='ticker', tolerance=None, direction='backward', allow_exact_matches=True, suffixes=('', '_right')):
+    """
+    Returns left (same rows, order and index) with right's other columns added from
+    each row's as-of match (see asof_match). Rows without a match get NaN.
+    """
+    match = asof_match(left, right, on, by, tolerance, direction, allow_exact_matches)
+    found = match >= 0
+
+    result = left.copy()
+    for column in right.columns:
+        if column in (on, by):
+            continue
+        name = column
+        if column in left.columns:
+            name = f"{column}{suffixes[1]}"
+            if suffixes[0]:
+                result.rename(columns={column: f"{column}{suffixes[0]}"}, inplace=True)
+        if len(right):
+            result[name] = pd.Series(right[column].to_numpy()[np.maximum(match, 0)], index=left.index).where(found)
+        else:
+            result[name] = np.nan
+    return result
+
+def roll_to_sessions(df, sessions, on='date', by='ticker', max_days=4, agg='last'):
+    """
+    Moves each row of df to its ticker's first session (a by/on row of sessions, e.g. the
+    price bars) on or after the row's date, at most max_days later, so weekend rows count
+    towards Monday. Rows moved to the same session are combined with agg, as in
+    groupby().agg: 'last' keeps the newest, or a dict per column. Rows without a
+    session that close are dropped.
+    """
+    sessions = sessions[[by, on]].drop_duplicates()
+    # Oldest first, so 'last' is the newest row
+    df = df.sort_values([by, on], kind='mergesort')
+    match = asof_match(df, sessions, on, by, tolerance=pd.Timedelta(days=max_days), direction='forward')
+
+    rolled = df[match >= 0].copy()
+    rolled[on] = sessions[on].to_numpy()[match[match >= 0]]
+    return rolled.groupby([by, on], as_index=False, sort=False).agg(agg)
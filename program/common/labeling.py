@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# --- Target labels and inputs for the models ---
+# A day's class is the number of thresholds its next-day return exceeds in size, with
+# the return's sign: with THRESHOLDS, +0.07 passes Small and Mid and is class 2, -0.03
+# is class -1, and anything within +/-0.025 (or missing) is class 0.
+# FEATURE_COLS are the model inputs, in the order the models are trained with.
+
+THRESHOLDS = [
+    ("Small", 0.025),
+    ("Mid", 0.05),
+    ("Great", 0.1),
+    ("Huge", 0.2),
+    ("Tremendous", 0.4),
+    ("Absurd", 0.8),
+]
+
+PRICE_FEATURES = [
+    'change_day', 'change_week', 'change_month', 'change_3mo',
+    'change_6mo', 'change_9mo', 'change_1yr',
+]
+SENTIMENT_FEATURES = ['mean_sentiment', 'comment_count', 'sentiment_change', 'volume_change', 'svc']
+INSIDER_FEATURES = [
+    'Buyer Change Day', 'Buyer Change Week', 'Buyer Change Month', 'Buyer Change TriMonth',
+    'Trade Direction Day', 'Trade Direction Week', 'Trade Direction Month', 'Trade Direction TriMonth',
+]
+FEATURE_COLS = PRICE_FEATURES + SENTIMENT_FEATURES + INSIDER_FEATURES
+
+def label_targets(pct_change, thresholds=THRESHOLDS):
+    """
+    Returns the signed class of every return in pct_change (a Series, keeping its index,
+    or an array) for a [(name, threshold), ...] table. Returns exactly on a threshold
+    don't pass it.
+    """
+    values = np.asarray(pct_change, dtype=float)
+    bounds = np.sort([threshold for _, threshold in thresholds])
+    magnitude = np.abs(values)
+
+    # side='left' counts the thresholds strictly below each magnitude
+    passed = np.searchsorted(bounds, magnitude, side='left')
+    labels = np.where(values < 0, -passed, passed)
+    labels[np.isnan(values)] = 0
+
+    if isinstance(pct_change, pd.Series):
+        return pd.Series(labels, index=pct_change.index, name='target')
+    return labels
@@ -0,0 +1,139 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common import storage
+
+# --- Price features shared by the merge scripts ---
+# Usage: python3 price_features.py [--full]
+# The change_* lookback returns and next_day_pct_change of every ticker and day are kept
+# in a dataset next to the prices (historical_prices/price_features/ticker=<ticker>.parquet)
+# instead of being recomputed over the whole history by every script. update_features()
+# only computes the days added to the prices since the last update, from the last WINDOW
+# bars before them; nothing else depends on a new bar. Returns don't change when
+# download_price_history.py rescales a ticker's older prices (dividends, splits), so
+# those stay valid too. --full rebuilds every ticker.
+
+PRICES_DIR = os.path.join(SCRIPT_DIR, '..', 'historical_prices', 'historical_prices')
+FEATURES_DIR = os.path.join(SCRIPT_DIR, '..', 'historical_prices', 'price_features')
+
+PERIODS = {
+    'change_day': 1, 'change_week': 5, 'change_month': 21,
+    'change_3mo': 63, 'change_6mo': 126, 'change_9mo': 189, 'change_1yr': 252
+}
+FEATURE_COLUMNS = list(PERIODS) + ['next_day_pct_change']
+
+# Bars before a day that its features depend on
+WINDOW = max(PERIODS.values())
+
+def compute_features(bars):
+    """
+    Returns FEATURE_COLUMNS for bars sorted by ticker and date (with 'ticker' and
+    'Adj Close'), on bars' index. Same values as groupby('ticker') pct_change:
+    NaN until a ticker has enough earlier bars.
+    """
+    prices = bars['Adj Close'].to_numpy(dtype=float)
+    # How many earlier bars of the same ticker each row has
+    position = bars.groupby('ticker', sort=False).cumcount().to_numpy()
+
+    features = dict()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, period in PERIODS.items():
+            change = np.full(len(prices), np.nan)
+            change[period:] = prices[period:] / prices[:-period] - 1
+            change[position < period] = np.nan
+            features[name] = change
+
+        # The previous bar over this one, as pct_change(periods=-1).shift(1) gave
+        next_day = np.full(len(prices), np.nan)
+        next_day[1:] = prices[:-1] / prices[1:] - 1
+        next_day[position < 1] = np.nan
+        features['next_day_pct_change'] = next_day
+
+    return pd.DataFrame(features, index=bars.index)
+
+def ticker_features(ticker, bars, start=0):
+    """Features of one ticker's bars (sorted by date) from row start on, with ticker and date."""
+    first = max(start - WINDOW, 0)
+    window = bars.iloc[first:].reset_index(drop=True)
+    window['ticker'] = ticker
+    features = compute_features(window).iloc[start - first:].reset_index(drop=True)
+    features.insert(0, 'date', window['date'].iloc[start - first:].to_numpy())
+    features.insert(0, 'ticker', ticker)
+    return features
+
+def update_features(prices_dir=PRICES_DIR, features_dir=FEATURES_DIR, full=False):
+    """
+    Brings the feature store up to date with the stored prices. Returns (tickers
+    updated, feature rows added).
+    """
+    price_last = storage.partition_max(prices_dir, 'Ticker', 'date')
+    if full:
+        # Also drops tickers that are no longer in the prices
+        for file in storage.partition_files(features_dir):
+            os.remove(file)
+    feature_last = storage.partition_max(features_dir, 'ticker', 'date')
+
+    updated = 0
+    new_rows = 0
+    for ticker, last in sorted(price_last.items()):
+        if ticker in feature_last and pd.Timestamp(feature_last[ticker]) >= pd.Timestamp(last):
+            continue
+
+        bars = storage.read_table(prices_dir, columns=['date', 'Adj Close'], partitions={'Ticker': ticker})
+        bars = bars.sort_values('date').reset_index(drop=True)
+
+        start = 0
+        if ticker in feature_last:
+            stored = storage.read_table(features_dir, partitions={'ticker': ticker})
+            start = int((bars['date'] <= pd.Timestamp(feature_last[ticker])).sum())
+            # The stored rows must be exactly the bars up to their last day, or the
+            # ticker's prices were replaced (e.g. downloaded again) and it is rebuilt
+            if start != len(stored):
+                start = 0
+
+        features = ticker_features(ticker, bars, start)
+        if start:
+            features = pd.concat([stored, features], ignore_index=True)
+        storage.write_partition(features, features_dir, 'ticker', ticker)
+        updated += 1
+        new_rows += len(bars) - start
+
+    return updated, new_rows
+
+def read_features(features_dir=FEATURES_DIR, tickers=None):
+    """Reads the stored features (of the given tickers only, if any)."""
+    return storage.read_table(features_dir, partitions={'ticker': tickers} if tickers is not None else None)
+
+def add_features(prices_df, features_dir=FEATURES_DIR):
+    """
+    Returns prices_df (one row per ticker and date) with FEATURE_COLUMNS added from the
+    store, after updating it. Prices that only exist as the old CSV file have no store,
+    so their features are computed in memory.
+    """
+    prices_df = prices_df.sort_values(by=['ticker', 'date']).reset_index(drop=True)
+    prices_df = prices_df.drop(columns=[c for c in FEATURE_COLUMNS if c in prices_df.columns])
+
+    if not storage.dataset_exists(PRICES_DIR):
+        return pd.concat([prices_df, compute_features(prices_df)], axis=1)
+
+    updated, new_rows = update_features(features_dir=features_dir)
+    if updated:
+        print(f"Price features: {new_rows} new rows for {updated} tickers")
+    prices_df['ticker'] = prices_df['ticker'].astype(str)
+    try:
+        features = read_features(features_dir, tickers=list(prices_df['ticker'].unique()))
+    except FileNotFoundError:
+        features = pd.DataFrame(columns=['ticker', 'date'] + FEATURE_COLUMNS)
+    features['ticker'] = features['ticker'].astype(str)
+    return prices_df.merge(features, on=['ticker', 'date'], how='left')
+
+if __name__ == "__main__":
+    if not storage.dataset_exists(PRICES_DIR):
+        print(f"Error: no prices in '{PRICES_DIR}'. Please run download_price_history.py first.")
+        exit()
+    updated, new_rows = update_features(full='--full' in sys.argv)
+    print(f"✅ {new_rows} feature rows added for {updated} tickers in: {FEATURES_DIR}")
@@ -0,0 +1,52 @@
+import random
+import threading
+import time
+
+# --- Rate limiting for the scrapers and downloaders ---
+# A token bucket shared by all threads making requests to one API, and the backoff
+# used when a request fails or the API says to slow down (HTTP 429).
+
+class RateLimited(Exception):
+    """Raised by a fetch when the API answered 429; retry_after is its Retry-After in seconds, if given."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Allows rate requests per second on average and bursts of up to capacity.
+    acquire() blocks the calling thread until enough tokens are available.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self.tokens = self.capacity
+        # Tokens are refilled from this time on (later than now while paused)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        # The bucket never holds more than capacity, so a larger request would wait forever
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot take {tokens} tokens from a bucket of capacity {self.capacity}")
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now > self.updated:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                if now >= self.updated and self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = max(0, self.updated - now) + (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stops handing out tokens for seconds, e.g. after the API answered 429."""
+        with self.lock:
+            self.updated = max(self.updated, time.monotonic() + seconds)
+            self.tokens = 0
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Exponential backoff with full jitter: a random delay up to base * 2^(attempt - 1), at most cap."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+# --- Time-window sums over per-ticker rows ---
+# window_sums gives the same values as
+#     df.set_index(on).groupby(by)[column].rolling(window).sum()
+# but for every column and window in one pass. Each window sum is the difference of two
+# running totals. The row where a window starts is found for every row at once with a
+# binary search over (ticker, time) keys.
+
+def _window_starts(codes, times, windows):
+    """
+    For rows sorted by code and time, returns {window: first row of the same code whose
+    time is after the row's time minus window}. The pairs (code, time) and the
+    window starts (code, time - window) are numbered by rank in one array, so
+    comparing the numbers compares codes first and times second.
+    """
+    shifted = [times - pd.Timedelta(w).to_timedelta64() for w in windows]
+    _, ranks = np.unique(np.concatenate([times] + shifted), return_inverse=True)
+    span = int(ranks.max(initial=0)) + 1
+    keys = codes * span + ranks[:len(times)]
+
+    starts = dict()
+    for i, window in enumerate(windows):
+        window_keys = codes * span + ranks[(i + 1) * len(times):(i + 2) * len(times)]
+        # side='right': rows exactly one window earlier are outside, as with rolling()
+        starts[window] = np.searchsorted(keys, window_keys, side='right')
+    return starts
+
+def window_sums(df, by, on, columns, windows):
+    """
+    Returns {(window, column): array of window sums} for df sorted by by and on. windows
+    are offsets like '7d'. A row's window holds the rows of its by value from one window
+    before it (excluded) up to the row itself. Rows later on the same day aren't
+    included, as with rolling(). Missing values are skipped. A window with nothing but
+    missing values gives NaN.
+    """
+    codes = pd.factorize(df[by])[0].astype(np.int64)
+    times = pd.to_datetime(df[on]).to_numpy(dtype='datetime64[ns]')
+    starts = _window_starts(codes, times, windows)
+
+    # First row of each row's ticker
+    row = np.arange(len(codes))
+    first = np.ones(len(codes), dtype=bool)
+    first[1:] = codes[1:] != codes[:-1]
+    group_first = np.maximum.accumulate(np.where(first, row, 0))
+
+    sums = dict()
+    for column in columns:
+        values = df[column].to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        # Running totals restart at each ticker, so they stay close to the window sums
+        totals = pd.Series(np.where(present, values, 0.0)).groupby(codes).cumsum().to_numpy()
+        counts = np.cumsum(present)
+        for window, start in starts.items():
+            before = start - 1
+            has_before = start > group_first
+            window_sum = totals - np.where(has_before, totals[np.maximum(before, 0)], 0.0)
+            window_count = counts - np.where(start > 0, counts[np.maximum(before, 0)], 0)
+            sums[(window, column)] = np.where(window_count > 0, window_sum, np.nan)
+    return sums
@@ -0,0 +1,259 @@
+import glob
+import json
+import os
+import shutil
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# --- Columnar storage for the pipeline's intermediate datasets ---
+# A dataset is a directory of Parquet files. Unpartitioned datasets hold a single
+# "data.parquet"; partitioned ones hold one "<column>=<value>.parquet" file per
+# partition (for example date=2025-10-13.parquet or ticker=AAPL.parquet).
+# Column types (dates included) are stored in the files, so nothing is re-parsed on read.
+# Reads can project columns, prune partitions by name, and push row filters down
+# to the Parquet row-group statistics.
+
+COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 100_000
+
+# Also write the old CSV files next to the datasets (set SAS_EXPORT_CSV=1 to turn on)
+EXPORT_CSV = os.environ.get("SAS_EXPORT_CSV") == "1"
+
+def partition_value(value):
+    """Formats a partition value for a file name (dates as YYYY-MM-DD)."""
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+def write_parquet_atomic(df, path):
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, index=False, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+def write_json_atomic(obj, path):
+    """Writes obj as JSON to a temp file and moves it over path, so readers never see half a file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as fh:
+        json.dump(obj, fh)
+    os.replace(tmp_path, path)
+
+def export_csv(df, csv_path):
+    df.to_csv(csv_path, index=False)
+    print(f"Exported CSV copy to: {csv_path}")
+
+def link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def write_table(df, path, partition_by=None, csv_path=None):
+    """
+    Writes df as the whole dataset at path, replacing what was there.
+    With partition_by, rows are split into one file per value of that column.
+    The new files are written to "<path>.tmp" and the directories are swapped
+    afterwards, so a failure while writing leaves the old dataset untouched. Other
+    files in the directory (e.g. exported CSVs) are kept.
+    """
+    path = os.path.normpath(path)
+    tmp_path = f"{path}.tmp"
+    old_path = f"{path}.old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    if partition_by is None:
+        df.to_parquet(os.path.join(tmp_path, "data.parquet"), index=False, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    else:
+        for value, part in df.groupby(partition_by, sort=False, dropna=False):
+            part.to_parquet(os.path.join(tmp_path, f"{partition_by}={partition_value(value)}.parquet"),
+                            index=False, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+
+    if os.path.isdir(path):
+        for name in os.listdir(path):
+            if name.endswith((".parquet", ".tmp")):
+                continue
+            src = os.path.join(path, name)
+            if os.path.isdir(src):
+                shutil.copytree(src, os.path.join(tmp_path, name), copy_function=link_or_copy)
+            else:
+                link_or_copy(src, os.path.join(tmp_path, name))
+
+        # A crash between these renames leaves the old dataset at <path>.old
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    if csv_path is not None and EXPORT_CSV:
+        export_csv(df, csv_path)
+
+def write_partition(df, path, column, value, csv_path=None):
+    """
+    Writes (or replaces) a single partition of a dataset. The partition column does
+    not have to be in df, e.g. a day's comments stored under the day they were scraped.
+    """
+    os.makedirs(path, exist_ok=True)
+    write_parquet_atomic(df, os.path.join(path, f"{column}={partition_value(value)}.parquet"))
+
+    if csv_path is not None and EXPORT_CSV:
+        export_csv(df, csv_path)
+
+def partition_files(path, partitions=None):
+    """
+    Lists a dataset's files. partitions is a dict like {'date': [...values]} or
+    {'ticker': 'AAPL'}; files for other values are skipped without being opened.
+    """
+    if partitions and len(partitions) == 1:
+        # The file names are known, so the directory isn't listed (it may hold thousands)
+        column, wanted = next(iter(partitions.items()))
+        if not isinstance(wanted, (list, tuple, set)):
+            wanted = [wanted]
+        files = {os.path.join(path, f"{column}={partition_value(w)}.parquet") for w in wanted}
+        return sorted(f for f in files if os.path.exists(f))
+
+    files = sorted(glob.glob(os.path.join(path, "*.parquet")))
+    if not partitions:
+        return files
+
+    selected = []
+    for file in files:
+        name = os.path.basename(file)[:-len(".parquet")]
+        column, _, value = name.partition("=")
+        if column in partitions:
+            wanted = partitions[column]
+            if not isinstance(wanted, (list, tuple, set)):
+                wanted = [wanted]
+            if value not in {partition_value(w) for w in wanted}:
+                continue
+        selected.append(file)
+    return selected
+
+def partition_max(path, partition_column, column):
+    """
+    Returns {partition value: largest value of column} for a partitioned dataset, taken
+    from the Parquet row-group statistics so no rows are read.
+    """
+    maxima = dict()
+    for file in partition_files(path):
+        name = os.path.basename(file)[:-len(".parquet")]
+        key, _, value = name.partition("=")
+        if key != partition_column:
+            continue
+        metadata = pq.ParquetFile(file).metadata
+        index = metadata.schema.to_arrow_schema().get_field_index(column)
+        stats = [metadata.row_group(i).column(index).statistics for i in range(metadata.num_row_groups)]
+        values = [s.max for s in stats if s is not None and s.has_min_max]
+        if values:
+            maxima[value] = max(values)
+    return maxima
+
+def dataset_exists(path):
+    return bool(glob.glob(os.path.join(path, "*.parquet")))
+
+def apply_filters(df, filters):
+    """Applies [(column, op, value), ...] filters to an in-memory frame (used for CSVs)."""
+    ops = {
+        "==": lambda s, v: s == v, "!=": lambda s, v: s != v,
+        "<": lambda s, v: s < v, "<=": lambda s, v: s <= v,
+        ">": lambda s, v: s > v, ">=": lambda s, v: s >= v,
+        "in": lambda s, v: s.isin(v), "not in": lambda s, v: ~s.isin(v),
+    }
+    for column, op, value in filters:
+        df = df[ops[op](df[column], value)]
+    return df
+
+def read_csv_rows(csv_files, path, partitions, csv_partition, parse_dates):
+    """
+    Reads the CSV files of a partitioned dataset, minus the rows of partitions that
+    have a Parquet file (see read_table's csv_partition).
+    """
+    stored = dict()
+    for file in partition_files(path):
+        column, _, value = os.path.basename(file)[:-len(".parquet")].partition("=")
+        stored.setdefault(column, set()).add(value)
+    if len(stored) > 1:
+        raise ValueError(f"Dataset at '{path}' is partitioned by more than one column: {sorted(stored)}")
+    column = next(iter(stored), None)
+    wanted = (partitions or dict()).get(column)
+    if wanted is not None and not isinstance(wanted, (list, tuple, set)):
+        wanted = [wanted]
+    wanted = {partition_value(w) for w in wanted} if wanted is not None else None
+
+    skipped = stored.get(column, set())
+
+    frames = []
+    for file in csv_files:
+        if callable(csv_partition):
+            # The whole file is one partition, so it is only opened if it is needed
+            value = partition_value(csv_partition(file))
+            if value not in skipped and (wanted is None or value in wanted):
+                frames.append(pd.read_csv(file, parse_dates=parse_dates))
+            continue
+
+        df = pd.read_csv(file, parse_dates=parse_dates)
+        values = df[csv_partition]
+        values = values.dt.strftime("%Y-%m-%d") if pd.api.types.is_datetime64_any_dtype(values) else values.astype(str)
+        keep = ~values.isin(skipped)
+        if wanted is not None:
+            keep &= values.isin(wanted)
+        frames.append(df[keep.to_numpy()])
+    return frames
+
+def read_table(path, columns=None, filters=None, partitions=None, csv_path=None, csv_partition=None, parse_dates=None):
+    """
+    Reads a dataset into a DataFrame.
+    columns: only these columns are read from disk.
+    filters: [(column, op, value), ...] pushed down to the Parquet reader.
+    partitions: see partition_files.
+    csv_path: file or glob pattern of data written before the switch to Parquet
+    (parse_dates is passed to read_csv). Without csv_partition, it is read instead when
+    no Parquet file matches.
+    csv_partition: for partitioned datasets whose CSVs hold days that have no Parquet
+    file. The CSV rows are read together with the Parquet files, except those of
+    partitions that have a Parquet file (it is newer). Either the CSV column holding
+    the partition value (dates compared as YYYY-MM-DD), or a function returning a CSV
+    file's partition value from its path.
+    Raises FileNotFoundError if neither exists.
+    """
+    files = partition_files(path, partitions)
+    csv_files = sorted(glob.glob(csv_path)) if csv_path is not None else []
+    if not files and not csv_files:
+        raise FileNotFoundError(f"No dataset at '{path}'" + (f" or CSV at '{csv_path}'" if csv_path else ""))
+
+    frames = []
+    if files:
+        # Partitions written on different days may type a column differently (e.g. all-null)
+        schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+        dataset = ds.dataset(files, schema=schema, format="parquet")
+        expression = pq.filters_to_expression(filters) if filters else None
+        frames.append(dataset.to_table(columns=columns, filter=expression).to_pandas())
+
+    if csv_partition is not None:
+        csv_frames = read_csv_rows(csv_files, path, partitions, csv_partition, parse_dates)
+    elif not files:
+        csv_frames = [pd.read_csv(f, parse_dates=parse_dates) for f in csv_files]
+    else:
+        csv_frames = []
+    for df in csv_frames:
+        if filters:
+            df = apply_filters(df, filters)
+        if columns:
+            df = df[columns]
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    # Empty frames would only turn column types into object
+    frames = [f for f in frames if len(f)] or frames[:1]
+    return pd.concat(frames, ignore_index=True)
+
+# --- Export a dataset to CSV: python3 storage.py <dataset dir> <output.csv> ---
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python3 storage.py <dataset dir> <output.csv>")
+        exit()
+    export_csv(read_table(sys.argv[1]), sys.argv[2])
@@ -4,12 +4,15 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, accuracy_score
 import os
+import sys
 from datetime import datetime
 import numpy as np
 
-PRICES_AND_SENTIMENT = "merged_data.csv"
-INSIDER = "2020-clean.csv"
-OUTPUT = "full_full_data.csv"
+# Usage: python3 finish_merge.py [insider features file in insider-data/]
+PRICES_AND_SENTIMENT = "merged_data"
+# clean.py's default output (CLEAN_FILE)
+INSIDER = sys.argv[1] if len(sys.argv) > 1 else "insider-clean.csv"
+OUTPUT = "full_full_data"
 
 SCRIPT_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.join(SCRIPT_DIR, "..")
@@ -19,11 +22,20 @@ SEMI_FULL = os.path.join(DATA_DIR, PRICES_AND_SENTIMENT)
 INSIDER = os.path.join(DATA_DIR, 'insider-data', INSIDER)
 OUTPUT_DATA = os.path.join(DATA_DIR, OUTPUT)
 
+# A day gets the insider features of the ticker's latest insider trade day at most this
+# many days before it (the longest window the features cover)
+INSIDER_MAX_AGE_DAYS = 91
+
+sys.path.append(ROOT_DIR)
+from common import storage
+from common.asof_join import asof_join
+from common.labeling import label_targets, THRESHOLDS
+
 print("Starting Random Forest multiclass model training script...")
 
 # Load dataframes
 try:
-    semifull_df = pd.read_csv(SEMI_FULL, parse_dates=['date'])
+    semifull_df = storage.read_table(SEMI_FULL, csv_path=f"{SEMI_FULL}.csv", parse_dates=['date'])
     print(f"Successfully loaded {SEMI_FULL}")
 except FileNotFoundError:
     print(f"Error: '{SEMI_FULL}' not found.")
@@ -40,18 +52,7 @@ except FileNotFoundError:
 insider_df.sort_values(by=['Ticker', 'Date'], inplace=True)
 
 # Engineering target
-def create_target(pct_change):
-    thresholds_passed = 0
-    for (_, threshold) in THRESHOLDS:
-        if abs(pct_change) > threshold:
-            thresholds_passed += 1
-    
-    if pct_change < 0:
-        return - thresholds_passed
-    else:
-        return thresholds_passed
-
-semifull_df['target'] = semifull_df['next_day_pct_change'].apply(create_target)
+semifull_df['target'] = label_targets(semifull_df['next_day_pct_change'], THRESHOLDS)
 
 insider_df.rename(columns={'Ticker': 'ticker'}, inplace=True)
 insider_df.rename(columns={'Date': 'date'}, inplace=True)
@@ -61,24 +62,16 @@ for df in [insider_df, semifull_df]:
     df["ticker"] = df["ticker"].astype(str)
     df["date"] = pd.to_datetime(df["date"], format="mixed")
 
-# Merge
-data = pd.merge(
-    insider_df, 
-    semifull_df, 
-    on=['ticker', 'date'], 
-    how='left',
-    suffixes=("", "_trade")
+# Every price/sentiment day gets the insider features as of that day
+data = asof_join(
+    semifull_df,
+    insider_df,
+    on='date',
+    by='ticker',
+    tolerance=pd.Timedelta(days=INSIDER_MAX_AGE_DAYS),
+    suffixes=("_trade", "")
 )
 
-
-# Fill rows with no insider data
-data = data.sort_values(["ticker", "date"])
-cols_to_fill = [
-    'Buyer Change Day', 'Buyer Change Week', 'Buyer Change Month', 'Buyer Change TriMonth',
-    'Trade Direction Day', 'Trade Direction Week', 'Trade Direction Month', 'Trade Direction TriMonth'
-]
-data[cols_to_fill] = data.groupby("ticker")[cols_to_fill].ffill()
-
 # Sort
 data = data.sort_values(["ticker", "date"])
 # Drop empty rows
@@ -88,6 +81,6 @@ if data.empty:
     exit()
 
 # Save
-data.to_csv(OUTPUT_DATA, index=False)
+storage.write_table(data, OUTPUT_DATA, csv_path=f"{OUTPUT_DATA}.csv")
 print(f"✅ Agent data file saved to: {OUTPUT_DATA}")
 
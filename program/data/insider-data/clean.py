@@ -1,12 +1,21 @@
 import pandas as pd
 import os
+import sys
 
-INPUT = '2020.csv'
-OUTPUT = '2020-clean.csv'
+# Usage: python clean.py [<input> [<output.csv>]]
+# The input is the transactions/ directory written by ingest.py (any number of years, the
+# default) or a CSV. The output defaults to CLEAN_FILE, the file finish_merge.py reads.
+CLEAN_FILE = 'insider-clean.csv'
+INPUT = sys.argv[1] if len(sys.argv) > 1 else 'transactions'
+OUTPUT = sys.argv[2] if len(sys.argv) > 2 else CLEAN_FILE
 
 DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(DIR, '..', '..'))
+from common import storage
+from common.rolling import window_sums
+
 FILE = os.path.join(DIR, INPUT)
-df = pd.read_csv(FILE)
+df = storage.read_table(FILE) if os.path.isdir(FILE) else pd.read_csv(FILE)
 
 # Deduplicate
 df.drop_duplicates(subset=None, keep="first", inplace=True)
@@ -42,22 +51,17 @@ df = (
 
 # Clean up date
 df["Date"]  = pd.to_datetime(df["Date"], format="mixed")
-df = df.sort_values(['Ticker', 'Date'])
+df = df.sort_values(['Ticker', 'Date'], kind='mergesort').reset_index(drop=True)
 
 
 # COMPUTE SUMS
+# Rolling sums per Ticker over the last week, month and 3 months, all in one pass
 times = {"Week": "7d", "Month": "30d", "TriMonth": "91d"}
-for section in ["Value", "Volume", "Remaining"]:
-    df = df.set_index('Date')
-    # Compute rolling sum per Ticker
+sections = ["Value", "Volume", "Remaining"]
+sums = window_sums(df, 'Ticker', 'Date', sections, list(times.values()))
+for section in sections:
     for time, days in times.items():
-        df[f'{time}ly {section}'] = (
-            df.groupby('Ticker')[section]
-              .rolling(days).sum()
-              .reset_index(level=0, drop=True)
-        )
-    # Reset index to keep Date as a column
-    df = df.reset_index()
+        df[f'{time}ly {section}'] = sums[(days, section)]
 
 # Aggregate across buyers
 df = (
@@ -103,4 +107,5 @@ df = df[[
     "Trade Direction TriMonth"
 ]]
 
-df.to_csv(OUTPUT,index=False)
+# In insider-data/, where finish_merge.py looks for it
+df.to_csv(os.path.join(DIR, OUTPUT), index=False)
@@ -0,0 +1,156 @@
+import glob
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(DIR, '..', '..'))
+from common import storage
+
+# --- Ingest raw Form 4 exports ---
+# Usage: python3 ingest.py <export.csv or pattern> [...] [--since YYYY-MM-DD]
+# Reads any number of insider trading exports (e.g. TransactionsByDate.csv files from
+# Insider-trading/group_by_ticker.py, or files already refined by hand), CHUNK_ROWS rows
+# at a time, and applies the refinement rules of data-refinement.txt to every chunk.
+# Rows seen before (in any file) are skipped by their hash. The result is written to
+# transactions/, one file per year (transactions/year=2021.parquet), sorted by ticker
+# and date. Each run replaces what was there. Memory holds one chunk and one 8-byte hash
+# per kept row while reading, and one year of rows while writing.
+
+OUTPUT_DIR = os.path.join(DIR, 'transactions')
+
+CHUNK_ROWS = 200_000
+# Trades before this day are dropped (--since changes it)
+EARLIEST_DATE = "2020-01-01"
+
+SINCE = sys.argv[sys.argv.index('--since') + 1] if '--since' in sys.argv[:-1] else EARLIEST_DATE
+INPUTS = [a for i, a in enumerate(sys.argv[1:], 1) if not a.startswith('--') and sys.argv[i - 1] != '--since']
+
+# The code each transaction type must have
+TYPE_CODES = {'Purchase': 'P', 'Sale': 'S'}
+# Columns kept for clean.py; the rest (type, description, form, issuer, position, remarks) are dropped
+COLUMNS = ['Ticker', 'Date', 'Insider', 'Code', 'Shares', 'Price', 'Value', 'Remaining Shares']
+NUMERIC_COLUMNS = ['Shares', 'Price', 'Value', 'Remaining Shares']
+
+def refine(chunk, since):
+    """Applies the manual refinement rules to a chunk of raw rows."""
+    chunk = chunk.copy()
+    chunk['Code'] = chunk['Code'].astype(str).str.strip().str.upper()
+
+    # 1. The transaction type must match the code (files refined by hand have no type left)
+    if 'Transaction Type' in chunk.columns:
+        chunk = chunk[chunk['Transaction Type'].map(TYPE_CODES) == chunk['Code']]
+    else:
+        chunk = chunk[chunk['Code'].isin(TYPE_CODES.values())]
+
+    # 2-4. Drop the columns that aren't needed (insider and price are kept)
+    chunk = chunk[COLUMNS].copy()
+    for col in NUMERIC_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+    chunk['Ticker'] = chunk['Ticker'].astype(str).str.strip()
+    chunk['Insider'] = chunk['Insider'].astype(str).str.strip()
+
+    # 5. Drop trades without shares or value
+    chunk = chunk[(chunk['Shares'] != 0) & (chunk['Value'] != 0)]
+
+    # 6. Drop trades before the first day wanted
+    chunk['Date'] = pd.to_datetime(chunk['Date'], format="mixed", errors='coerce')
+    chunk = chunk[chunk['Date'] >= pd.Timestamp(since)]
+    return chunk.reset_index(drop=True)
+
+class HashIndex:
+    """
+    The hashes of the rows kept so far, as a sorted array. Replaces drop_duplicates over
+    all files, which needs every row in memory at once.
+    """
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def keep_new(self, chunk):
+        """Returns the rows of chunk not seen before (the first of repeats within it), and remembers them."""
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+        first = np.zeros(len(hashes), dtype=bool)
+        first[np.unique(hashes, return_index=True)[1]] = True
+        seen = np.zeros(len(hashes), dtype=bool)
+        if len(self.hashes):
+            pos = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+            seen = self.hashes[pos] == hashes
+        new = first & ~seen
+
+        # Both parts are sorted, so this sort only merges them
+        self.hashes = np.sort(np.concatenate([self.hashes, np.sort(hashes[new])]), kind='stable')
+        return chunk[new].reset_index(drop=True)
+
+def input_files(patterns):
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            print(f"Warning: '{pattern}' matches no file.")
+        files.extend(m for m in matches if m not in files)
+    return files
+
+def ingest(files, since, spill_dir):
+    """Refines and dedupes every file into spill_dir, one file per chunk. Returns the years seen."""
+    index = HashIndex()
+    years = set()
+    chunk_number = 0
+    for file in files:
+        read = 0
+        kept = 0
+        duplicates = 0
+        try:
+            reader = pd.read_csv(file, chunksize=CHUNK_ROWS, dtype=str)
+            for raw in reader:
+                missing = [c for c in COLUMNS if c not in raw.columns]
+                if missing:
+                    print(f"Skipping {file}: missing columns {', '.join(missing)}")
+                    break
+                read += len(raw)
+                refined = refine(raw, since)
+                new = index.keep_new(refined)
+                duplicates += len(refined) - len(new)
+                if new.empty:
+                    continue
+                storage.write_partition(new, spill_dir, 'chunk', f"{chunk_number:06d}")
+                chunk_number += 1
+                kept += len(new)
+                years.update(new['Date'].dt.year.unique().tolist())
+        except FileNotFoundError:
+            print(f"Error: '{file}' not found.")
+            continue
+        print(f"{os.path.basename(file)}: {read} rows read, {kept} kept, {duplicates} duplicates skipped")
+    return sorted(years)
+
+def write_years(years, spill_dir):
+    """Writes one sorted partition per year, reading only that year's rows from the chunks."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    for old_file in glob.glob(os.path.join(OUTPUT_DIR, "*.parquet")):
+        os.remove(old_file)
+
+    for year in years:
+        rows = storage.read_table(spill_dir, filters=[
+            ('Date', '>=', pd.Timestamp(year, 1, 1)),
+            ('Date', '<', pd.Timestamp(year + 1, 1, 1)),
+        ])
+        rows = rows.sort_values(['Ticker', 'Date'], kind='mergesort').reset_index(drop=True)
+        storage.write_partition(rows, OUTPUT_DIR, 'year', year)
+        print(f"{year}: {len(rows)} trades")
+
+if __name__ == "__main__":
+    files = input_files(INPUTS)
+    if not files:
+        print("Usage: python3 ingest.py <export.csv or pattern> [...] [--since YYYY-MM-DD]")
+        exit()
+
+    print(f"Ingesting {len(files)} files (trades from {SINCE} on)...")
+    with tempfile.TemporaryDirectory(dir=DIR) as spill_dir:
+        years = ingest(files, SINCE, spill_dir)
+        if not years:
+            print("No trades left after refinement.")
+            exit()
+        write_years(years, spill_dir)
+    print(f"✅ Refined trades saved to: {OUTPUT_DIR}")
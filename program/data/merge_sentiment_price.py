@@ -1,78 +1,90 @@
 import os
+import sys
 import glob
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-PRICES_FILE = 'historical_prices.csv'
-OUTPUT = 'merged_data.csv'
+PRICES_FILE = 'historical_prices'
+OUTPUT = 'merged_data'
 
 SCRIPT_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.join(SCRIPT_DIR, "..")
 
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.join(ROOT_DIR, 'sentiment_algo'))
+from common import storage, price_features
+from common.asof_join import roll_to_sessions
+from common.labeling import label_targets, THRESHOLDS
+import svc
+
 PRICE = os.path.join(ROOT_DIR, "historical_prices", PRICES_FILE)
-SIGNALS_DIR = os.path.join(SCRIPT_DIR, 'daily_signals')
+SIGNALS_DIR = os.path.join(ROOT_DIR, 'sentiment_algo', 'daily_signals')
 
-list_of_files = glob.glob(os.path.join(SIGNALS_DIR, '??-??-??_signals.csv')) # Use YY-MM-DD format
+# Signals of days without a price bar (weekends, holidays) count towards the ticker's
+# next bar, at most this many days later. Days landing on the same bar are combined:
+# comment counts are added up and the mean sentiment is weighted by them. The changes
+# and svc are then computed again between consecutive bars (as svc.calculate_svc does
+# between days), since differences of several days can't be added up.
+MAX_ROLL_DAYS = 4
+SIGNAL_ROLL = {'sentiment_sum': 'sum', 'comment_count': 'sum', 'mean_sentiment': 'mean'}
+CHANGE_COLUMNS = ['sentiment_change', 'volume_change', 'svc']
 
 print("Merging sentiment and price data...")
 
-if not list_of_files:
-    print(f"Error: No signal files found in '{SIGNALS_DIR}' matching 'YY-MM-DD_signals.csv'.")
-    exit()
+# Signals of days saved before the switch to Parquet are read from the latest CSV
+list_of_files = glob.glob(os.path.join(SIGNALS_DIR, '??-??-??_signals.csv')) # Use YY-MM-DD format
 
 def get_date_from_filename(f):
     basename = os.path.basename(f)
     date_str = basename.split('_signals.csv')[0]
     return datetime.strptime(date_str, '%y-%m-%d') # Use %y-%m-%d format
 
-latest_file = max(list_of_files, key=get_date_from_filename)
-print(f"Loading latest signals file: {latest_file}")
+latest_file = max(list_of_files, key=get_date_from_filename) if list_of_files else None
 
 try:
-    prices_df = pd.read_csv(PRICE_FILE, parse_dates=['date'])
-    print(f"Successfully loaded {PRICE_FILE}")
+    prices_df = storage.read_table(PRICE, csv_path=f"{PRICE}.csv", parse_dates=['date'])
+    print(f"Successfully loaded {PRICE}")
 except FileNotFoundError:
-    print(f"Error: '{PRICE_FILE}' not found. Please run download_price_history.py first.")
+    print(f"Error: '{PRICE}' not found. Please run download_price_history.py first.")
     exit()
 
 try:
-    sentiment_df = pd.read_csv(latest_file, parse_dates=['timestamp'])
-    print(f"Successfully loaded {latest_file}")
+    sentiment_df = storage.read_table(SIGNALS_DIR, csv_path=latest_file, csv_partition='timestamp', parse_dates=['timestamp'])
+    print(f"Successfully loaded signals from {SIGNALS_DIR}")
 except FileNotFoundError:
-    print(f"Error: '{latest_file}' not found. Please run your pipeline first.")
+    print(f"Error: No signal data found in '{SIGNALS_DIR}'. Please run your pipeline first.")
     exit()
 
 if 'Ticker' in prices_df.columns:
     prices_df.rename(columns={'Ticker': 'ticker'}, inplace=True)
 
 
-print("Engineering price features...")
-prices_df.sort_values(by=['ticker', 'date'], inplace=True)
-
-periods = {
-    'change_day': 1, 'change_week': 5, 'change_month': 21,
-    'change_3mo': 63, 'change_6mo': 126, 'change_9mo': 189, 'change_1yr': 252
-}
+print("Adding price features...")
+# Only tickers with signals are merged; their features are read from the store
+prices_df = prices_df[prices_df['ticker'].astype(str).isin(sentiment_df['ticker'].astype(str))]
+prices_df = price_features.add_features(prices_df)
 
-for name, period in periods.items():
-    prices_df[name] = prices_df.groupby('ticker')['Adj Close'].pct_change(periods=period, fill_method=None)
-
-prices_df['next_day_pct_change'] = prices_df.groupby('ticker')['Adj Close'].pct_change(periods=-1, fill_method=None).shift(1)
-
-def create_target(pct_change):
-    if pct_change > SUPER_THRESHOLD: return 2
-    elif pct_change > HOLD_THRESHOLD: return 1
-    elif pct_change > -SUPER_THRESHOLD and pct_change < -HOLD_THRESHOLD: return -1 
-    elif pct_change < -SUPER_THRESHOLD: return -2
-    else: return 0
-
-prices_df['target'] = prices_df['next_day_pct_change'].apply(create_target)
+# Same classes as the models are trained on
+prices_df['target'] = label_targets(prices_df['next_day_pct_change'], THRESHOLDS)
 print("Merging sentiment and price data...")
 sentiment_df.rename(columns={'timestamp': 'date'}, inplace=True)
 
 prices_df['ticker'] = prices_df['ticker'].astype(str)
 sentiment_df['ticker'] = sentiment_df['ticker'].astype(str)
 
+sentiment_df = sentiment_df.drop(columns=[c for c in CHANGE_COLUMNS if c in sentiment_df.columns])
+sentiment_df['sentiment_sum'] = sentiment_df['mean_sentiment'] * sentiment_df['comment_count']
+roll = {c: SIGNAL_ROLL.get(c, 'last') for c in sentiment_df.columns if c not in ('ticker', 'date')}
+sentiment_df = roll_to_sessions(sentiment_df, prices_df, max_days=MAX_ROLL_DAYS, agg=roll)
+
+# Bars without comments keep the plain mean (0 on days without mentions)
+weighted = sentiment_df['sentiment_sum'] / sentiment_df['comment_count'].where(sentiment_df['comment_count'] > 0)
+sentiment_df['mean_sentiment'] = weighted.fillna(sentiment_df['mean_sentiment'])
+sentiment_df = svc.calculate_svc(sentiment_df.drop(columns=['sentiment_sum']), date_column='date')
+# Like signal_generator.py, a ticker's first bar has no changes (0)
+sentiment_df[CHANGE_COLUMNS] = sentiment_df[CHANGE_COLUMNS].replace([np.inf, -np.inf], np.nan).fillna(0)
+
 data = pd.merge(
     prices_df, 
     sentiment_df, 
@@ -81,6 +93,6 @@ data = pd.merge(
 )
 
 agent_data_path = os.path.join(SCRIPT_DIR, OUTPUT)
-data.to_csv(agent_data_path, index=False)
+storage.write_table(data, agent_data_path, csv_path=f"{agent_data_path}.csv")
 print(f"✅ Agent data file saved to: {agent_data_path}")
 
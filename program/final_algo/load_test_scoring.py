@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import sys
+import time
+import urllib.request
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Load test for scoring_service.py ---
+# Usage: python3 load_test_scoring.py [json|arrow]
+# Start scoring_service.py first. CONCURRENCY clients send REQUESTS requests in total,
+# each with ROWS_PER_REQUEST feature rows taken from DATA_FILE (random rows if the
+# dataset is missing), then the throughput and p50/p99 latency are reported.
+
+DATA_FILE = "present_data"
+URL = "http://127.0.0.1:8765"
+
+CONCURRENCY = 16
+REQUESTS = 2000
+ROWS_PER_REQUEST = 1
+
+SCRIPT_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..")
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+sys.path.append(ROOT_DIR)
+from common import storage
+
+def post(body, content_type):
+    request = urllib.request.Request(f"{URL}/score", data=body, headers={'Content-Type': content_type})
+    with urllib.request.urlopen(request) as response:
+        return response.read()
+
+def json_body(rows):
+    return json.dumps({'rows': rows.to_dict(orient="records")}).encode("utf-8")
+
+def arrow_body(rows):
+    table = pa.Table.from_pandas(rows, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def timed_post(body, content_type):
+    start = time.perf_counter()
+    post(body, content_type)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "json"
+    if mode not in ("json", "arrow"):
+        print(f"Error: Unknown mode '{mode}', use json or arrow.")
+        exit()
+
+    try:
+        with urllib.request.urlopen(f"{URL}/health") as response:
+            health = json.loads(response.read())
+    except OSError as e:
+        print(f"Error: Scoring service not reachable at {URL} ({e}). Start scoring_service.py first.")
+        exit()
+    feature_cols = health['feature_cols']
+    print(f"Scoring service: {health['name']} {health['version'] or '(unversioned)'}")
+
+    data_path = os.path.join(DATA_DIR, DATA_FILE)
+    try:
+        data = storage.read_table(data_path, columns=feature_cols, csv_path=f"{data_path}.csv")
+        data = data[feature_cols].dropna()
+    except FileNotFoundError:
+        print(f"'{data_path}' not found, sending random features.")
+        data = pd.DataFrame(np.random.default_rng(0).normal(size=(1000, len(feature_cols))), columns=feature_cols)
+
+    # Bodies are built up front so only the service is timed
+    rng = np.random.default_rng(42)
+    make_body = arrow_body if mode == "arrow" else json_body
+    content_type = "application/vnd.apache.arrow.stream" if mode == "arrow" else "application/json"
+    bodies = [make_body(data.iloc[rng.integers(0, len(data), ROWS_PER_REQUEST)]) for _ in range(REQUESTS)]
+
+    print(f"Sending {REQUESTS} {mode} requests of {ROWS_PER_REQUEST} rows from {CONCURRENCY} clients...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        latencies = np.array(list(executor.map(lambda body: timed_post(body, content_type), bodies)))
+    elapsed = time.perf_counter() - start
+
+    with urllib.request.urlopen(f"{URL}/health") as response:
+        after = json.loads(response.read())
+    batches = after['batches'] - health['batches']
+
+    print("\n" + "="*30)
+    print("   Load Test Results")
+    print("="*30)
+    print(f"Throughput:  {REQUESTS / elapsed:.1f} requests/s ({REQUESTS * ROWS_PER_REQUEST / elapsed:.1f} rows/s)")
+    print(f"Latency p50: {np.percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"Latency p99: {np.percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"Latency max: {latencies.max() * 1000:.2f} ms")
+    if batches:
+        print(f"Micro-batching: {REQUESTS} requests scored in {batches} model calls ({REQUESTS / batches:.1f} per call)")
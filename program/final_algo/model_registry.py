@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import joblib
+from datetime import datetime
+
+# --- Versioned store for trained models ---
+# models/<name>/v<N>/ holds scaler.joblib, rf_model.joblib and metadata.json (feature
+# columns, thresholds, training date range). Versions are never overwritten; each
+# training run adds the next one.
+#
+# Models are loaded with joblib's mmap_mode, which maps the large arrays from the
+# uncompressed .joblib files instead of reading them into memory. This makes loading
+# much faster, and processes loading the same version share the file's pages through the
+# OS cache. (scikit-learn still copies each tree's nodes into its own buffers.)
+
+SCRIPT_DIR = os.path.dirname(__file__)
+REGISTRY_DIR = os.path.join(SCRIPT_DIR, "models")
+
+MODEL_FILE = "rf_model.joblib"
+SCALER_FILE = "scaler.joblib"
+METADATA_FILE = "metadata.json"
+
+def list_versions(name):
+    """Returns the saved versions of a model, oldest first (e.g. ['v1', 'v2'])."""
+    model_dir = os.path.join(REGISTRY_DIR, name)
+    if not os.path.isdir(model_dir):
+        return []
+    versions = [v for v in os.listdir(model_dir) if v.startswith("v") and v[1:].isdigit()]
+    return sorted(versions, key=lambda v: int(v[1:]))
+
+def save_model(name, model, scaler, feature_cols, thresholds, train_start, train_end, extra=None):
+    """Saves a trained model and scaler as the next version of name. Returns the version."""
+    versions = list_versions(name)
+    version = f"v{int(versions[-1][1:]) + 1 if versions else 1}"
+    path = os.path.join(REGISTRY_DIR, name, version)
+
+    metadata = {
+        'name': name,
+        'version': version,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'feature_cols': list(feature_cols),
+        'thresholds': [list(t) for t in thresholds],
+        'train_start': str(train_start),
+        'train_end': str(train_end),
+        **(extra or {}),
+    }
+
+    # Written next to the final directory and renamed into place when complete
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    # Uncompressed, so the arrays can be memory-mapped when loading
+    joblib.dump(scaler, os.path.join(tmp_path, SCALER_FILE))
+    joblib.dump(model, os.path.join(tmp_path, MODEL_FILE))
+    with open(os.path.join(tmp_path, METADATA_FILE), "w") as fh:
+        json.dump(metadata, fh, indent=2)
+    os.replace(tmp_path, path)
+    return version
+
+def resolve_version(name, version="latest"):
+    versions = list_versions(name)
+    if version == "latest":
+        if not versions:
+            raise FileNotFoundError(f"No saved versions of model '{name}' in {REGISTRY_DIR}")
+        return versions[-1]
+    if version not in versions:
+        raise FileNotFoundError(f"Model '{name}' has no version '{version}' (saved: {', '.join(versions) or 'none'})")
+    return version
+
+def load_metadata(name, version="latest"):
+    version = resolve_version(name, version)
+    with open(os.path.join(REGISTRY_DIR, name, version, METADATA_FILE)) as fh:
+        return json.load(fh)
+
+def load_model(name, version="latest", mmap_mode="r"):
+    """
+    Returns (model, scaler, metadata) for a version of name, or its newest with "latest".
+    Models trained before the registry, saved directly in final_algo/<name>/, are loaded
+    when no version exists; their metadata is None.
+    """
+    legacy_dir = os.path.join(SCRIPT_DIR, name)
+    if version == "latest" and not list_versions(name) and os.path.exists(os.path.join(legacy_dir, MODEL_FILE)):
+        print(f"No registered versions of '{name}', loading {legacy_dir}")
+        return (
+            joblib.load(os.path.join(legacy_dir, MODEL_FILE), mmap_mode=mmap_mode),
+            joblib.load(os.path.join(legacy_dir, SCALER_FILE), mmap_mode=mmap_mode),
+            None,
+        )
+
+    version = resolve_version(name, version)
+    path = os.path.join(REGISTRY_DIR, name, version)
+    model = joblib.load(os.path.join(path, MODEL_FILE), mmap_mode=mmap_mode)
+    scaler = joblib.load(os.path.join(path, SCALER_FILE), mmap_mode=mmap_mode)
+    return model, scaler, load_metadata(name, version)
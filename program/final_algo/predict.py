@@ -1,9 +1,14 @@
 import os
-import joblib
+import sys
 import pandas as pd
 import trading_strategies
+import model_registry
 
-DATA_FILE = "present_data.csv"
+DATA_FILE = "present_data"
+
+# Usage: python3 predict.py [model version]   (e.g. v3; defaults to the latest)
+MODEL_NAME = "rf_full"
+MODEL_VERSION = sys.argv[1] if len(sys.argv) > 1 else "latest"
 
 SCRIPT_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.join(SCRIPT_DIR, "..")
@@ -11,44 +16,43 @@ DATA_DIR = os.path.join(ROOT_DIR, "data")
 
 DATA = os.path.join(DATA_DIR, DATA_FILE)
 
+sys.path.append(ROOT_DIR)
+from common import storage
+from common.labeling import THRESHOLDS, FEATURE_COLS
+
 # Load data
 data = None
 try:
-    data = pd.read_csv(DATA, parse_dates=['date'])
+    # present_data.csv is usually filtered by hand, so the CSV is read when there is no dataset
+    data = storage.read_table(DATA, csv_path=f"{DATA}.csv", parse_dates=['date'])
     print(f"Successfully loaded {DATA}")
 except FileNotFoundError:
     print(f"Error: '{DATA}' not found.")
     exit()
 
-feature_cols = [
-    'change_day', 'change_week', 'change_month', 'change_3mo',
-    'change_6mo', 'change_9mo', 'change_1yr',
-    'mean_sentiment', 'comment_count', 'sentiment_change', 'volume_change', 'svc',
-    'Buyer Change Day', 'Buyer Change Week', 'Buyer Change Month', 'Buyer Change TriMonth',
-    'Trade Direction Day', 'Trade Direction Week', 'Trade Direction Month', 'Trade Direction TriMonth'
-]
+feature_cols = list(FEATURE_COLS)
 
 # Load model
-MODEL_DIR = "rf_full"
+try:
+    model, scaler, metadata = model_registry.load_model(MODEL_NAME, MODEL_VERSION)
+except FileNotFoundError as e:
+    print(f"Error: {e}")
+    exit()
 
-scaler = joblib.load(f"{MODEL_DIR}/scaler.joblib")
-model = joblib.load(f"{MODEL_DIR}/rf_model.joblib")
+# A registered model knows the features and thresholds it was trained with
+if metadata is not None:
+    feature_cols = metadata['feature_cols']
+    THRESHOLDS = [tuple(t) for t in metadata['thresholds']]
+    print(f"Loaded {MODEL_NAME} {metadata['version']} (trained on {metadata['train_start']} to {metadata['train_end']})")
 
 X = data[feature_cols]
 X_scaled = scaler.transform(X)
 
 data["signal"] = model.predict(X_scaled)
 
-THRESHOLDS = [
-    ("Small", 0.025),
-    ("Mid", 0.05),
-    ("Great", 0.1),
-    ("Huge", 0.2),
-    ("Tremendous", 0.4),
-    ("Absurd", 0.8),
-]
-
 results = list()
+# The SoftMax strategies share one prediction of the class probabilities
+probabilities = model.predict_proba(X_scaled)
 STRATEGIES = [
     trading_strategies.Svm(), 
     trading_strategies.BuyAndHold(), 
@@ -58,5 +62,5 @@ STRATEGIES = [
     trading_strategies.SoftMax(beta=2.0, thresholds=THRESHOLDS)
 ]
 for strategy in STRATEGIES:
-    res = strategy.run(model, feature_cols, scaler, data, printing=True)
+    res = strategy.run(model, feature_cols, scaler, data, printing=True, probabilities=probabilities)
     results.append(res)
@@ -4,12 +4,13 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, accuracy_score
 import os
-import joblib
+import sys
 from datetime import datetime
 import numpy as np
 import trading_strategies
+import model_registry
 
-INPUT_FILE = "full_full_data.csv"
+INPUT_FILE = "full_full_data"
 
 END_DATE = "2021-01-01"
 
@@ -19,18 +20,13 @@ DATA_DIR = os.path.join(ROOT_DIR, "data")
 
 FULL = os.path.join(DATA_DIR, INPUT_FILE)
 
-THRESHOLDS = [
-    ("Small", 0.025),
-    ("Mid", 0.05),
-    ("Great", 0.1),
-    ("Huge", 0.2),
-    ("Tremendous", 0.4),
-    ("Absurd", 0.8),
-]
+sys.path.append(ROOT_DIR)
+from common import storage
+from common.labeling import THRESHOLDS, FEATURE_COLS
 
 data = None
 try:
-    data = pd.read_csv(FULL, parse_dates=['date'])
+    data = storage.read_table(FULL, csv_path=f"{FULL}.csv", parse_dates=['date'])
     print(f"Successfully loaded {FULL}")
 except FileNotFoundError:
     print(f"Error: '{FULL}' not found.")
@@ -39,13 +35,7 @@ except FileNotFoundError:
 # SVM TRAINING
 print(f"Total {len(data)} data points ready for training and testing.")
 
-feature_cols = [
-    'change_day', 'change_week', 'change_month', 'change_3mo',
-    'change_6mo', 'change_9mo', 'change_1yr',
-    'mean_sentiment', 'comment_count', 'sentiment_change', 'volume_change', 'svc',
-    'Buyer Change Day', 'Buyer Change Week', 'Buyer Change Month', 'Buyer Change TriMonth',
-    'Trade Direction Day', 'Trade Direction Week', 'Trade Direction Month', 'Trade Direction TriMonth'
-]
+feature_cols = list(FEATURE_COLS)
 
 X = data[feature_cols]
 y = data['target']
@@ -91,10 +81,14 @@ model = RandomForestClassifier(n_estimators=500, random_state=42)
 model.fit(X_train_scaled, y_train)
 print("Model training complete.")
 
-MODEL_DIR = "rf_full"
-joblib.dump(scaler, f"{MODEL_DIR}/scaler.joblib")
-joblib.dump(model, f"{MODEL_DIR}/rf_model.joblib")
-print(f"Model saved to {MODEL_DIR}")
+MODEL_NAME = "rf_full"
+version = model_registry.save_model(
+    MODEL_NAME, model, scaler, feature_cols, THRESHOLDS,
+    train_start=data.iloc[start_index]["date"].date(),
+    train_end=data.iloc[split_index - 1]["date"].date(),
+    extra={'n_estimators': model.n_estimators, 'train_samples': len(X_train)}
+)
+print(f"Model saved as {MODEL_NAME} {version}")
 
 
 y_pred = model.predict(X_test_scaled)
@@ -145,8 +139,9 @@ print("="*60)
 # 1. Prepare test data for the strategy functions
 test_data['signal'] = y_pred # Add the model's predictions
 
-# 2. Run all strategies
+# 2. Run all strategies (the SoftMax ones share one prediction of the class probabilities)
 results = list()
+probabilities = trading_strategies.class_probabilities(model, scaler, feature_cols, test_data)
 
 STRATEGIES = [
     trading_strategies.Svm(), 
@@ -157,7 +152,7 @@ STRATEGIES = [
     trading_strategies.SoftMax(beta=2.0, thresholds=THRESHOLDS)
 ]
 for strategy in STRATEGIES:
-    res = strategy.run(model, feature_cols, scaler, test_data)
+    res = strategy.run(model, feature_cols, scaler, test_data, probabilities=probabilities)
     results.append(res)
 
 # 3. Combine and display results
@@ -4,13 +4,15 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, accuracy_score
 import os
+import sys
 import glob
 from datetime import datetime
 import numpy as np
 import trading_strategies
+import model_registry
 
-PRICES_AND_SENTIMENT = "full_merged_data.csv"
-INSIDER = "2020-clean.csv"
+PRICES_AND_SENTIMENT = "full_merged_data"
+INSIDER = "insider-clean.csv"
 OUTPUT = "full_full_data.csv"
 
 SCRIPT_DIR = os.path.dirname(__file__)
@@ -21,38 +23,22 @@ SEMI_FULL = os.path.join(DATA_DIR, PRICES_AND_SENTIMENT)
 INSIDER = os.path.join(DATA_DIR, 'insider-data', INSIDER)
 OUTPUT_DATA = os.path.join(DATA_DIR, OUTPUT)
 
-print("Starting Random Forest multiclass model training script...")
+sys.path.append(ROOT_DIR)
+from common import storage
+from common.labeling import label_targets, THRESHOLDS, PRICE_FEATURES, SENTIMENT_FEATURES
 
-THRESHOLDS = [
-    ("Small", 0.025),
-    ("Mid", 0.05),
-    ("Great", 0.1),
-    ("Huge", 0.2),
-    ("Tremendous", 0.4),
-    ("Absurd", 0.8),
-]
+print("Starting Random Forest multiclass model training script...")
 
 # Load dataframes
 try:
-    semifull_df = pd.read_csv(SEMI_FULL, parse_dates=['date'])
+    semifull_df = storage.read_table(SEMI_FULL, csv_path=f"{SEMI_FULL}.csv", parse_dates=['date'])
     print(f"Successfully loaded {SEMI_FULL}")
 except FileNotFoundError:
     print(f"Error: '{SEMI_FULL}' not found.")
     exit()
 
 # Engineering target
-def create_target(pct_change):
-    thresholds_passed = 0
-    for (_, threshold) in THRESHOLDS:
-        if abs(pct_change) > threshold:
-            thresholds_passed += 1
-    
-    if pct_change < 0:
-        return - thresholds_passed
-    else:
-        return thresholds_passed
-
-semifull_df['target'] = semifull_df['next_day_pct_change'].apply(create_target)
+semifull_df['target'] = label_targets(semifull_df['next_day_pct_change'], THRESHOLDS)
 
 # Ensure type compatibility
 semifull_df["ticker"] = semifull_df["ticker"].astype(str)
@@ -73,11 +59,7 @@ if data.empty:
 # SVM TRAINING
 print(f"Total {len(data)} data points ready for training and testing.")
 
-feature_cols = [
-    'change_day', 'change_week', 'change_month', 'change_3mo',
-    'change_6mo', 'change_9mo', 'change_1yr',
-    'mean_sentiment', 'comment_count', 'sentiment_change', 'volume_change', 'svc',
-]
+feature_cols = PRICE_FEATURES + SENTIMENT_FEATURES
 
 X = data[feature_cols]
 y = data['target']
@@ -121,10 +103,14 @@ model = RandomForestClassifier(n_estimators=500, random_state=42)
 model.fit(X_train_scaled, y_train)
 print("Model training complete.")
 
-MODEL_DIR = "rf_no_insider"
-joblib.dump(scaler, f"{MODEL_DIR}/scaler.joblib")
-joblib.dump(model, f"{MODEL_DIR}/rf_model.joblib")
-print(f"Model saved to {MODEL_DIR}")
+MODEL_NAME = "rf_no_insider"
+version = model_registry.save_model(
+    MODEL_NAME, model, scaler, feature_cols, THRESHOLDS,
+    train_start=data.iloc[start_index]["date"].date(),
+    train_end=data.iloc[split_index - 1]["date"].date(),
+    extra={'n_estimators': model.n_estimators, 'train_samples': len(X_train)}
+)
+print(f"Model saved as {MODEL_NAME} {version}")
 
 y_pred = model.predict(X_test_scaled)
 #y_probs = model.predict_proba(X_test_scaled)
@@ -174,8 +160,9 @@ print("="*60)
 # 1. Prepare test data for the strategy functions
 test_data['signal'] = y_pred # Add the model's predictions
 
-# 2. Run all strategies
+# 2. Run all strategies (the SoftMax ones share one prediction of the class probabilities)
 results = list()
+probabilities = trading_strategies.class_probabilities(model, scaler, feature_cols, test_data)
 
 STRATEGIES = [
     trading_strategies.Svm(), 
@@ -186,7 +173,7 @@ STRATEGIES = [
     trading_strategies.SoftMax(beta=2.0, thresholds=THRESHOLDS)
 ]
 for strategy in STRATEGIES:
-    res = strategy.run(model, feature_cols, scaler, test_data)
+    res = strategy.run(model, feature_cols, scaler, test_data, probabilities=probabilities)
     results.append(res)
 
 # 3. Combine and display results
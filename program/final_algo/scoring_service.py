@@ -0,0 +1,212 @@
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import model_registry
+
+# --- Local scoring service ---
+# Usage: python3 scoring_service.py [model version]   (defaults to the latest)
+# Keeps the scaler and model loaded and scores feature rows over HTTP:
+#   POST /score   JSON {"rows": [{feature: value, ...}, ...]} -> JSON
+#                 or an Arrow IPC stream (Content-Type: application/vnd.apache.arrow.stream) -> Arrow
+#   GET  /health  model name, version, feature columns and batching counters
+# Each response has the predicted signal and the class probabilities SoftMax uses for
+# every row. Requests that arrive together are scored in one predict_proba call
+# (micro-batching): the batcher waits up to MAX_WAIT_MS after the first request for
+# more, up to MAX_BATCH_ROWS rows.
+
+MODEL_NAME = "rf_full"
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Pending connections the socket queues; the default of 5 drops connections under load
+LISTEN_BACKLOG = 128
+
+MAX_BATCH_ROWS = 4096
+MAX_WAIT_MS = 5
+
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+SCRIPT_DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common.labeling import FEATURE_COLS
+
+# Used for models saved before the registry, which have no metadata
+DEFAULT_FEATURE_COLS = FEATURE_COLS
+
+class MicroBatcher:
+    """Collects feature matrices from concurrent requests and scores them together on one thread."""
+    def __init__(self, model, scaler, feature_cols, max_batch_rows=MAX_BATCH_ROWS, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.scaler = scaler
+        self.feature_cols = feature_cols
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+
+        threading.Thread(target=self.loop, daemon=True).start()
+
+    def score(self, features):
+        """Returns the class probabilities for each row of a 2-D feature array (blocks until scored)."""
+        future = Future()
+        self.requests.put((features, future))
+        return future.result()
+
+    def next_batch(self):
+        batch = [self.requests.get()]
+        rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_rows:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=timeout))
+            except queue.Empty:
+                break
+            rows += len(batch[-1][0])
+        return batch
+
+    def loop(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                features = pd.DataFrame(np.vstack([f for f, _ in batch]), columns=self.feature_cols)
+                probs = self.model.predict_proba(self.scaler.transform(features))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(probs)
+            start = 0
+            for f, future in batch:
+                future.set_result(probs[start:start + len(f)])
+                start += len(f)
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    # Set on the class before the server starts
+    batcher = None
+    metadata = None
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+        self.send_json(200, {
+            **self.metadata,
+            'batches': self.batcher.batches,
+            'rows_scored': self.batcher.rows,
+        })
+
+    def do_POST(self):
+        if self.path != "/score":
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+
+        feature_cols = self.batcher.feature_cols
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        is_arrow = self.headers.get("Content-Type", "").startswith(ARROW_TYPE)
+        try:
+            if is_arrow:
+                table = pa.ipc.open_stream(body).read_all()
+                features = table.select(feature_cols).to_pandas().to_numpy(dtype=float)
+                tickers = table.column("ticker").to_pylist() if "ticker" in table.column_names else None
+            else:
+                payload = json.loads(body)
+                rows = payload["rows"] if isinstance(payload, dict) else payload
+                features = np.array([[np.nan if row[c] is None else row[c] for c in feature_cols] for row in rows], dtype=float)
+                tickers = [row.get("ticker") for row in rows] if rows and "ticker" in rows[0] else None
+        except KeyError as e:
+            self.send_json(400, {'error': f"Missing field {e}"})
+            return
+        except Exception as e:
+            self.send_json(400, {'error': f"Could not read request: {e}"})
+            return
+
+        if len(features) == 0:
+            probs = np.zeros((0, len(self.metadata['classes'])))
+        else:
+            try:
+                probs = self.batcher.score(features.reshape(len(features), len(feature_cols)))
+            except Exception as e:
+                self.send_json(500, {'error': f"Scoring failed: {e}"})
+                return
+
+        classes = np.array(self.metadata['classes'])
+        signals = classes[probs.argmax(axis=1)] if len(probs) else classes[:0]
+
+        if is_arrow:
+            columns = {'signal': signals}
+            if tickers is not None:
+                columns = {'ticker': tickers, **columns}
+            for i, label in enumerate(classes):
+                columns[f"prob_{label}"] = probs[:, i]
+            result = pa.table(columns)
+            sink = io.BytesIO()
+            with pa.ipc.new_stream(sink, result.schema) as writer:
+                writer.write_table(result)
+            self.send_body(200, sink.getvalue(), ARROW_TYPE)
+        else:
+            response = {
+                'model': self.metadata['name'],
+                'version': self.metadata['version'],
+                'classes': self.metadata['classes'],
+                'signals': signals.tolist(),
+                'probabilities': probs.tolist(),
+            }
+            if tickers is not None:
+                response['tickers'] = tickers
+            self.send_json(200, response)
+
+    # Keep the console quiet under load
+    def log_message(self, format, *args):
+        pass
+
+if __name__ == "__main__":
+    version = sys.argv[1] if len(sys.argv) > 1 else "latest"
+    try:
+        model, scaler, metadata = model_registry.load_model(MODEL_NAME, version)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        exit()
+
+    feature_cols = metadata['feature_cols'] if metadata is not None else DEFAULT_FEATURE_COLS
+    ScoringHandler.batcher = MicroBatcher(model, scaler, feature_cols)
+    ScoringHandler.metadata = {
+        'name': MODEL_NAME,
+        'version': metadata['version'] if metadata is not None else None,
+        'feature_cols': feature_cols,
+        'classes': [int(c) for c in model.classes_],
+    }
+
+    ThreadingHTTPServer.request_queue_size = LISTEN_BACKLOG
+    server = ThreadingHTTPServer((HOST, PORT), ScoringHandler)
+    server.daemon_threads = True
+    print(f"Scoring with {MODEL_NAME} {ScoringHandler.metadata['version'] or '(unversioned)'} on http://{HOST}:{PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+        server.server_close()
@@ -0,0 +1,169 @@
+import itertools
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import trading_strategies
+import model_registry
+
+# --- Parallel parameter sweep over the backtest strategies ---
+# Usage: python3 strategy_sweep.py [dataset under data/] [model version]
+# Every combination in SWEEP_GRID is backtested on the same data (default: present_data)
+# with a saved model (default: the latest version).
+# The parent pivots the data once into the day x ticker arrays the strategies run on
+# (trading_strategies.Grid) and computes the model's class probabilities once. They are
+# written as .npy files that every worker memory-maps read-only, so workers never
+# receive or build a copy of the frame, and never see the model.
+
+DATA_FILE = "present_data"
+MODEL_NAME = "rf_full"
+
+SCRIPT_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..")
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+sys.path.append(ROOT_DIR)
+from common import storage
+from common.labeling import THRESHOLDS, FEATURE_COLS
+
+# Worker processes for the backtests
+WORKERS = os.cpu_count()
+
+# Results are sorted by this metrics() column, best first
+RANK_BY = 'sharpe_ratio'
+
+# Same classes as THRESHOLDS, with each class expected to grow less / more
+NARROW_THRESHOLDS = [(name, threshold * 0.5) for name, threshold in THRESHOLDS]
+WIDE_THRESHOLDS = [(name, threshold * 2) for name, threshold in THRESHOLDS]
+
+# (strategy class, {constructor argument: [values to try]}); every combination is run.
+# SoftMax thresholds must have as many entries as the model was trained with.
+SWEEP_GRID = [
+    (trading_strategies.BuyAndHold, {}),
+    (trading_strategies.Svm, {}),
+    (trading_strategies.RawSvc, {
+        'svc_buy_threshold': [0.1, 0.25, 0.5, 1.0],
+        'svc_sell_threshold': [-0.1, -0.25, -0.5, -1.0],
+    }),
+    (trading_strategies.SoftMax, {
+        'beta': [0.25, 0.5, 1.0, 2.0, 4.0, 8.0],
+        'thresholds': [THRESHOLDS, NARROW_THRESHOLDS, WIDE_THRESHOLDS],
+    }),
+]
+
+def expand_grid(grid):
+    """Turns [(class, {arg: [values]}), ...] into a list of (class, {arg: value}) runs."""
+    runs = []
+    for strategy_class, params in grid:
+        names = list(params)
+        for values in itertools.product(*(params[name] for name in names)):
+            runs.append((strategy_class, dict(zip(names, values))))
+    return runs
+
+def describe_params(params):
+    parts = []
+    for name, value in params.items():
+        if name == 'thresholds':
+            value = "/".join(f"{threshold:g}" for _, threshold in value)
+        parts.append(f"{name}={value}")
+    return ", ".join(parts)
+
+# --- Shared read-only data ---
+def share_grid(grid, directory):
+    """
+    Saves the grid's arrays as .npy files that workers memory-map. Returns the layout
+    load_shared_grid needs (the days and tickers are small and sent as they are).
+    """
+    arrays = {'row_index': grid.row_index, 'present': grid.present, 'probabilities': grid.probabilities}
+    arrays.update({f"values_{i}": values for i, values in enumerate(grid.values.values())})
+    files = dict()
+    for name, array in arrays.items():
+        if array is not None:
+            files[name] = os.path.join(directory, f"{name}.npy")
+            np.save(files[name], array)
+    return {'days': grid.days, 'tickers': grid.tickers, 'columns': list(grid.values), 'files': files}
+
+def load_shared_grid(layout):
+    """Maps the grid's arrays read-only; nothing is copied into the worker."""
+    arrays = {name: np.load(path, mmap_mode='r') for name, path in layout['files'].items()}
+    values = {column: arrays[f"values_{i}"] for i, column in enumerate(layout['columns'])}
+    return trading_strategies.Grid(layout['days'], layout['tickers'], arrays['row_index'], values,
+                                   probabilities=arrays.get('probabilities'), present=arrays['present'])
+
+shared_grid = None
+shared_feature_cols = None
+
+def init_worker(layout, feature_cols):
+    global shared_grid, shared_feature_cols
+    shared_grid = load_shared_grid(layout)
+    shared_feature_cols = feature_cols
+
+def run_one(strategy_class, params):
+    strategy = strategy_class(**params)
+    # SoftMax reads the parent's probabilities from the grid instead of running the model again
+    result = strategy.run(None, shared_feature_cols, None, None, grid=shared_grid)
+    result.insert(1, 'params', describe_params(params))
+    return result
+
+def run_sweep(grid, model, feature_cols, scaler, test_data, workers=WORKERS, rank_by=RANK_BY, probabilities=None):
+    """
+    Backtests every combination in grid on test_data and returns one table of their
+    metrics(), best first by rank_by. test_data needs a 'signal' column for Svm.
+    probabilities: the model's class probabilities for test_data, if already computed.
+    """
+    runs = expand_grid(grid)
+    if probabilities is None:
+        probabilities = trading_strategies.class_probabilities(model, scaler, feature_cols, test_data)
+
+    columns = ['Adj Close']
+    for strategy_class, _ in grid:
+        columns += [c for c in strategy_class.columns if c not in columns]
+    data_grid = trading_strategies.Grid.build(test_data, columns, probabilities)
+
+    print(f"Running {len(runs)} strategy combinations on {workers} workers...")
+    with tempfile.TemporaryDirectory() as shared_dir:
+        layout = share_grid(data_grid, shared_dir)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(layout, feature_cols)) as executor:
+            futures = [executor.submit(run_one, strategy_class, params) for strategy_class, params in runs]
+            results = [future.result() for future in futures]
+
+    table = pd.concat(results, ignore_index=True)
+    table = table.sort_values(rank_by, ascending=False, kind='mergesort', ignore_index=True)
+    table.insert(0, 'rank', range(1, len(table) + 1))
+    return table
+
+if __name__ == "__main__":
+    data_file = sys.argv[1] if len(sys.argv) > 1 else DATA_FILE
+    data_path = os.path.join(DATA_DIR, data_file)
+    try:
+        data = storage.read_table(data_path, csv_path=f"{data_path}.csv", parse_dates=['date'])
+        print(f"Successfully loaded {data_path}")
+    except FileNotFoundError:
+        print(f"Error: '{data_path}' not found.")
+        exit()
+
+    feature_cols = list(FEATURE_COLS)
+
+    try:
+        model, scaler, metadata = model_registry.load_model(MODEL_NAME, sys.argv[2] if len(sys.argv) > 2 else "latest")
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        exit()
+    if metadata is not None:
+        feature_cols = metadata['feature_cols']
+
+    # The predicted class is the most likely one, so one predict_proba covers both
+    probabilities = trading_strategies.class_probabilities(model, scaler, feature_cols, data)
+    data["signal"] = model.classes_[probabilities.argmax(axis=1)]
+
+    results = run_sweep(SWEEP_GRID, model, feature_cols, scaler, data, probabilities=probabilities)
+
+    print(results.to_string(index=False))
+
+    output_file = os.path.join(SCRIPT_DIR, "sweep_results.csv")
+    results.to_csv(output_file, index=False)
+    print(f"\n💾 Ranked results saved to: {output_file}")
@@ -2,17 +2,65 @@ import pandas as pd
 import numpy as np
 import math
 
+class Grid:
+    """
+    test_data pivoted into dense day x ticker arrays, so it can be built once and run by
+    many strategies (the arrays may also be memory-mapped, see strategy_sweep.py).
+    row_index holds the position in test_data of each day's row for each ticker (the
+    first one if there are several), or -1 when the ticker has no row that day.
+    values[column] is a day x ticker float array of test_data[column], NaN where there
+    is no row. probabilities, if given, are the model's class probabilities for every
+    row of test_data (in its order), read through row_index.
+    """
+    def __init__(self, days, tickers, row_index, values, probabilities=None, present=None):
+        self.days = days
+        self.tickers = tickers
+        self.row_index = row_index
+        self.present = present if present is not None else row_index >= 0
+        self.values = values
+        self.probabilities = probabilities
+
+    @classmethod
+    def build(cls, test_data, columns, probabilities=None):
+        dates = pd.to_datetime(test_data['date'])
+        days = pd.date_range(start=dates.min(), end=dates.max())
+        # Tickers in the order they first trade
+        tickers = pd.unique(test_data['ticker'].to_numpy()[np.argsort(dates.to_numpy(), kind='stable')])
+
+        day_positions = days.get_indexer(dates)
+        ticker_positions = pd.Index(tickers).get_indexer(test_data['ticker'])
+
+        keep = (day_positions >= 0) & test_data['ticker'].notna().to_numpy()
+        keep &= ~pd.DataFrame({'day': day_positions, 'ticker': ticker_positions}).duplicated().to_numpy()
+
+        row_index = np.full((len(days), len(tickers)), -1, dtype=np.int64)
+        row_index[day_positions[keep], ticker_positions[keep]] = np.flatnonzero(keep)
+        present = row_index >= 0
+
+        values = dict()
+        for column in columns:
+            column_values = test_data[column].to_numpy(dtype=float)
+            values[column] = np.where(present, column_values[row_index], np.nan)
+        return cls(days, tickers, row_index, values, probabilities, present)
+
 # --- Strategy 1: The SVM Model's Predictions ---
 
 class Strategy:
+    # Columns of test_data (besides 'Adj Close') that the allocation rule reads
+    columns = []
+
     def __init__(self):
         self.daily_portfolio_values = list()
     
     # The default is to trade each stock individually with $100 allotted, but if not this can be changed
-    def run(self, model, feature_cols, scaler, test_data, printing=False):
+    def run(self, model, feature_cols, scaler, test_data, printing=False, probabilities=None, grid=None):
         """
         Backtests the strategy based on the SVM model's signals.
         'test_data' must include 'ticker', 'date', 'change_day', and 'signal' (the y_pred).
+        probabilities: the model's class probabilities for test_data (see class_probabilities),
+        so several SoftMax runs on the same data predict once. SoftMax predicts them itself
+        when they aren't given.
+        grid: a Grid of test_data with this strategy's columns, used instead of pivoting it again.
         """
         self.model = model
         self.feature_cols = feature_cols
@@ -20,51 +68,57 @@ class Strategy:
         self.printing = printing
         
         print(f"\n--- Running {self.name} Strategy Simulation ---")
-        test_data = test_data.sort_values('date')
-        #test_data["date"] = pd.to_datetime(test_data["date"])
-        #test_data = test_data.dropna(subset=["date"])
-        #if test_data.empty:
-        #    raise Exception("Empty set")
-
-        self.data = test_data
+        self.source_data = test_data
+        if grid is None:
+            grid = Grid.build(test_data, ['Adj Close'] + self.columns, probabilities)
+        elif probabilities is not None:
+            grid = Grid(grid.days, grid.tickers, grid.row_index, grid.values, probabilities, grid.present)
+        self.shared_grid = grid
+        self.grid = grid.values
+        self.row_index = grid.row_index
+        self.present = grid.present
         
-        self.tickers = self.data['ticker'].unique()
+        self.tickers = grid.tickers
         tickers_n = len(self.tickers)
         
-        self.cashes = [100 for _ in range(tickers_n)]
-        self.stock_values = [0.0 for _ in range(tickers_n)]
+        # Each ticker's cash and stock value, stepped together as arrays
+        self.cashes = np.full(tickers_n, 100.0)
+        self.stock_values = np.zeros(tickers_n)
         
-        self.first_date = self.data.iloc[0]["date"]
-        self.last_date = self.data.iloc[-1]["date"]
+        self.days = grid.days
+        self.first_date = self.days[0]
+        self.last_date = self.days[-1]
         
-        # Initialize share prices
-        self.share_prices = [0.0 for _ in range(tickers_n)]
-        price_per_ticker = (
-            test_data.sort_values("date")
-                .groupby("ticker")
-                .first()["Adj Close"]
-        )
-        for i, ticker in enumerate(self.tickers):
-            # get() can be None, but it's ok because it won't be used
-            self.share_prices[i] = price_per_ticker.get(ticker)
+        self.prepare()
+        
+        # Initialize share prices with each ticker's first price
+        prices = self.grid['Adj Close']
+        first_day = (~np.isnan(prices)).argmax(axis=0)
+        # Tickers without a price are NaN, but it's ok because they won't be used
+        self.share_prices = np.array(prices[first_day, np.arange(tickers_n)], dtype=float)
         
         # Run simulation
-        for day in pd.date_range(start=self.first_date, end=self.last_date):
-            rows = self.data.loc[self.data["date"] == day]
-            self.update_stocks(rows)
+        for day in range(len(self.days)):
+            present = self.present[day]
+            self.update_stocks(day, present)
             
             old_stock_values = None
             if self.printing:
-                old_stock_values = self.stock_values
+                old_stock_values = self.stock_values.copy()
                 print("=========================")
-                print(f"PROBABILITIES FOR {day}:")
-            self.trade_day(rows)
+                print(f"PROBABILITIES FOR {self.days[day]}:")
+            if present.any():
+                self.cashes, self.stock_values = self.allocate(day, present, self.cashes, self.stock_values)
             
             if self.printing:
                 self.print_trades(old_stock_values)
 
         return self.metrics()
     
+    def prepare(self):
+        """Called once the grid is built, before the first day is simulated."""
+        pass
+    
     # Calculate metrics for this strategy
     def metrics(self):
         results = []
@@ -90,45 +144,22 @@ class Strategy:
         return pd.DataFrame(results)
     
     # Update stock values with changing share prices
-    def update_stocks(self, day_rows):
-        for i, ticker in enumerate(self.tickers):
-            ticker_rows = day_rows.loc[day_rows["ticker"] == ticker]
-            if len(ticker_rows) == 0:
-                continue
-            row = ticker_rows.iloc[0]
-            
-            old_stock_value = self.stock_values[i]
-            old_share_price = self.share_prices[i]
-            
-            # Shares = $ / ($ per share)
-            shares = old_stock_value / old_share_price
-            
-            new_share_price = row["Adj Close"]
-            new_stock_value = shares * new_share_price
-            
-            self.share_prices[i] = new_share_price
-            self.stock_values[i] = new_stock_value
-            
-        self.daily_portfolio_values.append(sum(self.stock_values) + sum(self.cashes))
+    def update_stocks(self, day, present):
+        new_share_prices = self.grid['Adj Close'][day, present]
         
-    
-    def trade_day(self, rows):
-        for i, ticker in enumerate(self.tickers):
-            ticker_rows = rows.loc[rows["ticker"] == ticker]
-            if len(ticker_rows) == 0:
-                continue
-            row = ticker_rows.iloc[0]
-            
-            cash = self.cashes[i]
-            stock_value = self.stock_values[i]
+        # Shares = $ / ($ per share)
+        shares = self.stock_values[present] / self.share_prices[present]
+        
+        self.stock_values[present] = shares * new_share_prices
+        self.share_prices[present] = new_share_prices
             
-            (cash, stock_value) = self.trade_stock(row, cash, stock_value)
-                
-            self.cashes[i] = cash
-            self.stock_values[i] = stock_value
-
+        self.daily_portfolio_values.append(float(self.stock_values.sum() + self.cashes.sum()))
     
-    def trade_stock(self, row, cash, stock_value):
+    def allocate(self, day, present, cashes, stock_values):
+        """
+        Trades one day. present marks the tickers with a row that day; only those may trade.
+        Returns the new (cashes, stock_values) arrays.
+        """
         raise Exception("Not defined")
         
     def print_trades(self, old_stock_values):
@@ -149,36 +180,30 @@ class Strategy:
 
 # Make trade based on SVM signal
 class Svm(Strategy):
+    columns = ['signal']
+
     def __init__(self):
         super().__init__()
         self.super_bid = 0.20
         self.small_bid = 0.10
         self.name = "SVM Model"
 
-    def trade_stock(self, row, cash, stock_value):
-        signal = row["signal"]
+    def allocate(self, day, present, cashes, stock_values):
+        signal = self.grid['signal'][day]
         
-        if signal == 0:
-            return (cash, stock_value)
+        trading = present & (signal != 0)
+        quantity = np.where(np.abs(signal) == 1, self.small_bid, self.super_bid)
         
-        quantity = 0
-        if abs(signal) == 1:
-            quantity = self.small_bid
-        else:
-            quantity = self.super_bid
+        buy = trading & (signal > 0)
+        sell = trading & ~(signal > 0)
         
-        if signal > 0:
-            # Buy
-            trade = cash * quantity
-            cash -= trade
-            stock_value += trade
-        else:
-            # Sell
-            trade = stock_value * quantity
-            stock_value -= trade
-            cash += trade
+        # Buy: move a share of the cash into stock. Sell: move a share of the stock into cash
+        buy_trade = cashes * quantity
+        sell_trade = stock_values * quantity
+        new_cashes = np.where(buy, cashes - buy_trade, np.where(sell, cashes + sell_trade, cashes))
+        new_stock_values = np.where(buy, stock_values + buy_trade, np.where(sell, stock_values - sell_trade, stock_values))
             
-        return (cash, stock_value)
+        return (new_cashes, new_stock_values)
     
 # --- Strategy 2: The "Buy and Hold" Benchmark ---
 
@@ -187,36 +212,37 @@ class BuyAndHold(Strategy):
         super().__init__()
         self.name = "Buy and Hold"
 
-    def trade_stock(self, row, cash, stock_value):
-        if cash > 0:
-            stock_value += cash
-            cash = 0
+    def allocate(self, day, present, cashes, stock_values):
+        buy = present & (cashes > 0)
+        new_stock_values = np.where(buy, stock_values + cashes, stock_values)
+        new_cashes = np.where(buy, 0.0, cashes)
         
-        return (cash, stock_value)
+        return (new_cashes, new_stock_values)
 
 # --- Strategy 3: Raw SVC Signal (Bonus) ---
 
 class RawSvc(Strategy):
+    columns = ['svc']
+
     def __init__(self, svc_buy_threshold=0.5, svc_sell_threshold=-0.5):
         super().__init__()
         self.svc_buy = svc_buy_threshold
         self.svc_sell = svc_sell_threshold
         self.name = "Raw SVC"
 
-    def trade_stock(self, row, cash, stock_value):
+    def allocate(self, day, present, cashes, stock_values):
         # Trade based on raw SVC, not the SVM signal
-        svc = row['svc']
-                
-        if svc > self.svc_buy: # Buy
-            trade_amount = cash * 0.10
-            cash -= trade_amount
-            stock_value += trade_amount
-        elif svc < self.svc_sell: # Sell
-            trade_amount = stock_value * 0.10
-            stock_value -= trade_amount
-            cash += trade_amount
+        svc = self.grid['svc'][day]
+        
+        buy = present & (svc > self.svc_buy)
+        sell = present & ~buy & (svc < self.svc_sell)
         
-        return (cash, stock_value)
+        buy_amount = cashes * 0.10
+        sell_amount = stock_values * 0.10
+        new_cashes = np.where(buy, cashes - buy_amount, np.where(sell, cashes + sell_amount, cashes))
+        new_stock_values = np.where(buy, stock_values + buy_amount, np.where(sell, stock_values - sell_amount, stock_values))
+        
+        return (new_cashes, new_stock_values)
 
 # Default expected growth for a class: Geometric mean of minimum and maximum growth
 def default_expected_growth(thresholds):
@@ -239,6 +265,14 @@ def default_expected_growth(thresholds):
         growth[-i-1] = (-expected_growth, neg_limits)
     return growth
 
+def class_probabilities(model, scaler, feature_cols, test_data):
+    """
+    Returns the model's class probabilities for every row of test_data (in its order),
+    scaled and predicted in one batched call. Pass them to Strategy.run when several
+    SoftMax strategies run on the same model and test data.
+    """
+    return model.predict_proba(scaler.transform(test_data[feature_cols]))
+
 # A strategy that uses the Random Forest's probabilities of each class of growth
 class SoftMax(Strategy):
     # expected growth for each class
@@ -253,58 +287,45 @@ class SoftMax(Strategy):
         self.beta = beta
         self.name = f"SoftMax beta={beta}"
         
-    def trade_day(self, rows):
-        # Prepare for total reorganization of assets
+    def prepare(self):
+        self.probabilities = self.shared_grid.probabilities
+        if self.probabilities is None:
+            self.probabilities = class_probabilities(self.model, self.scaler, self.feature_cols, self.source_data)
+        
+    def allocate(self, day, present, cashes, stock_values):
+        # Total reorganization of the assets of every stock with data present
+        tickers = np.flatnonzero(present)
+        probs = self.probabilities[self.row_index[day, tickers]]
+        
+        expected_returns = np.zeros(len(tickers))
+        for classs, (growth, limits) in sorted(self.expected_growth.items()):
+            index = classs + len(self.thresholds)
+            growth_rate = 1.0 + growth
+            expected_returns += growth_rate * probs[:, index]
+        
+        # The weight given to each stock
+        weights = np.exp(expected_returns * self.beta)
+        total_weight = weights.sum()
+        if self.printing:
+            self.print_probabilities(tickers, probs)
         
-        # A dictionary representing the weight given to each stock
-        weights = dict()
-        total_weight = 0
-        total_assets = 0
-        for i, ticker in enumerate(self.tickers):
-            ticker_rows = rows.loc[rows["ticker"] == ticker]
-            if len(ticker_rows) == 0:
-                continue
-            
-            row = ticker_rows.iloc[[0]]
-            
-            row_features = row[self.feature_cols]
-            row_scaled = self.scaler.transform(row_features)
-            probs = self.model.predict_proba(row_scaled)[0]
-            if self.printing:
-                print(f"{ticker}:")
-            
-            expected_returns = 0
-            for classs, (growth, limits) in sorted(self.expected_growth.items()):
-                index = classs + len(self.thresholds)
-                probability = probs[index]
-                
-                if self.printing:
-                    g = growth * 100
-                    (a,b) = limits
-                    print(f"{probability} chance of growth rate ~{g}% (btwn {a} and {b})")
-                
-                growth_rate = 1.0 + growth
-                
-                expected_returns += growth_rate * probability
-                
-            weight = math.exp(expected_returns * self.beta)
-            # Keys for stock in "weights" are their index in self.tickers
-            weights[i] = weight
-            total_weight += weight
-            
-            # Reorganize all assets in stocks with data present
-            total_assets += self.stock_values[i]
-            total_assets += self.cashes[i]
-            self.stock_values[i] = 0
-            self.cashes[i] = 0
-            
         if total_weight == 0:
-            return
+            return (cashes, stock_values)
         
-        for stock_index, weight in weights.items():
-            proportion = weight / total_weight
-            investment = total_assets * proportion
-            self.stock_values[stock_index] = investment
+        total_assets = stock_values[tickers].sum() + cashes[tickers].sum()
         
-        #print(str(sum(self.stock_values)))
-
+        new_cashes = cashes.copy()
+        new_stock_values = stock_values.copy()
+        new_cashes[tickers] = 0
+        new_stock_values[tickers] = total_assets * (weights / total_weight)
+        
+        return (new_cashes, new_stock_values)
+    
+    def print_probabilities(self, tickers, probs):
+        for ticker, ticker_probs in zip(self.tickers[tickers], probs):
+            print(f"{ticker}:")
+            for classs, (growth, limits) in sorted(self.expected_growth.items()):
+                probability = ticker_probs[classs + len(self.thresholds)]
+                g = growth * 100
+                (a,b) = limits
+                print(f"{probability} chance of growth rate ~{g}% (btwn {a} and {b})")
@@ -0,0 +1,190 @@
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score
+import os
+import sys
+import glob
+import shutil
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import trading_strategies
+
+# --- Walk-forward retraining and evaluation for the Random Forest ---
+# Instead of rf_full.py's single 80/20 split, the model is retrained every RETRAIN_WEEKS
+# and predicts only the following RETRAIN_WEEKS. The predictions of all folds are stitched
+# into one continuous backtest. Folds train in parallel. Each fold's scaled feature matrices
+# are cached on disk under a hash of the rows they were built from, so after new data is
+# added only the windows that contain it are rebuilt.
+
+INPUT_FILE = "full_full_data"
+
+END_DATE = "2021-01-01"
+
+# Retrain every RETRAIN_WEEKS, predicting the next RETRAIN_WEEKS
+RETRAIN_WEEKS = 4
+# "expanding": train on all data before the test window; "sliding": only the last TRAIN_WEEKS
+WINDOW = "expanding"
+TRAIN_WEEKS = 52
+# The first model is trained on at least this much data
+INITIAL_TRAIN_WEEKS = 26
+
+N_ESTIMATORS = 500
+WORKERS = os.cpu_count()
+
+SCRIPT_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..")
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+CACHE_DIR = os.path.join(SCRIPT_DIR, "walk_forward_cache")
+
+FULL = os.path.join(DATA_DIR, INPUT_FILE)
+
+sys.path.append(ROOT_DIR)
+from common import storage
+from common.labeling import THRESHOLDS, FEATURE_COLS
+
+# Every class the model can predict, in predict_proba column order
+ALL_CLASSES = np.arange(-len(THRESHOLDS), len(THRESHOLDS) + 1)
+
+feature_cols = list(FEATURE_COLS)
+
+def make_folds(start, end):
+    """Returns (train_start, test_start, test_end) for each fold; test windows tile [start + initial, end)."""
+    folds = []
+    test_start = start + pd.Timedelta(weeks=INITIAL_TRAIN_WEEKS)
+    while test_start < end:
+        test_end = min(test_start + pd.Timedelta(weeks=RETRAIN_WEEKS), end)
+        if WINDOW == "sliding":
+            train_start = max(start, test_start - pd.Timedelta(weeks=TRAIN_WEEKS))
+        else:
+            train_start = start
+        folds.append((train_start, test_start, test_end))
+        test_start = test_end
+    return folds
+
+# --- Cached feature matrices ---
+def window_key(train, test):
+    """Hash of everything a fold's matrices depend on: the feature columns and the rows' values."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\0".join(feature_cols).encode("utf-8"))
+    for part in (train[feature_cols + ['target']], test[feature_cols]):
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def fold_matrices(train, test):
+    """
+    Returns the cache directory holding X_train, y_train and X_test (scaled with a scaler
+    fit on the training window) for this fold, building it if it isn't cached yet.
+    """
+    path = os.path.join(CACHE_DIR, window_key(train, test))
+    if os.path.isdir(path):
+        return path, True
+
+    scaler = StandardScaler()
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "X_train.npy"), scaler.fit_transform(train[feature_cols]))
+    np.save(os.path.join(tmp_path, "y_train.npy"), train['target'].to_numpy())
+    np.save(os.path.join(tmp_path, "X_test.npy"), scaler.transform(test[feature_cols]))
+    # Renamed into place only once complete, so a crash never leaves a partial entry
+    os.replace(tmp_path, path)
+    return path, False
+
+def train_fold(matrices_path):
+    """Trains one fold's model and returns its class probabilities for the test window."""
+    # Memory-mapped, so the parent's matrices are not copied into every worker
+    X_train = np.load(os.path.join(matrices_path, "X_train.npy"), mmap_mode='r')
+    y_train = np.load(os.path.join(matrices_path, "y_train.npy"), mmap_mode='r')
+    X_test = np.load(os.path.join(matrices_path, "X_test.npy"), mmap_mode='r')
+
+    model = RandomForestClassifier(n_estimators=N_ESTIMATORS, random_state=42, n_jobs=1)
+    model.fit(X_train, y_train)
+
+    # A window may not contain every class, so spread the columns over ALL_CLASSES
+    probs = np.zeros((len(X_test), len(ALL_CLASSES)))
+    probs[:, np.searchsorted(ALL_CLASSES, model.classes_)] = model.predict_proba(X_test)
+    return probs
+
+if __name__ == "__main__":
+    try:
+        data = storage.read_table(FULL, csv_path=f"{FULL}.csv", parse_dates=['date'])
+        print(f"Successfully loaded {FULL}")
+    except FileNotFoundError:
+        print(f"Error: '{FULL}' not found.")
+        exit()
+
+    data["date"] = pd.to_datetime(data["date"], errors="coerce")
+    data = data.sort_values(["date"], kind="mergesort").reset_index(drop=True)
+
+    # Start 3 months in to have three-month rolling sums used in Buyer Change and Trade Direction
+    start = data.iloc[0]["date"] + pd.DateOffset(months=3)
+    end = pd.Timestamp(END_DATE)
+    folds = make_folds(start, end)
+    if not folds:
+        print("Error: Not enough data for a single walk-forward fold.")
+        exit()
+    print(f"{len(folds)} folds: retraining every {RETRAIN_WEEKS} weeks on a {WINDOW} window.")
+
+    # Build (or reuse) every fold's feature matrices
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    used_folds = []
+    fold_paths = []
+    fold_rows = []
+    reused = 0
+    for train_start, test_start, test_end in folds:
+        train = data[(data["date"] >= train_start) & (data["date"] < test_start)]
+        test = data[(data["date"] >= test_start) & (data["date"] < test_end)]
+        if train.empty or test.empty:
+            continue
+        path, cached = fold_matrices(train, test)
+        used_folds.append((train_start, test_start, test_end))
+        fold_paths.append(path)
+        fold_rows.append(test.index.to_numpy())
+        reused += cached
+    print(f"Feature matrices: {reused} reused from cache, {len(fold_paths) - reused} built.")
+
+    # Entries from older data or settings are no longer needed
+    for old_path in glob.glob(os.path.join(CACHE_DIR, "*")):
+        if old_path not in fold_paths:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+    print(f"Training {len(fold_paths)} folds on {WORKERS} workers...")
+    with ProcessPoolExecutor(max_workers=WORKERS) as executor:
+        fold_probs = list(executor.map(train_fold, fold_paths))
+
+    # --- Stitch the folds into one test set ---
+    test_data = data.iloc[np.concatenate(fold_rows)].copy()
+    probs = np.concatenate(fold_probs)
+    test_data['signal'] = ALL_CLASSES[probs.argmax(axis=1)]
+
+    print("\n" + "="*30)
+    print("   Walk-Forward Evaluation")
+    print("="*30)
+    for (train_start, test_start, test_end), rows, p in zip(used_folds, fold_rows, fold_probs):
+        accuracy = accuracy_score(data.loc[rows, 'target'], ALL_CLASSES[p.argmax(axis=1)])
+        print(f"{test_start.date()} - {test_end.date()}: {len(rows)} samples, accuracy {accuracy * 100:.2f}%")
+    print(f"Overall accuracy: {accuracy_score(test_data['target'], test_data['signal']) * 100:.2f}%")
+
+    print("\n" + "="*60)
+    print("-----------BACKTESTING WITH 100 AGAINST B&H--------------")
+    print("="*60)
+
+    results = list()
+    STRATEGIES = [
+        trading_strategies.Svm(),
+        trading_strategies.BuyAndHold(),
+        trading_strategies.RawSvc(),
+        trading_strategies.SoftMax(beta=0.5, thresholds=THRESHOLDS),
+        trading_strategies.SoftMax(beta=1.0, thresholds=THRESHOLDS),
+        trading_strategies.SoftMax(beta=2.0, thresholds=THRESHOLDS)
+    ]
+    for strategy in STRATEGIES:
+        # SoftMax reads the stitched fold probabilities instead of a single model's
+        res = strategy.run(None, feature_cols, None, test_data, probabilities=probs)
+        results.append(res)
+
+    all_results = pd.concat(results, ignore_index=True)
+    print(all_results)
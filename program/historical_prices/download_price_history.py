@@ -1,8 +1,39 @@
-import yfinance as yf
 import pandas as pd
 import os
-import time
-import numpy as np
+import sys
+from fetch_scheduler import FetchScheduler
+from price_sources import YFinanceSource, HttpSource, FileSource
+
+# --- Download daily prices for every NASDAQ ticker ---
+# Usage: python3 download_price_history.py [--full] [--from-file <dataset or CSV>] [--from-url <url>]
+# Prices are stored per ticker (historical_prices/Ticker=<ticker>.parquet). Each run only
+# asks for the bars from every ticker's last stored day on and merges them in; tickers
+# without any stored bars are downloaded from START_DATE. --full downloads everything
+# again. --from-file replays bars from a saved dataset instead of Yahoo Finance (offline);
+# --from-url downloads from fake_quote_server.py.
+# Downloads run on WORKERS threads, together never starting more than REQUESTS_PER_SECOND
+# ticker requests per second. Failed batches are retried ticker by ticker.
+# Afterwards the price features of the new days are added to price_features/.
+
+START_DATE = "2008-01-01"
+FULL_DOWNLOAD = '--full' in sys.argv
+SOURCE_FILE = sys.argv[sys.argv.index('--from-file') + 1] if '--from-file' in sys.argv[:-1] else None
+SOURCE_URL = sys.argv[sys.argv.index('--from-url') + 1] if '--from-url' in sys.argv[:-1] else None
+
+WORKERS = 8
+REQUESTS_PER_SECOND = 2
+BATCH_SIZE = 10
+MAX_RETRIES = 4
+
+SCRIPT_DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common import storage, price_features
+
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, 'historical_prices')
+OUTPUT_CSV = f"{OUTPUT_DIR}.csv"
+
+# Adjusted prices of a day may change later (dividends, splits) by less than this
+ADJUSTMENT_TOLERANCE = 1e-6
 
 def get_nasdaq_symbols_from_local_file():
     """
@@ -26,80 +57,123 @@ def get_nasdaq_symbols_from_local_file():
         print(f"Error: '{screener_path}' not found. Make sure it's in the root folder.")
         return []
 
+def stored_last_dates(path):
+    """
+    Returns {ticker: last stored date}, taken from each partition's Parquet statistics
+    so no price data is read.
+    """
+    return {ticker: pd.Timestamp(last) for ticker, last in storage.partition_max(path, 'Ticker', 'date').items()}
+
+def merge_bars(stored, new):
+    """
+    Appends new bars to a ticker's stored bars. The first new bar is the last stored day
+    again: if Yahoo has re-adjusted it since (a dividend or split), the stored history is
+    rescaled by the same factor so it stays consistent with the new bars.
+    """
+    stored = stored.copy()
+    overlap = stored.merge(new, on='date', suffixes=('', '_new'))
+    if not overlap.empty:
+        row = overlap.iloc[-1]
+        if row['Adj Close'] > 0 and abs(row['Adj Close_new'] / row['Adj Close'] - 1) > ADJUSTMENT_TOLERANCE:
+            stored['Adj Close'] *= row['Adj Close_new'] / row['Adj Close']
+        if row['Close'] > 0 and abs(row['Close_new'] / row['Close'] - 1) > ADJUSTMENT_TOLERANCE:
+            # Close (and Open/High/Low) are split-adjusted; volumes are scaled the other way
+            ratio = row['Close_new'] / row['Close']
+            stored[['Open', 'High', 'Low', 'Close']] *= ratio
+            stored['Volume'] /= ratio
+
+    merged = pd.concat([stored, new], ignore_index=True)
+    merged = merged.drop_duplicates(subset=['date'], keep='last')
+    return merged.sort_values('date').reset_index(drop=True)
+
+def report_failed(source):
+    failed = source.scheduler.failed if source.scheduler is not None else []
+    if failed:
+        print(f"⚠️ {len(failed)} tickers could not be downloaded and were left as they were: {', '.join(failed[:20])}"
+              + (" ..." if len(failed) > 20 else ""))
+
+def update_price_features(full=False):
+    # Only the new days' features are computed (all of them after a full download)
+    updated, new_rows = price_features.update_features(OUTPUT_DIR, full=full)
+    print(f"✅ {new_rows} price feature rows added for {updated} tickers in: {price_features.FEATURES_DIR}")
+
+def full_download(source, tickers):
+    print(f"Downloading historical data for {len(tickers)} tickers from {START_DATE} to present...")
+    full_data = source.download(tickers, pd.Timestamp(START_DATE))
+    report_failed(source)
+    if full_data.empty:
+        print("No data was downloaded for any ticker.")
+        return
+
+    # One Parquet file per ticker
+    storage.write_table(full_data, OUTPUT_DIR, partition_by='Ticker', csv_path=OUTPUT_CSV)
+    print(f"✅ All historical price data from {START_DATE} saved to: {OUTPUT_DIR}")
+    update_price_features(full=True)
+
+def incremental_download(source, tickers):
+    last_dates = stored_last_dates(OUTPUT_DIR)
+    today = pd.Timestamp.today().normalize()
+
+    # Tickers are downloaded together with the others that need the same days
+    starts = dict()
+    for ticker in tickers:
+        start = last_dates.get(ticker, pd.Timestamp(START_DATE))
+        if ticker in last_dates and start >= today:
+            continue
+        starts.setdefault(start, []).append(ticker)
+
+    up_to_date = len(tickers) - sum(len(group) for group in starts.values())
+    print(f"{len(last_dates)} tickers stored, {up_to_date} already up to date.")
+    if not starts:
+        return
+
+    updated = 0
+    new_rows = 0
+    for start, group in sorted(starts.items()):
+        print(f"Downloading {len(group)} tickers from {start.date()}...")
+        bars = source.download(group, start)
+        report_failed(source)
+        for ticker, new in bars.groupby('Ticker', sort=False):
+            if ticker in last_dates:
+                stored = storage.read_table(OUTPUT_DIR, partitions={'Ticker': ticker})
+                merged = merge_bars(stored, new)
+                # Only the last stored day came back, unchanged
+                if merged.equals(stored):
+                    continue
+                added = len(merged) - len(stored)
+            else:
+                merged = new.sort_values('date').reset_index(drop=True)
+                added = len(merged)
+            storage.write_partition(merged, OUTPUT_DIR, 'Ticker', ticker)
+            updated += 1
+            new_rows += added
+
+    print(f"✅ Added {new_rows} new bars, {updated} tickers updated in: {OUTPUT_DIR}")
+    if storage.EXPORT_CSV:
+        storage.export_csv(storage.read_table(OUTPUT_DIR), OUTPUT_CSV)
+    update_price_features()
+
 # --- Main Execution ---
 if __name__ == "__main__":
     tickers = get_nasdaq_symbols_from_local_file()
-    
+
     if not tickers:
         print("No tickers to download. Exiting.")
         exit()
-        
-    print(f"Downloading historical data for {len(tickers)} tickers from 2008-01-01 to present...")
 
-    chunk_size = 50
-    all_data_frames = [] 
-    
     try:
-        for i in range(0, len(tickers), chunk_size):            
-            chunk = tickers[i:i + chunk_size]
-            print(f"--- Downloading Batch {i//chunk_size + 1}/{(len(tickers)//chunk_size) + 1} ({len(chunk)} tickers) ---")
-            
-            data = yf.download(
-                chunk, 
-                start="2008-01-01", 
-                interval="1d", 
-                auto_adjust=False, 
-                threads=False 
-            )
-            
-            if data.empty:
-                print("No data for this batch, skipping.")
-                continue
-
-            # --- Process data *inside* the loop ---
-            price_cols = ['Adj Close', 'Close', 'High', 'Low', 'Open', 'Volume']
-            data = data.loc[:, data.columns.get_level_values(0).isin(price_cols)]
-            
-            # --- FIX 1: Removed dropna=False ---
-            data_long_chunk = data.stack(future_stack=True).reset_index()
-            
-            # Rename columns
-            data_long_chunk.rename(columns={'level_1': 'Ticker', 'Date': 'date'}, inplace=True)
-            
-            # --- FIX 2: Filter out bad ticker rows (like '0.0') ---
-            # Keep only rows where the 'ticker' is in our original requested list
-            data_long_chunk = data_long_chunk[data_long_chunk['Ticker'].isin(chunk)]
-            
-            all_data_frames.append(data_long_chunk)
-            
-            print("Sleeping for 1 second to avoid rate-limiting...")
-            time.sleep(1)
-
-        if not all_data_frames:
-            print("No data was downloaded for any ticker.")
-            exit()
-
-        print("\nAll batches downloaded. Combining all processed chunks...")
-        full_data = pd.concat(all_data_frames, ignore_index=True)
-        
-        print("Cleaning processed data...")
-        
-        expected_cols = ['Ticker', 'date', 'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
-        
-        for col in expected_cols:
-            if col not in full_data.columns:
-                full_data[col] = np.nan
-                
-        # --- FIX 3: Remove rows where all price data is missing ---
-        # This removes the "0.0,2008-01-02,,,,,,," rows
-        full_data.dropna(subset=['Open', 'High', 'Low', 'Close', 'Volume'], how='all', inplace=True)
-        
-        full_data = full_data[expected_cols]
-        
-        output_file = os.path.join(os.path.dirname(__file__), 'historical_prices.csv')
-        
-        full_data.to_csv(output_file, index=False)
-        print(f"✅ All historical price data from 2008 saved to: {output_file}")
+        scheduler = FetchScheduler(workers=WORKERS, rate=REQUESTS_PER_SECOND, batch_size=BATCH_SIZE, max_retries=MAX_RETRIES)
+        if SOURCE_FILE:
+            source = FileSource(SOURCE_FILE)
+        elif SOURCE_URL:
+            source = HttpSource(SOURCE_URL, scheduler)
+        else:
+            source = YFinanceSource(scheduler)
+
+        if FULL_DOWNLOAD or not storage.dataset_exists(OUTPUT_DIR):
+            full_download(source, tickers)
+        else:
+            incremental_download(source, tickers)
 
     except Exception as e:
-        print(f"\nAn error occurred during download or processing: {e}")
\ No newline at end of file
+        print(f"\nAn error occurred during download or processing: {e}")
@@ -0,0 +1,103 @@
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPT_DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common import storage
+
+# --- Local stand-in for the quote API, to test the fetch scheduler ---
+# Usage: python3 fake_quote_server.py <dataset or CSV of bars>
+# Serves GET /bars?tickers=A,B&start=YYYY-MM-DD as CSV from the given bars, like
+# HttpSource expects. It behaves like a busy API: every request takes LATENCY_MS per
+# ticker, FAILURE_RATE of requests fail with HTTP 500, and above RATE_LIMIT requests per
+# second it answers 429 with a Retry-After.
+# Then: python3 download_price_history.py --from-url http://127.0.0.1:8766
+
+HOST = "127.0.0.1"
+PORT = 8766
+
+LATENCY_MS = 20
+FAILURE_RATE = 0.05
+# Requests per second over a sliding second; 0 turns the limit off
+RATE_LIMIT = 20
+RETRY_AFTER = 1
+
+class QuoteHandler(BaseHTTPRequestHandler):
+    # Set before the server starts
+    bars = None
+    recent = []
+    lock = threading.Lock()
+
+    def over_limit(self):
+        with self.lock:
+            now = time.monotonic()
+            QuoteHandler.recent = [t for t in QuoteHandler.recent if now - t < 1]
+            if RATE_LIMIT and len(QuoteHandler.recent) >= RATE_LIMIT:
+                return True
+            QuoteHandler.recent.append(now)
+            return False
+
+    def send_text(self, status, text, content_type="text/plain", headers=None):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != "/bars":
+            self.send_text(404, "Unknown path")
+            return
+        if self.over_limit():
+            self.send_text(429, "Too many requests", headers={'Retry-After': str(RETRY_AFTER)})
+            return
+
+        query = urllib.parse.parse_qs(url.query)
+        tickers = query.get('tickers', [""])[0].split(",")
+        start = pd.Timestamp(query.get('start', ["1900-01-01"])[0])
+
+        time.sleep(LATENCY_MS / 1000 * len(tickers))
+        if random.random() < FAILURE_RATE:
+            self.send_text(500, "Internal error")
+            return
+
+        frames = [self.bars[t] for t in tickers if t in self.bars]
+        result = pd.concat(frames) if frames else pd.DataFrame(columns=['Ticker', 'date'])
+        result = result[result['date'] >= start]
+        self.send_text(200, result.to_csv(index=False), "text/csv")
+
+    def log_message(self, format, *args):
+        pass
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 fake_quote_server.py <dataset or CSV of bars>")
+        exit()
+    path = sys.argv[1]
+    try:
+        bars = storage.read_table(path, csv_path=path if path.endswith(".csv") else f"{path}.csv", parse_dates=['date'])
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        exit()
+    bars['date'] = pd.to_datetime(bars['date'])
+    QuoteHandler.bars = {ticker: part for ticker, part in bars.groupby('Ticker')}
+
+    ThreadingHTTPServer.request_queue_size = 128
+    server = ThreadingHTTPServer((HOST, PORT), QuoteHandler)
+    server.daemon_threads = True
+    print(f"Serving {len(QuoteHandler.bars)} tickers on http://{HOST}:{PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+        server.server_close()
@@ -0,0 +1,128 @@
+import heapq
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common.rate_limit import TokenBucket, RateLimited, backoff_delay
+
+# --- Concurrent, rate-limited fetching of price bars ---
+# Tickers are fetched in batches by a pool of worker threads. Every request takes one
+# token per ticker from a shared token bucket, so the pool never goes over the rate
+# limit however many workers there are. When a batch fails, its tickers are re-queued
+# one by one so a single bad ticker can't sink the other 49; a ticker that keeps failing
+# (or that a successful answer leaves out) is retried with exponential backoff and given
+# up on after max_retries.
+
+class FetchScheduler:
+    def __init__(self, workers=8, rate=2.0, burst=None, batch_size=10, max_retries=4, backoff=1.0, max_backoff=60.0):
+        self.workers = workers
+        # A batch takes one token per ticker at once, so the bucket must hold a whole batch
+        self.bucket = TokenBucket(rate, max(burst if burst is not None else rate, batch_size))
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def timed_fetch(self, fetch, tickers, start):
+        self.bucket.acquire(len(tickers))
+        began = time.perf_counter()
+        try:
+            return fetch(tickers, start), None, time.perf_counter() - began
+        except Exception as e:
+            return None, e, time.perf_counter() - began
+
+    def run(self, fetch, tickers, start):
+        """
+        Calls fetch(batch, start) for batches of tickers and returns all bars in one frame
+        (with a 'Ticker' column). Tickers that still failed after every retry are listed in
+        self.failed afterwards, and the run's numbers in self.stats.
+        """
+        # Each task is (tickers, attempt)
+        queue = deque((tuple(tickers[i:i + self.batch_size]), 0) for i in range(0, len(tickers), self.batch_size))
+        # Retries waiting out their backoff: (ready time, order, task)
+        delayed = []
+        running = dict()
+        frames = []
+        latencies = []
+        self.failed = []
+        retries = 0
+        order = 0
+        n_batches = len(queue)
+        began = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while queue or delayed or running:
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    queue.append(heapq.heappop(delayed)[2])
+
+                while queue and len(running) < self.workers:
+                    task = queue.popleft()
+                    running[executor.submit(self.timed_fetch, fetch, task[0], start)] = task
+
+                if not running:
+                    time.sleep(max(0, delayed[0][0] - time.monotonic()))
+                    continue
+                timeout = max(0, delayed[0][0] - time.monotonic()) if delayed else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    batch, attempt = running.pop(future)
+                    bars, error, latency = future.result()
+                    latencies.append(latency)
+
+                    if error is None:
+                        frames.append(bars)
+                        missing = set(batch) - set(bars['Ticker'] if 'Ticker' in bars.columns else [])
+                        if len(batch) > 1 or not missing:
+                            print(f"Batch of {len(batch)} ({batch[0]}..): {len(bars)} bars in {latency:.2f}s")
+                            # Tickers missing from a batch's answer get requests of their own, with the usual retries
+                            for ticker in sorted(missing):
+                                queue.append(((ticker,), attempt))
+                            continue
+                        # A ticker's own request without bars is retried like a failed one
+                        error = f"no bars for {batch[0]}"
+
+                    if isinstance(error, RateLimited):
+                        # Everyone slows down, not just this worker
+                        self.bucket.pause(error.retry_after or backoff_delay(attempt + 1, self.backoff, self.max_backoff))
+
+                    if len(batch) > 1:
+                        print(f"Batch of {len(batch)} ({batch[0]}..) failed ({error}), retrying its tickers one by one")
+                        for ticker in batch:
+                            queue.append(((ticker,), attempt))
+                    elif attempt < self.max_retries:
+                        delay = backoff_delay(attempt + 1, self.backoff, self.max_backoff)
+                        retries += 1
+                        order += 1
+                        heapq.heappush(delayed, (time.monotonic() + delay, order, (batch, attempt + 1)))
+                    else:
+                        print(f"Giving up on {batch[0]}: {error}")
+                        self.failed.append(batch[0])
+
+        elapsed = time.perf_counter() - began
+        bars = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Ticker'])
+        fetched = len(set(bars['Ticker']) & set(tickers))
+        self.stats = {
+            'tickers': len(tickers),
+            'fetched': fetched,
+            'batches': n_batches,
+            'requests': len(latencies),
+            'retries': retries,
+            'failed': len(self.failed),
+            'bars': len(bars),
+            'seconds': elapsed,
+            'latency_p50': np.percentile(latencies, 50) if latencies else 0,
+            'latency_p99': np.percentile(latencies, 99) if latencies else 0,
+        }
+        print(f"Fetched {fetched}/{len(tickers)} tickers ({len(bars)} bars) in {elapsed:.1f}s: "
+              f"{len(tickers) / elapsed if elapsed else 0:.1f} tickers/s, {len(bars) / elapsed if elapsed else 0:.0f} bars/s, "
+              f"{len(latencies)} requests (p50 {self.stats['latency_p50']:.2f}s, p99 {self.stats['latency_p99']:.2f}s), "
+              f"{retries} retries, {len(self.failed)} failed")
+        return bars
@@ -0,0 +1,128 @@
+import os
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+import numpy as np
+import pandas as pd
+from fetch_scheduler import FetchScheduler
+
+SCRIPT_DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common import storage
+from common.rate_limit import RateLimited
+
+# --- Where daily price bars come from ---
+# download_price_history.py only calls source.download(tickers, start), which returns
+# one row per ticker and day with BAR_COLUMNS, dates on or after start. YFinanceSource
+# is the real one; HttpSource talks to fake_quote_server.py, and FileSource replays bars
+# saved on disk so the downloader can run offline.
+
+BAR_COLUMNS = ['Ticker', 'date', 'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+def clean_bars(bars, tickers):
+    """Keeps the requested tickers' rows with BAR_COLUMNS and drops days without any price."""
+    for col in BAR_COLUMNS:
+        if col not in bars.columns:
+            bars[col] = np.nan
+    bars = bars[bars['Ticker'].isin(tickers)]
+    # Removes the "0.0,2008-01-02,,,,,,," rows
+    bars = bars.dropna(subset=['Open', 'High', 'Low', 'Close', 'Volume'], how='all')
+    bars = bars[BAR_COLUMNS].copy()
+    bars['date'] = pd.to_datetime(bars['date']).dt.tz_localize(None).dt.normalize()
+    return bars.reset_index(drop=True)
+
+class PriceSource:
+    """Fetches bars through a FetchScheduler; subclasses define fetch(tickers, start)."""
+    def __init__(self, scheduler=None):
+        self.scheduler = scheduler if scheduler is not None else FetchScheduler()
+
+    def fetch(self, tickers, start):
+        """Returns the bars of a few tickers in any order, or raises if the request failed."""
+        raise Exception("Not defined")
+
+    def download(self, tickers, start):
+        bars = self.scheduler.run(self.fetch, list(tickers), start)
+        if bars.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        bars = clean_bars(bars, tickers)
+        # Yahoo returns the whole day the start falls on even if it was asked for later
+        return bars[bars['date'] >= start].reset_index(drop=True)
+
+class YFinanceSource(PriceSource):
+    """
+    Downloads bars from Yahoo Finance. yf.download shares state between calls in older
+    yfinance versions, so each worker asks for its tickers one by one with Ticker.history
+    (yf.download makes one request per ticker as well).
+    """
+    def __init__(self, scheduler=None):
+        super().__init__(scheduler)
+        # Imported here so offline runs don't need yfinance installed
+        import yfinance
+        self.yf = yfinance
+        exceptions = getattr(yfinance, 'exceptions', None)
+        self.rate_limit_error = getattr(exceptions, 'YFRateLimitError', None)
+
+    def fetch(self, tickers, start):
+        frames = []
+        for ticker in tickers:
+            try:
+                data = self.yf.Ticker(ticker).history(
+                    start=start.strftime("%Y-%m-%d"),
+                    interval="1d",
+                    auto_adjust=False,
+                    actions=False,
+                    raise_errors=True
+                )
+            except Exception as e:
+                if self.rate_limit_error is not None and isinstance(e, self.rate_limit_error):
+                    raise RateLimited(str(e))
+                raise
+            if data.empty:
+                continue
+            data = data.reset_index().rename(columns={'Date': 'date'})
+            data['Ticker'] = ticker
+            frames.append(data)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=BAR_COLUMNS)
+
+class HttpSource(PriceSource):
+    """
+    Downloads bars as CSV from GET <url>/bars?tickers=A,B&start=YYYY-MM-DD, the API
+    fake_quote_server.py serves, to test the scheduler without Yahoo.
+    """
+    def __init__(self, url, scheduler=None, timeout=30):
+        super().__init__(scheduler)
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def fetch(self, tickers, start):
+        query = urllib.parse.urlencode({'tickers': ",".join(tickers), 'start': start.strftime("%Y-%m-%d")})
+        try:
+            with urllib.request.urlopen(f"{self.url}/bars?{query}", timeout=self.timeout) as response:
+                return pd.read_csv(response, parse_dates=['date'])
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                retry_after = e.headers.get("Retry-After")
+                raise RateLimited("HTTP 429", float(retry_after) if retry_after else None)
+            raise
+
+class FileSource(PriceSource):
+    """
+    Serves bars from a saved dataset or CSV (e.g. a copy of historical_prices) as if
+    they were downloaded, so the incremental downloader can be tested without network.
+    Everything is read at once, without the scheduler.
+    """
+    def __init__(self, path):
+        self.scheduler = None
+        self.path = path
+
+    def download(self, tickers, start):
+        bars = storage.read_table(
+            self.path,
+            partitions={'Ticker': list(tickers)},
+            filters=[('Ticker', 'in', list(tickers))],
+            csv_path=self.path if self.path.endswith(".csv") else f"{self.path}.csv",
+            parse_dates=['date']
+        )
+        bars = clean_bars(bars, tickers)
+        return bars[bars['date'] >= start].reset_index(drop=True)
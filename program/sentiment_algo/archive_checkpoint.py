@@ -0,0 +1,82 @@
+import glob
+import json
+import os
+import pandas as pd
+
+# --- Resumable per-archive checkpoints for reddit_archive_parser ---
+# Each archive gets a directory of append-only Parquet part files holding the rows
+# extracted so far, plus a small JSON state file recording how far into the
+# decompressed stream those rows go. Both are written atomically (temp file + rename),
+# and the state is only advanced after its part file is on disk.
+
+ROW_COLUMNS = ['created_utc', 'ticker', 'sentiment_score']
+
+def write_atomic(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    with open(tmp_path, 'rb') as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+class ArchiveCheckpoint:
+    def __init__(self, checkpoint_dir, archive_path):
+        name = os.path.basename(archive_path)
+        self.archive_path = archive_path
+        self.parts_dir = os.path.join(checkpoint_dir, name)
+        self.state_file = os.path.join(checkpoint_dir, f"{name}.json")
+        os.makedirs(self.parts_dir, exist_ok=True)
+
+        stat = os.stat(archive_path)
+        self.identity = {'size': stat.st_size, 'mtime': stat.st_mtime}
+        self.state = self.load()
+
+    def fresh_state(self):
+        return {**self.identity, 'offset': 0, 'lines': 0, 'rejected': 0, 'matches': 0, 'parts': 0, 'done': False}
+
+    def load(self):
+        state = None
+        if os.path.exists(self.state_file):
+            with open(self.state_file) as fh:
+                state = json.load(fh)
+            # The archive was replaced since the checkpoint, so start it over
+            if state.get('size') != self.identity['size'] or state.get('mtime') != self.identity['mtime']:
+                state = None
+        if state is None:
+            state = self.fresh_state()
+
+        # Part files past the recorded count were written by a run that crashed
+        # before it could update the state; their lines will be read again
+        for path in self.part_paths():
+            if self.part_index(path) >= state['parts']:
+                os.remove(path)
+        return state
+
+    def part_paths(self):
+        return sorted(glob.glob(os.path.join(self.parts_dir, 'part-*.parquet')))
+
+    def part_index(self, path):
+        return int(os.path.basename(path)[len('part-'):-len('.parquet')])
+
+    def save(self, rows, offset, lines, rejected, matches, done=False):
+        """
+        Appends rows (a dict of equal-length column lists) as a new part file,
+        then records that everything up to the decompressed byte offset is processed.
+        """
+        if rows['ticker']:
+            part_path = os.path.join(self.parts_dir, f"part-{self.state['parts']:06d}.parquet")
+            part = pd.DataFrame({column: rows[column] for column in ROW_COLUMNS})
+            write_atomic(part_path, lambda p: part.to_parquet(p, index=False))
+            self.state['parts'] += 1
+
+        self.state.update(offset=offset, lines=lines, rejected=rejected, matches=matches, done=done)
+
+        def write_state(p):
+            with open(p, 'w') as fh:
+                json.dump(self.state, fh)
+        write_atomic(self.state_file, write_state)
+
+    def read_rows(self):
+        parts = [pd.read_parquet(path) for path in self.part_paths()]
+        if not parts:
+            return pd.DataFrame({column: [] for column in ROW_COLUMNS})
+        return pd.concat(parts, ignore_index=True)
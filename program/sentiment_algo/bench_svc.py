@@ -0,0 +1,69 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+import svc
+
+# --- Microbenchmark: shared SVC kernel vs. the groupby().apply it replaced ---
+# Usage: python3 bench_svc.py [tickers] [years]
+# Builds a synthetic daily frame (one row per ticker and day) and times each method.
+
+TICKERS = 5000
+YEARS = 5
+REPEATS = 3
+
+def synthetic_daily(tickers, years):
+    rng = np.random.default_rng(0)
+    days = pd.date_range('2020-01-01', periods=365 * years, freq='D')
+    names = np.array([f"T{i:04d}" for i in range(tickers)])
+    return pd.DataFrame({
+        'ticker': np.repeat(names, len(days)),
+        'timestamp': np.tile(days, tickers),
+        'mean_sentiment': rng.random(tickers * len(days)) - 0.5,
+        'comment_count': rng.poisson(3, tickers * len(days)),
+    })
+
+# The per-ticker function signal_generator used before
+def old_calculate_svc(group):
+    group['sentiment_change'] = group['mean_sentiment'].diff()
+    group['volume_change'] = group['comment_count'].diff().abs()
+    group['svc'] = group['sentiment_change'] * group['volume_change']
+    return group
+
+def old_method(daily):
+    return daily.set_index(['ticker', 'timestamp']).groupby(level=0, group_keys=False).apply(old_calculate_svc).reset_index()
+
+def grouped_diff(daily):
+    daily = daily.sort_values(['ticker', 'timestamp'], kind='mergesort').reset_index(drop=True)
+    grouped = daily.groupby('ticker', sort=False)
+    daily['sentiment_change'] = grouped['mean_sentiment'].diff()
+    daily['volume_change'] = grouped['comment_count'].diff().abs()
+    daily['svc'] = daily['sentiment_change'] * daily['volume_change']
+    return daily
+
+def bench(label, method, daily, repeats=REPEATS):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = method(daily)
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms   {len(daily) / elapsed:14.0f} rows/s")
+    return elapsed, result
+
+if __name__ == "__main__":
+    tickers = int(sys.argv[1]) if len(sys.argv) > 1 else TICKERS
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else YEARS
+
+    daily = synthetic_daily(tickers, years)
+    print(f"Benchmarking {len(daily)} rows ({tickers} tickers x {years} years)\n")
+
+    old, old_result = bench("groupby().apply", old_method, daily, repeats=1)
+    diff, diff_result = bench("grouped diff", grouped_diff, daily)
+    new, new_result = bench("svc.calculate_svc", svc.calculate_svc, daily)
+    print(f"\nSpeedup vs apply: grouped diff {old / diff:.1f}x, svc.calculate_svc {old / new:.1f}x")
+
+    columns = ['sentiment_change', 'volume_change', 'svc']
+    same = all(
+        np.allclose(old_result[columns].to_numpy(dtype=float), other[columns].to_numpy(dtype=float), equal_nan=True)
+        for other in (diff_result, new_result)
+    )
+    print(f"Results match: {same}")
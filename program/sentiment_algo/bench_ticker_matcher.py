@@ -0,0 +1,108 @@
+import glob
+import os
+import re
+import sys
+import time
+import pandas as pd
+from ticker_matcher import TickerMatcher, load_symbols
+
+# --- Microbenchmark: shared TickerMatcher vs. the per-script regexes it replaced ---
+# Usage: python3 bench_ticker_matcher.py [csv files...]
+# Defaults to every scraped comment in the daily_comments/ dataset (plus the CSVs of days
+# scraped before the switch to Parquet) and every tweet file in daily_tweets/.
+
+SCRIPT_DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common import storage
+
+COMMENTS_DIR = os.path.join(SCRIPT_DIR, 'daily_comments')
+TWEETS_DIR = os.path.join(SCRIPT_DIR, 'daily_tweets')
+REPEATS = 5
+TEXT_COLUMNS = ['comment_body', 'text']
+
+BANNED_LIST = {'AI', 'FOR', 'IT', 'GF', 'OP', 'YOU', 'WAY', 'USA', 'IQ'}
+
+# The regexes previously used by scrape_reddit/sentiment_analyzer and by reddit_archive_parser
+old_scraper_regex = re.compile(r'(?<!\b[A-Z]{2}\s)(?<!\b[A-Z]{3}\s)(?<!\b[A-Z]{4}\s)(?<!\b[A-Z]{5}\s)(\b(?:\$[A-Z]{1,5}|[A-Z]{2,5})\b)(?!\s[A-Z]{2,}\b)')
+old_archive_regex = re.compile(r'\b\$?([A-Z]{2,5})\b')
+
+def csv_day(path):
+    """The day of a 'YY-MM-DD.csv' comment file, as its date= partition value."""
+    return pd.to_datetime(os.path.basename(path)[:8], format='%y-%m-%d')
+
+def frame_texts(df):
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            # Exploded files repeat each comment once per ticker
+            return list(df[column].dropna().astype(str).unique())
+    return []
+
+def load_corpus(paths):
+    texts = []
+    for path in paths:
+        texts.extend(frame_texts(pd.read_csv(path)))
+    return texts
+
+def load_comments():
+    """Every scraped comment: the Parquet partitions and the CSVs of days that have none."""
+    try:
+        df = storage.read_table(COMMENTS_DIR, columns=['comment_body'],
+                                csv_path=os.path.join(COMMENTS_DIR, '*.csv'), csv_partition=csv_day)
+    except FileNotFoundError:
+        return []
+    return frame_texts(df)
+
+def old_find(regex, symbols, text):
+    found = set()
+    for match in regex.findall(text):
+        clean = match.replace('$', '')
+        if clean in symbols:
+            found.add(clean)
+    return found
+
+def bench(label, find, texts):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for text in texts:
+            find(text)
+    elapsed = (time.perf_counter() - start) / REPEATS
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms   {len(texts) / elapsed:12.0f} texts/s")
+    return elapsed
+
+if __name__ == "__main__":
+    if sys.argv[1:]:
+        texts = load_corpus(sys.argv[1:])
+        source = f"{len(sys.argv) - 1} files"
+    else:
+        tweet_paths = glob.glob(os.path.join(TWEETS_DIR, '*.csv'))
+        texts = load_comments() + load_corpus(tweet_paths)
+        source = f"{COMMENTS_DIR} and {len(tweet_paths)} tweet files"
+    if not texts:
+        print("Error: No comments found. Run scrape_reddit.py first or pass CSV files with a 'comment_body' or 'text' column.")
+        exit()
+
+    symbols = load_symbols() - BANNED_LIST
+    print(f"Benchmarking {len(texts)} texts from {source} against {len(symbols)} symbols ({REPEATS} runs each)\n")
+
+    start = time.perf_counter()
+    scraper_matcher = TickerMatcher(symbols, skip_caps_runs=True)
+    archive_matcher = TickerMatcher(symbols, cashtags=False)
+    print(f"Built both matchers in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print("Scraper rules (skip all-caps runs):")
+    old = bench("  old regex + set lookups", lambda t: old_find(old_scraper_regex, symbols, t), texts)
+    new = bench("  TickerMatcher", scraper_matcher.find, texts)
+    print(f"  Speedup: {old / new:.2f}x\n")
+
+    print("Archive rules:")
+    old = bench("  old regex + set lookups", lambda t: old_find(old_archive_regex, symbols, t), texts)
+    new = bench("  TickerMatcher", archive_matcher.find, texts)
+    print(f"  Speedup: {old / new:.2f}x\n")
+
+    # Single-letter cashtags ($F) are the only intended difference
+    differences = sum(
+        1 for t in texts
+        if old_find(old_scraper_regex, symbols, t) != {s for s in scraper_matcher.find(t) if len(s) > 1}
+        or old_find(old_archive_regex, symbols, t) != set(archive_matcher.find(t))
+    )
+    print(f"Texts where results differ: {differences}")
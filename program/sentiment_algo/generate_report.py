@@ -7,6 +7,10 @@ import ollama
 import matplotlib.pyplot as plt
 import io 
 import glob
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from common import storage
 
 # --- Configuration ---
 # SIGNALS_FILE_PATH = f"/daily_signals/{date.today().strftime('%y-%m-%d')}_signals.csv"
@@ -195,23 +199,19 @@ if __name__ == "__main__":
     # generate_weekly_summary(main_df)
     # generate_historical_report(main_df)
     # print("\nAll reports generated successfully.")
+    # Signals of days saved before the switch to Parquet are read from the latest CSV
     list_of_files = glob.glob(os.path.join(SIGNALS_DIR, '*_signals.csv')) # Use underscore
-    if not list_of_files:
-        print(f"Error: No signal files found in the '{SIGNALS_DIR}' directory.")
-        exit()
-
-    latest_file = max(list_of_files, key=os.path.getctime)
-    print(f"Using the latest signals file: {latest_file}")
+    latest_file = max(list_of_files, key=os.path.getctime) if list_of_files else None
 
     try:
-        main_df = pd.read_csv(latest_file)
+        main_df = storage.read_table(SIGNALS_DIR, csv_path=latest_file, csv_partition='timestamp', parse_dates=['timestamp'])
         main_df['timestamp'] = pd.to_datetime(main_df['timestamp'])
-        print(f"Successfully loaded {latest_file}")
+        print(f"Successfully loaded signals from {SIGNALS_DIR}")
     except FileNotFoundError:
-        print(f"Error: The latest signals file '{latest_file}' could not be loaded.")
+        print(f"Error: No signal data found in the '{SIGNALS_DIR}' directory.")
         exit()
     except Exception as e:
-        print(f"Error loading or parsing {latest_file}: {e}")
+        print(f"Error loading or parsing signals from {SIGNALS_DIR}: {e}")
         exit()
 
     generate_weekly_summary(main_df.copy()) 
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Local mock of twitterapi.io's advanced_search, to test scrape_twitter.py ---
+# Usage: python3 mock_twitter_api.py
+# Then:  SAS_TWITTER_API_URL=http://127.0.0.1:8767 python3 scrape_twitter.py
+# Answers GET /twitter/tweet/advanced_search like the real API: TWEETS_PER_TICKER made-up
+# tweets (always the same ones) for every ticker in the query, newest first, PAGE_SIZE per
+# page. Like the real API, a cursor only reaches MAX_CURSOR_PAGES pages deep, so the rest
+# has to be fetched again with max_id (which includes the tweet with that id). It takes
+# LATENCY_MS per request and answers 429 above RATE_LIMIT requests per second.
+
+HOST = "127.0.0.1"
+PORT = 8767
+
+TWEETS_PER_TICKER = 12
+PAGE_SIZE = 20
+MAX_CURSOR_PAGES = 3
+LATENCY_MS = 50
+# Requests per second over a sliding second; 0 turns the limit off
+RATE_LIMIT = 10
+RETRY_AFTER = 1
+
+SOURCES = ["CNBC", "Bloomberg", "Reuters", "WSJ", "MarketWatch"]
+WORDS = ["beats estimates", "misses on revenue", "upgraded", "downgraded", "rallies", "slides", "guidance raised"]
+
+def ticker_tweets(ticker):
+    """The mock's tweets that mention ticker, as (id, tweet) pairs."""
+    seed = int(hashlib.md5(ticker.encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    tweets = []
+    for i in range(TWEETS_PER_TICKER):
+        tweet_id = seed * 1000 + i
+        created = now - timedelta(minutes=rng.randint(0, 24 * 60))
+        tweets.append((tweet_id, {
+            'id': str(tweet_id),
+            'text': f"${ticker} {rng.choice(WORDS)}",
+            'createdAt': created.strftime("%a %b %d %H:%M:%S %z %Y"),
+            'author': {'userName': rng.choice(SOURCES)},
+        }))
+    return tweets
+
+def search(query, max_id=None):
+    """All tweets matching query (with an optional max_id), newest (highest id) first."""
+    tickers_part = re.match(r"\(([^)]*)\)", query)
+    tickers = tickers_part.group(1).split(" OR ") if tickers_part else []
+
+    tweets = dict()
+    for ticker in tickers:
+        for tweet_id, tweet in ticker_tweets(ticker.strip()):
+            if max_id is None or tweet_id <= max_id:
+                tweets[tweet_id] = tweet
+    return [tweets[i] for i in sorted(tweets, reverse=True)]
+
+class SearchHandler(BaseHTTPRequestHandler):
+    recent = []
+    lock = threading.Lock()
+    requests_served = 0
+    rate_limited = 0
+
+    def over_limit(self):
+        with SearchHandler.lock:
+            now = time.monotonic()
+            SearchHandler.recent = [t for t in SearchHandler.recent if now - t < 1]
+            if RATE_LIMIT and len(SearchHandler.recent) >= RATE_LIMIT:
+                SearchHandler.rate_limited += 1
+                return True
+            SearchHandler.recent.append(now)
+            SearchHandler.requests_served += 1
+            return False
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path == "/stats":
+            self.send_json(200, {'requests': SearchHandler.requests_served, 'rate_limited': SearchHandler.rate_limited})
+            return
+        if url.path != "/twitter/tweet/advanced_search":
+            self.send_json(404, {'error': "Unknown path"})
+            return
+        if not self.headers.get("x-api-key"):
+            self.send_json(401, {'error': "Missing x-api-key"})
+            return
+        if self.over_limit():
+            self.send_json(429, {'error': "Too many requests"}, headers={'Retry-After': str(RETRY_AFTER)})
+            return
+
+        time.sleep(LATENCY_MS / 1000)
+        params = urllib.parse.parse_qs(url.query)
+        query = params.get('query', [""])[0]
+        # A cursor continues the search it came from, max_id included: "<max_id>:<page>"
+        cursor = params.get('cursor', [""])[0]
+        if cursor:
+            max_id, page = cursor.split(":")
+            max_id = int(max_id) if max_id else None
+            page = int(page)
+        else:
+            found = re.search(r"max_id:(\d+)", query)
+            max_id = int(found.group(1)) if found else None
+            page = 0
+
+        tweets = search(query, max_id)
+        page_tweets = tweets[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+        has_next_page = (page + 1) * PAGE_SIZE < len(tweets) and page + 1 < MAX_CURSOR_PAGES
+        self.send_json(200, {
+            'tweets': page_tweets,
+            'has_next_page': has_next_page,
+            'next_cursor': f"{max_id or ''}:{page + 1}" if has_next_page else "",
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+if __name__ == "__main__":
+    ThreadingHTTPServer.request_queue_size = 128
+    server = ThreadingHTTPServer((HOST, PORT), SearchHandler)
+    server.daemon_threads = True
+    print(f"Mock advanced_search on http://{HOST}:{PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+        server.server_close()
@@ -2,11 +2,17 @@ import zstandard as zstd
 import pandas as pd
 import json
 import os
+import sys
 import re
 import io
-from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pysentimiento import create_analyzer
 import numpy as np
+from sentiment_scoring import sentiment_from_probas
+from sentiment_cache import SentimentCache, report_cache_counts
+from ticker_matcher import TickerMatcher, load_symbols
+from archive_checkpoint import ArchiveCheckpoint, ROW_COLUMNS
+import svc
 
 # --- Configuration ---
 SCRIPT_DIR = os.path.dirname(__file__)
@@ -14,10 +20,13 @@ PROJECT_ROOT = os.path.join(SCRIPT_DIR, "..")
 DATA_DIR = os.path.join(PROJECT_ROOT, "..")
 ZST_DIR = os.path.join(DATA_DIR, "reddit-archive")
 
-PRICE_FILE = os.path.join(SCRIPT_DIR, 'historical_prices', 'historical_prices.csv')
-SCREENER_FILE = os.path.join(DATA_DIR, 'nasdaq_screener.csv')
-OUTPUT_FILE = os.path.join(SCRIPT_DIR, 'merged_data.csv')
-CHECKPOINT_FILE = os.path.join(SCRIPT_DIR, 'temp_raw_extracted_sentiment.csv')
+PRICE_FILE = os.path.join(PROJECT_ROOT, 'historical_prices', 'historical_prices')
+OUTPUT_FILE = os.path.join(SCRIPT_DIR, 'merged_data')
+CHECKPOINT_DIR = os.path.join(SCRIPT_DIR, 'archive_checkpoints')
+
+sys.path.append(PROJECT_ROOT)
+from common import storage, price_features
+from common.labeling import label_targets
 
 # Banned words to ignore (Common English words that look like tickers)
 BANNED_LIST = {'AI', 'FOR', 'IT', 'GF', 'OP', 'YOU', 'WAY', 'ARE', 'CAN', 'NOW', 'OUT', 'SEE', 'ONE', 'ALL', 'NEW', 'HAS', 'BIG', 'GO', 'UK'}
@@ -25,48 +34,178 @@ BANNED_LIST = {'AI', 'FOR', 'IT', 'GF', 'OP', 'YOU', 'WAY', 'ARE', 'CAN', 'NOW',
 print("--- Starting Historical Data Processing & Append Pipeline ---")
 
 # --- 1. Load Tickers ---
-def get_nasdaq_symbols():
-    try:
-        df = pd.read_csv(SCREENER_FILE)
-        if 'Symbol' in df.columns:
-            all_symbols = set(df['Symbol'].dropna().unique())
-            # Ensure tickers are valid and not in banned list
-            valid_symbols = {s for s in all_symbols if s not in BANNED_LIST and s.isalpha()}
-            print(f"Loaded {len(valid_symbols)} valid tickers.")
-            return valid_symbols
-    except Exception as e:
-        print(f"Error loading tickers: {e}")
-        return set()
-
-NASDAQ_SYMBOLS = get_nasdaq_symbols()
-
-# --- NEW: Simplified Regex ---
 # Finds "$AAPL" or just "AAPL". We rely on the BANNED_LIST to filter noise.
-ticker_regex = re.compile(r'\b\$?([A-Z]{2,5})\b')
+ticker_matcher = TickerMatcher(load_symbols(), banned=BANNED_LIST, cashtags=False)
+NASDAQ_SYMBOLS = ticker_matcher.symbols
+if not NASDAQ_SYMBOLS:
+    print("Could not load NASDAQ symbols. Exiting.")
+    exit()
+print(f"Loaded {len(NASDAQ_SYMBOLS)} valid tickers.")
+
+# --- Prefilter on raw (undecoded) lines ---
+# Any ticker the matcher above can find is a run of 2-5 capital letters with no capital
+# letter on either side, so a line with no such run in the symbol list can be skipped
+# before json.loads. Only \uXXXX escapes can glue extra capitals (hex digits) onto a run,
+# so they are blanked out first. The prefilter can let extra lines through, never drop one.
+raw_ticker_regex = re.compile(rb'(?<![A-Z])[A-Z]{2,5}(?![A-Z])')
+unicode_escape_regex = re.compile(rb'\\u[0-9A-Fa-f]{4}')
+NASDAQ_SYMBOL_BYTES = {s.encode('ascii') for s in NASDAQ_SYMBOLS}
+
+def may_mention_ticker(raw_line):
+    if b'\\u' in raw_line:
+        raw_line = unicode_escape_regex.sub(b' ', raw_line)
+    for token in raw_ticker_regex.findall(raw_line):
+        if token in NASDAQ_SYMBOL_BYTES:
+            return True
+    return False
 
 # --- 2. Initialize Sentiment Analyzer ---
-print("Initializing BERTweet analyzer...")
-analyzer = create_analyzer(task="sentiment", lang="en")
+# Each process (the main one or a pool worker) creates its own analyzer and cache connection
+analyzer = None
+sentiment_cache = None
+
+def init_worker(torch_threads=None):
+    global analyzer, sentiment_cache
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    print(f"Initializing BERTweet analyzer (pid {os.getpid()})...")
+    analyzer = create_analyzer(task="sentiment", lang="en")
+    sentiment_cache = SentimentCache()
 
 def calculate_sentiment(text):
     if not text: return 0.0
+    cached = sentiment_cache.get(text)
+    if cached is not None:
+        return cached
     try:
         res = analyzer.predict(text)
-        return (res.probas['POS'] + 0.5 * res.probas['NEU']) - 0.5
+        score = sentiment_from_probas(res.probas)
     except:
         return 0.0
+    sentiment_cache.put(text, score)
+    return score
 
 # --- 3. Process ZST Files ---
+# Number of archive files processed at once. 1 runs everything in this process.
+WORKERS = os.cpu_count() or 1
+# Extracted rows are flushed to disk and the read position recorded this often (in lines)
+CHECKPOINT_EVERY = 500000
+
+def new_row_buffer():
+    return {column: [] for column in ROW_COLUMNS}
+
+def process_zst_file(file_path):
+    """
+    Streams one .zst archive and scores every line that mentions a ticker.
+    Rows go to the archive's checkpoint every CHECKPOINT_EVERY lines, so a rerun
+    continues from the last recorded offset. Returns line/match counts and this
+    process's cache hits and misses.
+    """
+    zst_file = os.path.basename(file_path)
+    checkpoint = ArchiveCheckpoint(CHECKPOINT_DIR, file_path)
+    state = checkpoint.state
+    result = {'file': zst_file, 'cache_hits': 0, 'cache_misses': 0}
+
+    if state['done']:
+        print(f"Skipping {zst_file}: already finished in a previous run.")
+        return {**result, 'lines': state['lines'], 'rejected': state['rejected'], 'matches': state['matches']}
+
+    offset = state['offset']
+    count = state['lines']
+    rejected_count = state['rejected']
+    match_count = state['matches']
+    if offset:
+        print(f"Resuming {zst_file} at line {count} (byte {offset})...")
+    else:
+        print(f"Processing {zst_file}...")
+
+    rows = new_row_buffer()
+    saved_at = count
+    hits_before = sentiment_cache.hits
+    misses_before = sentiment_cache.misses
+
+    with open(file_path, 'rb') as fh:
+        dctx = zstd.ZstdDecompressor()
+        with dctx.stream_reader(fh) as reader:
+            # Decompresses and discards everything before the checkpoint
+            reader.seek(offset)
+            # Read raw bytes; only lines that pass the prefilter get decoded
+            line_stream = io.BufferedReader(reader)
+
+            for line in line_stream:
+                # Save before counting this line, so the checkpoint only covers finished lines
+                if count - saved_at >= CHECKPOINT_EVERY:
+                    sentiment_cache.flush()
+                    checkpoint.save(rows, offset, count, rejected_count, match_count)
+                    rows = new_row_buffer()
+                    saved_at = count
+
+                count += 1
+                offset += len(line)
+                # Status update every 100000 lines
+                if count % 100000 == 0:
+                    print(f"  {zst_file}: Scanned {count} | Matches Found: {match_count} ...")
+
+                if not may_mention_ticker(line):
+                    rejected_count += 1
+                    continue
+
+                try:
+                    obj = json.loads(line)
+
+                    # --- FIX: Check ALL text fields (Title, Body, Selftext) ---
+                    parts = [obj.get('title', ''), obj.get('selftext', ''), obj.get('body', '')]
+                    # Join them, filter out None/Deleted, convert to upper case for regex
+                    body = " ".join([p for p in parts if p and p != '[deleted]' and p != '[removed]'])
+
+                    if not body.strip():
+                        continue
+
+                    # Find tickers
+                    found_tickers = ticker_matcher.find(body)
+
+                    if found_tickers:
+                        match_count += 1
+                        sentiment = calculate_sentiment(body)
+                        created_utc = int(obj.get('created_utc', 0))
+
+                        for ticker in found_tickers:
+                            rows['created_utc'].append(created_utc)
+                            rows['ticker'].append(ticker)
+                            rows['sentiment_score'].append(sentiment)
+                except Exception:
+                    continue
+
+    sentiment_cache.flush()
+    checkpoint.save(rows, offset, count, rejected_count, match_count, done=True)
+    print(f"Finished {zst_file}. Scanned {count} lines. Total matches: {match_count}")
+    report_prefilter(zst_file, rejected_count, count)
+
+    return {
+        **result,
+        'lines': count,
+        'rejected': rejected_count,
+        'matches': match_count,
+        'cache_hits': sentiment_cache.hits - hits_before,
+        'cache_misses': sentiment_cache.misses - misses_before,
+    }
+
+def report_prefilter(label, rejected, lines):
+    rate = (rejected / lines * 100) if lines else 0.0
+    print(f"Prefilter ({label}): skipped {rejected} of {lines} lines before JSON decode ({rate:.1f}%)")
+
+def load_checkpointed_rows(file_paths):
+    """Merges the checkpointed rows of every archive into one long dataframe."""
+    df = pd.concat(
+        [ArchiveCheckpoint(CHECKPOINT_DIR, path).read_rows() for path in file_paths],
+        ignore_index=True
+    )
+    # Use timezone-aware UTC
+    df['timestamp'] = pd.to_datetime(df['created_utc'], unit='s', utc=True)
+    return df[['timestamp', 'ticker', 'sentiment_score']]
+
 def process_zst_files():
-    if os.path.exists(CHECKPOINT_FILE):
-        print(f"Found checkpoint file: {CHECKPOINT_FILE}")
-        user_input = input("Do you want to load from checkpoint? (y/n): ").lower()
-        if user_input == 'y':
-            print("Loading checkpoint...")
-            return pd.read_csv(CHECKPOINT_FILE, parse_dates=['timestamp'])
-
-    processed_data = []
-    
     if not os.path.exists(ZST_DIR):
         print(f"Error: Data directory not found at {ZST_DIR}")
         return pd.DataFrame()
@@ -76,71 +215,44 @@ def process_zst_files():
         print(f"No .zst files found in {ZST_DIR}.")
         return pd.DataFrame()
 
-    print(f"Found {len(zst_files)} archive files. Starting extraction...")
+    if os.path.exists(CHECKPOINT_DIR):
+        print(f"Resuming from checkpoints in {CHECKPOINT_DIR} (delete it to start over).")
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
 
-    for zst_file in zst_files:
-        file_path = os.path.join(ZST_DIR, zst_file)
-        print(f"Processing {zst_file}...")
-        
-        match_count = 0
-        
-        with open(file_path, 'rb') as fh:
-            dctx = zstd.ZstdDecompressor()
-            with dctx.stream_reader(fh) as reader:
-                text_stream = io.TextIOWrapper(reader, encoding='utf-8')
-                
-                count = 0
-                for line in text_stream:
-                    count += 1
-                    # Status update every 5000 lines
-                    if count % 5000 == 0:
-                        print(f"  Scanned: {count} | Matches Found: {match_count} ...", end='\r')
-                        
-                    try:
-                        obj = json.loads(line)
-                        
-                        # --- FIX: Check ALL text fields (Title, Body, Selftext) ---
-                        parts = [obj.get('title', ''), obj.get('selftext', ''), obj.get('body', '')]
-                        # Join them, filter out None/Deleted, convert to upper case for regex
-                        body = " ".join([p for p in parts if p and p != '[deleted]' and p != '[removed]'])
-                        
-                        if not body.strip():
-                            continue
-                        
-                        # Find tickers
-                        found_tickers = set()
-                        # Use regex to find potential tickers
-                        matches = ticker_regex.findall(body) # Returns list of groups (the ticker text)
-                        
-                        for match in matches:
-                            clean = match.replace('$', '')
-                            if clean in NASDAQ_SYMBOLS:
-                                found_tickers.add(clean)
-                        
-                        if found_tickers:
-                            match_count += 1
-                            sentiment = calculate_sentiment(body)
-                            created_utc = int(obj.get('created_utc', 0))
-                            # Use timezone-aware UTC
-                            dt = datetime.fromtimestamp(created_utc, timezone.utc)
-                            
-                            for ticker in found_tickers:
-                                processed_data.append({
-                                    'timestamp': dt,
-                                    'ticker': ticker,
-                                    'sentiment_score': sentiment
-                                })
-                    except Exception:
-                        continue
-        print(f"\nFinished {zst_file}. Total matches: {match_count}")
+    # Largest files first so one big dump doesn't start last and run alone
+    file_paths = sorted(
+        (os.path.join(ZST_DIR, f) for f in zst_files),
+        key=os.path.getsize,
+        reverse=True
+    )
+    workers = max(1, min(WORKERS, len(file_paths)))
+    print(f"Found {len(zst_files)} archive files. Starting extraction with {workers} process(es)...")
 
-    df = pd.DataFrame(processed_data)
-    
-    if not df.empty:
-        print(f"Saving checkpoint to {CHECKPOINT_FILE}...")
-        df.to_csv(CHECKPOINT_FILE, index=False)
-        
-    return df
+    file_results = []
+    if workers == 1:
+        init_worker()
+        for file_path in file_paths:
+            file_results.append(process_zst_file(file_path))
+        sentiment_cache.close()
+    else:
+        # Split the cores between workers so torch doesn't oversubscribe them
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(torch_threads,)) as pool:
+            futures = [pool.submit(process_zst_file, path) for path in file_paths]
+            for future in as_completed(futures):
+                file_results.append(future.result())
+
+    report_prefilter(
+        "all files",
+        sum(r['rejected'] for r in file_results),
+        sum(r['lines'] for r in file_results)
+    )
+    report_cache_counts(
+        sum(r['cache_hits'] for r in file_results),
+        sum(r['cache_misses'] for r in file_results)
+    )
+
+    return load_checkpointed_rows(file_paths)
 
 # --- 4. Generate SVC Signals ---
 def generate_signals(df):
@@ -154,26 +266,9 @@ def generate_signals(df):
         mean_sentiment=('sentiment_score', 'mean'),
         comment_count=('sentiment_score', 'count')
     ).reset_index()
-    
-    daily_stats.set_index('timestamp', inplace=True)
-    
-    def calculate_svc(group):
-        group = group.sort_index()
-        group['sentiment_change'] = group['mean_sentiment'].diff()
-        group['volume_change'] = group['comment_count'].diff().abs()
-        group['svc'] = group['sentiment_change'] * group['volume_change']
-        return group
-
-    # Pandas 2.2+ fix for groupby apply
-    try:
-        final_signals = daily_stats.groupby('ticker', include_groups=False).apply(calculate_svc)
-    except TypeError:
-        final_signals = daily_stats.groupby('ticker').apply(calculate_svc)
 
-    if 'ticker' in final_signals.columns:
-        final_signals = final_signals.drop(columns=['ticker'])
-        
-    final_signals = final_signals.reset_index()
+    # Only days with comments are kept here, so changes are between consecutive active days
+    final_signals = svc.calculate_svc(daily_stats)
     final_signals.rename(columns={'timestamp': 'date'}, inplace=True)
     final_signals.replace([np.inf, -np.inf], np.nan, inplace=True)
     final_signals.fillna(0, inplace=True)
@@ -184,34 +279,18 @@ def generate_signals(df):
 def engineer_prices():
     print("Loading and engineering historical price features...")
     try:
-        prices_df = pd.read_csv(PRICE_FILE, parse_dates=['date'])
+        prices_df = storage.read_table(PRICE_FILE, csv_path=f"{PRICE_FILE}.csv", parse_dates=['date'])
     except FileNotFoundError:
         print("Historical prices file not found.")
         return pd.DataFrame()
 
     if 'Ticker' in prices_df.columns:
         prices_df.rename(columns={'Ticker': 'ticker'}, inplace=True)
-        
-    prices_df.sort_values(by=['ticker', 'date'], inplace=True)
-    
-    periods = {
-        'change_day': 1, 'change_week': 5, 'change_month': 21,
-        'change_3mo': 63, 'change_6mo': 126, 'change_9mo': 189, 'change_1yr': 252
-    }
-
-    # Use fill_method=None to avoid FutureWarnings
-    for name, period in periods.items():
-        prices_df[name] = prices_df.groupby('ticker')['Adj Close'].pct_change(periods=period, fill_method=None)
 
-    prices_df['next_day_pct_change'] = prices_df.groupby('ticker')['Adj Close'].pct_change(periods=-1, fill_method=None).shift(1)
-    
-    HOLD_THRESHOLD = 0.02
-    def create_target(pct_change):
-        if pct_change > HOLD_THRESHOLD: return 1
-        elif pct_change < -HOLD_THRESHOLD: return -1
-        else: return 0
+    prices_df = price_features.add_features(prices_df)
 
-    prices_df['target'] = prices_df['next_day_pct_change'].apply(create_target)
+    # Up (1), down (-1) or hold (0) around +/-2%
+    prices_df['target'] = label_targets(prices_df['next_day_pct_change'], [("Hold", 0.02)])
     
     return prices_df
 
@@ -249,7 +328,7 @@ if __name__ == "__main__":
     print(f"New historical dataset size: {len(merged_data)} rows.")
     
     # E. Save
-    merged_data.to_csv(OUTPUT_FILE, index=False)
+    storage.write_table(merged_data, OUTPUT_FILE, csv_path=f"{OUTPUT_FILE}.csv")
     print(f"✅ Created new full dataset at: {OUTPUT_FILE}")
     print(f"Total rows: {len(merged_data)}")
 
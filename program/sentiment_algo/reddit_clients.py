@@ -0,0 +1,71 @@
+import json
+import time
+
+# --- Sources of live Reddit comments for the streaming collector ---
+# A client's stream(subreddits) yields comments as dicts with 'id', 'created_utc',
+# 'body' and 'subreddit', oldest first, until the source ends (replays) or forever.
+# It yields None whenever no new comment is waiting, so the caller can flush what it
+# has. PrawClient reads Reddit; ReplayClient plays back a file recorded with
+# RecordingClient, for tests.
+
+def comment_dict(comment):
+    return {
+        'id': comment.id,
+        'created_utc': comment.created_utc,
+        'body': comment.body,
+        'subreddit': comment.subreddit.display_name,
+    }
+
+class PrawClient:
+    """Streams new comments from Reddit using the praw.ini site (see 4.2)."""
+    def __init__(self, site="bot1"):
+        # Imported here so replays don't need praw or credentials
+        import praw
+        self.reddit = praw.Reddit(site)
+
+    def stream(self, subreddits):
+        # One combined stream polls every subreddit in a single request
+        combined = self.reddit.subreddit("+".join(subreddits))
+        # pause_after=-1 yields None after every poll that found nothing new
+        for comment in combined.stream.comments(pause_after=-1):
+            yield comment_dict(comment) if comment is not None else None
+
+class ReplayClient:
+    """
+    Plays back comments recorded one JSON object per line. speed=0 replays as fast as
+    possible; speed=60 plays an hour of comments in a minute.
+    """
+    def __init__(self, path, speed=0):
+        self.path = path
+        self.speed = speed
+
+    def stream(self, subreddits):
+        wanted = {s.lower() for s in subreddits}
+        previous = None
+        with open(self.path) as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                comment = json.loads(line)
+                if comment['subreddit'].lower() not in wanted:
+                    continue
+                if self.speed and previous is not None and comment['created_utc'] > previous:
+                    yield None
+                    time.sleep((comment['created_utc'] - previous) / self.speed)
+                previous = comment['created_utc']
+                yield comment
+        yield None
+
+class RecordingClient:
+    """Passes another client's comments through, saving them for ReplayClient."""
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+
+    def stream(self, subreddits):
+        with open(self.path, "a") as fh:
+            for comment in self.client.stream(subreddits):
+                if comment is not None:
+                    fh.write(json.dumps(comment) + "\n")
+                    fh.flush()
+                yield comment
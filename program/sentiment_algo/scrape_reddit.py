@@ -2,29 +2,18 @@ import praw
 import pandas as pd
 import time
 import os
-import re
+import sys
 from datetime import date
+from ticker_matcher import TickerMatcher, load_symbols
 
-# --- Function to get NASDAQ symbols from local file ---
-screener_file = 'nasdaq_screener.csv'
-screener_path = os.path.join(os.path.dirname(__file__), '..', 'data', screener_file)
-def get_nasdaq_symbols_from_local_file():
-    try:
-        df = pd.read_csv(screener_path)
-        ticker_column = 'Symbol'
-        if ticker_column in df.columns:
-            return set(df[ticker_column].dropna().unique())
-        else:
-            print(f"Error: Could not find '{ticker_column}' column in {screener_file}.")
-            return set()
-    except FileNotFoundError:
-        print(f"Error: '{screener_file}' not found.")
-        return set()
+SCRIPT_DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common import storage
 
 # --- Configuration ---
 reddit = praw.Reddit("bot1")
 
-NASDAQ_SYMBOLS = get_nasdaq_symbols_from_local_file()
+NASDAQ_SYMBOLS = load_symbols()
 if not NASDAQ_SYMBOLS:
     print("Could not load NASDAQ symbols. Exiting.")
     exit()
@@ -42,7 +31,7 @@ collected_comments = []
 banned_list = ['AI', 'FOR', 'IT', 'GF', 'OP', 'YOU', 'WAY', 'USA', 'IQ']
 print(f"🔥 Starting comment collection from: {', '.join(SUBREDDIT_LIST)}")
 
-ticker_regex = re.compile(r'(?<!\b[A-Z]{2}\s)(?<!\b[A-Z]{3}\s)(?<!\b[A-Z]{4}\s)(?<!\b[A-Z]{5}\s)(\b(?:\$[A-Z]{1,5}|[A-Z]{2,5})\b)(?!\s[A-Z]{2,}\b)')
+ticker_matcher = TickerMatcher(NASDAQ_SYMBOLS, banned=banned_list, skip_caps_runs=True)
 yester_day = time.time() - (24 * 60 * 60)
 total_fetched_overall = 0 # To track total comments checked across all subs
 
@@ -55,20 +44,15 @@ for subreddit_name in SUBREDDIT_LIST:
         for comment in subreddit.comments(limit=COMMENT_FETCH_LIMIT_PER_SUB):
             fetched_in_sub += 1
             if comment.created_utc > yester_day:
-                potential_tickers = ticker_regex.findall(comment.body)
-                mentioned_stocks = set()
-                for ticker in potential_tickers:
-                    clean_ticker = ticker.replace('$', '')
-                    # Check against NASDAQ list AND banned list
-                    if clean_ticker in NASDAQ_SYMBOLS and clean_ticker not in banned_list:
-                        mentioned_stocks.add(clean_ticker)
+                # Only NASDAQ symbols that aren't in the banned list
+                mentioned_stocks = ticker_matcher.find(comment.body)
 
                 if mentioned_stocks:
                     collected_comments.append({
                         'timestamp': pd.to_datetime(comment.created_utc, unit='s'),
                         'comment_id': comment.id,
                         'comment_body': comment.body,
-                        'mentioned_stocks': list(mentioned_stocks),
+                        'mentioned_stocks': mentioned_stocks,
                         'subreddit': subreddit_name 
                     })
                     count_for_sub += 1
@@ -88,11 +72,12 @@ if collected_comments:
     # Explode and rename as before
     df_exploded = df_comments.explode('mentioned_stocks').rename(columns={'mentioned_stocks': 'ticker'})
 
-    today_str = date.today().strftime('%y-%m-%d')
-    output_filename = f"{today_str}.csv"
-    output_path = os.path.join(output_dir, output_filename)
+    today = date.today()
+    today_str = today.strftime('%y-%m-%d')
+    csv_path = os.path.join(output_dir, f"{today_str}.csv")
 
-    df_exploded.to_csv(output_path, index=False)
-    print(f"💾 Data saved to: {output_path}")
+    # One partition per scrape day
+    storage.write_partition(df_exploded, output_dir, 'date', today.strftime('%Y-%m-%d'), csv_path=csv_path)
+    print(f"💾 Data saved to: {output_dir} (date={today.strftime('%Y-%m-%d')})")
 else:
     print("No new relevant comments to save.")
\ No newline at end of file
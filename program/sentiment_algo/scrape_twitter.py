@@ -5,11 +5,25 @@ import re
 from typing import List, Dict
 import json
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 
 # --- Configuration ---
 API_KEY = "new1_100efdfda2834c94b8e7f622c9d73456"
 
+# Base URL of the API. Set SAS_TWITTER_API_URL=http://127.0.0.1:8767 to scrape
+# mock_twitter_api.py instead (no key or credits needed).
+API_URL = os.environ.get("SAS_TWITTER_API_URL", "https://api.twitterapi.io")
+
+# Chunk queries run at once; all of them together stay under REQUESTS_PER_SECOND
+WORKERS = 8
+REQUESTS_PER_SECOND = 5
+# Seconds everyone waits after a 429 without a Retry-After
+RATE_LIMIT_WAIT = 5
+MAX_RATE_LIMIT_RETRIES = 10
+
 # List of high-profile/trustworthy sources
 TRUSTED_SOURCES = [
     "CNBC", "Bloomberg", "Reuters", "FinancialTimes", "WSJ",
@@ -23,6 +37,9 @@ SCRIPT_DIR = os.path.dirname(__file__)
 OUTPUT_DIR = os.path.join(SCRIPT_DIR, "daily_tweets")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common.rate_limit import TokenBucket
+
 # Banned word list (from your scrape_reddit.py)
 BANNED_LIST = {'AI', 'FOR', 'IT', 'GF', 'OP', 'YOU', 'WAY'}
 
@@ -53,14 +70,29 @@ def chunk_list(data, chunk_size):
     for i in range(0, len(data), chunk_size):
         yield data[i:i + chunk_size]
 
+# --- Pooled HTTP connections ---
+# Every worker thread keeps one Session, so its requests reuse open connections
+# instead of connecting (and doing a TLS handshake) for every page.
+thread_sessions = threading.local()
+
+def get_session() -> requests.Session:
+    if not hasattr(thread_sessions, "session"):
+        thread_sessions.session = requests.Session()
+    return thread_sessions.session
+
+# One limit shared by all threads
+rate_limiter = TokenBucket(REQUESTS_PER_SECOND)
+
 # --- Original fetch_all_tweets function from your script ---
 def fetch_all_tweets(query: str, api_key: str) -> List[Dict]:
     """
     Fetches all tweets matching the given query from Twitter API, handling deduplication.
     (This function is from your tw_scraper_v1.py)
+    Safe to call from several threads at once; they share rate_limiter.
     """
-    base_url = "https://api.twitterapi.io/twitter/tweet/advanced_search"
+    base_url = f"{API_URL}/twitter/tweet/advanced_search"
     headers = {"x-api-key": api_key}
+    session = get_session()
     all_tweets = []
     seen_tweet_ids = set()
     cursor = None
@@ -75,11 +107,13 @@ def fetch_all_tweets(query: str, api_key: str) -> List[Dict]:
             params["query"] = f"{query} max_id:{last_min_id}"
 
         retry_count = 0
+        rate_limit_count = 0
         response = None # Define response here to check in finally
         
         while retry_count < max_retries:
             try:
-                response = requests.get(base_url, headers=headers, params=params)
+                rate_limiter.acquire()
+                response = session.get(base_url, headers=headers, params=params, timeout=30)
                 response.raise_for_status()
                 data = response.json()
 
@@ -107,14 +141,19 @@ def fetch_all_tweets(query: str, api_key: str) -> List[Dict]:
                     break
 
             except requests.exceptions.RequestException as e:
+                if getattr(e.response, 'status_code', None) == 429 and rate_limit_count < MAX_RATE_LIMIT_RETRIES:
+                    # Every thread holds off, not just this one; doesn't count as a failed attempt
+                    rate_limit_count += 1
+                    retry_after = e.response.headers.get("Retry-After", "")
+                    wait = float(retry_after) if retry_after.replace(".", "", 1).isdigit() else RATE_LIMIT_WAIT
+                    print(f"Rate limit reached. Waiting for {wait:g} seconds...")
+                    rate_limiter.pause(wait)
+                    continue
+
                 retry_count += 1
                 if retry_count == max_retries:
                     print(f"Failed to fetch tweets after {max_retries} attempts: {str(e)}")
                     return all_tweets
-
-                if hasattr(response, 'status_code') and response.status_code == 429:
-                    print("Rate limit reached. Waiting for 5 seconds...")
-                    time.sleep(5) 
                 else:
                     print(f"Error occurred: {str(e)}. Retrying {retry_count}/{max_retries}")
                     time.sleep(2 ** retry_count)
@@ -141,22 +180,24 @@ def run_daily_scrape():
     ticker_chunks = list(chunk_list(tickers, 30))
     master_tweet_list = []
     
-    print(f"🔥 Starting tweet collection for {len(tickers)} tickers across {len(ticker_chunks)} chunks...")
+    print(f"🔥 Starting tweet collection for {len(tickers)} tickers across {len(ticker_chunks)} chunks ({WORKERS} at a time)...")
 
-    for i, chunk in enumerate(ticker_chunks):
-        print(f"\n--- Processing Chunk {i+1}/{len(ticker_chunks)} ---")
-        
+    def process_chunk(i, chunk):
         tickers_query = " OR ".join(chunk)
         # Build the final query for this chunk
         query = f"({tickers_query}) ({sources_query}) since:{since_date}"
         
-        print(f"Querying for: {query[:150]}...") # Print start of query
-        
         chunk_tweets = fetch_all_tweets(query, API_KEY)
-        print(f"Fetched {len(chunk_tweets)} unique tweets for this chunk.")
-        
-        if chunk_tweets:
-            master_tweet_list.extend(chunk_tweets)
+        print(f"--- Chunk {i+1}/{len(ticker_chunks)}: fetched {len(chunk_tweets)} unique tweets ({query[:60]}...)")
+        return chunk_tweets
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        # map keeps the chunks' order, so the final deduplication keeps the same tweets
+        for chunk_tweets in executor.map(process_chunk, range(len(ticker_chunks)), ticker_chunks):
+            if chunk_tweets:
+                master_tweet_list.extend(chunk_tweets)
+    print(f"Chunks fetched in {time.time() - start_time:.1f}s")
 
     # --- Process and Save All Found Tweets ---
     print(f"\n--- All chunks processed ---")
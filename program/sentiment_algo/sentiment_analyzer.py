@@ -2,7 +2,10 @@ from pysentimiento import create_analyzer
 import pandas as pd
 from datetime import date
 import os
-import re
+import sys
+from sentiment_scoring import score_texts
+from sentiment_cache import SentimentCache
+from ticker_matcher import TickerMatcher, load_symbols
 
 # --- Setup Paths ---
 SCRIPT_DIR = os.path.dirname(__file__)
@@ -13,47 +16,33 @@ TWITTER_INPUT_DIR = os.path.join(SCRIPT_DIR, "daily_tweets")
 OUTPUT_DIR = os.path.join(SCRIPT_DIR, "daily_sentiment")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+sys.path.append(PROJECT_ROOT)
+from common import storage
+
 # --- NASDAQ & Banned List Setup (Needed to find tickers in tweets) ---
 BANNED_LIST = {'AI', 'FOR', 'IT', 'GF', 'OP', 'YOU', 'WAY'}
 
-def get_nasdaq_symbols_from_local_file():
-    screener_path = os.path.join(PROJECT_ROOT, 'data', 'nasdaq_screener.csv')
-    try:
-        df = pd.read_csv(screener_path)
-        ticker_column = 'Symbol'
-        if ticker_column in df.columns:
-            all_symbols = set(df[ticker_column].dropna().unique())
-            valid_symbols = {s for s in all_symbols if s not in BANNED_LIST and s.isalpha()}
-            return valid_symbols
-        else:
-            print(f"Error: Could not find '{ticker_column}' column in {screener_path}.")
-            return set()
-    except FileNotFoundError:
-        print(f"Error: '{screener_path}' not found.")
-        return set()
-
-NASDAQ_SYMBOLS = get_nasdaq_symbols_from_local_file()
-# Regex from your Reddit scraper
-ticker_regex = re.compile(r'(?<!\b[A-Z]{2}\s)(?<!\b[A-Z]{3}\s)(?<!\b[A-Z]{4}\s)(?<!\b[A-Z]{5}\s)(\b(?:\$[A-Z]{1,5}|[A-Z]{2,5})\b)(?!\s[A-Z]{2,}\b)')
+NASDAQ_SYMBOLS = load_symbols()
+if not NASDAQ_SYMBOLS:
+    print("Could not load NASDAQ symbols. Exiting.")
+    exit()
+ticker_matcher = TickerMatcher(NASDAQ_SYMBOLS, banned=BANNED_LIST, skip_caps_runs=True)
 
 # --- Determine today's date ---
 today_str = date.today().strftime('%y-%m-%d')
+today_iso = date.today().strftime('%Y-%m-%d')
 output_file = os.path.join(OUTPUT_DIR, f"{today_str}.csv")
 
 # --- Analyzer Setup ---
 print("Setting up the sentiment analyzer...")
 analyzer = create_analyzer(task="sentiment", lang="en")
 print("Analyzer is ready.")
+sentiment_cache = SentimentCache()
 
-# --- Sentiment Calculation Function ---
-def calculate_sentiment_score(text):
-    if not isinstance(text, str) or not text.strip():
-        return 0.0
-    result = analyzer.predict(text)
-    pos_score = result.probas['POS']
-    neu_score = result.probas['NEU']
-    sentiment_score = (pos_score + 0.5 * neu_score) - 0.5
-    return sentiment_score
+# --- Sentiment Calculation Functions ---
+def calculate_sentiment_scores(texts):
+    # Scores texts in length-sorted batches of sentiment_scoring.BATCH_SIZE; results keep the input order
+    return score_texts(analyzer, texts, cache=sentiment_cache)
 
 # --- Main Processing ---
 all_processed_data = []
@@ -61,11 +50,12 @@ all_processed_data = []
 # 1. Process Reddit Comments
 try:
     reddit_input_file = os.path.join(REDDIT_INPUT_DIR, f"{today_str}.csv")
-    df_reddit = pd.read_csv(reddit_input_file)
-    print(f"Successfully loaded {len(df_reddit)} comment entries from {reddit_input_file}")
+    # Falls back to the CSV for days scraped before the switch to Parquet
+    df_reddit = storage.read_table(REDDIT_INPUT_DIR, partitions={'date': today_iso}, csv_path=reddit_input_file)
+    print(f"Successfully loaded {len(df_reddit)} comment entries from {REDDIT_INPUT_DIR} (date={today_iso})")
     
     print("Calculating sentiment for Reddit comments...")
-    df_reddit['sentiment_score'] = df_reddit['comment_body'].apply(calculate_sentiment_score)
+    df_reddit['sentiment_score'] = calculate_sentiment_scores(df_reddit['comment_body'])
     df_reddit['source'] = 'reddit'
     df_reddit.rename(columns={'comment_body': 'text'}, inplace=True)
     all_processed_data.append(df_reddit)
@@ -101,20 +91,15 @@ try:
     # --- END FIX ---
     
     print("Calculating sentiment for tweets...")
-    df_twitter['sentiment_score'] = df_twitter['text'].apply(calculate_sentiment_score)
+    df_twitter['sentiment_score'] = calculate_sentiment_scores(df_twitter['text'])
     df_twitter['source'] = 'twitter'
     
     # Re-find tickers in tweets
     def find_tickers_in_tweet(tweet_text):
         if not isinstance(tweet_text, str):
             return pd.NA
-        potential_tickers = ticker_regex.findall(tweet_text.upper())
-        mentioned_stocks = set()
-        for ticker in potential_tickers:
-            clean_ticker = ticker.replace('$', '')
-            if clean_ticker in NASDAQ_SYMBOLS:
-                mentioned_stocks.add(clean_ticker)
-        return list(mentioned_stocks) if mentioned_stocks else pd.NA
+        mentioned_stocks = ticker_matcher.find(tweet_text.upper())
+        return mentioned_stocks if mentioned_stocks else pd.NA
 
     df_twitter['mentioned_stocks'] = df_twitter['text'].apply(find_tickers_in_tweet)
     df_twitter.dropna(subset=['mentioned_stocks'], inplace=True) # Drop tweets that didn't mention a valid ticker
@@ -146,8 +131,15 @@ if all_processed_data:
             final_df[col] = pd.NA
     
     final_df = final_df[columns_to_keep]
-    
-    final_df.to_csv(output_file, index=False)
-    print(f"\n✅ Combined sentiment data saved to: {output_file}")
+
+    # Parquet needs one type per column: tweets have UTC-aware timestamps and numeric ids
+    final_df['timestamp'] = pd.to_datetime(final_df['timestamp'], utc=True).dt.tz_localize(None)
+    final_df['comment_id'] = final_df['comment_id'].astype(str)
+
+    storage.write_partition(final_df, OUTPUT_DIR, 'date', today_iso, csv_path=output_file)
+    print(f"\n✅ Combined sentiment data saved to: {OUTPUT_DIR} (date={today_iso})")
 else:
     print("\nNo data processed from any source. No file saved.")
+
+sentiment_cache.close()
+sentiment_cache.report()
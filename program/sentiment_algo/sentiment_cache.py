@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import time
+import unicodedata
+
+# --- Persistent sentiment score cache shared by the sentiment scripts ---
+
+SCRIPT_DIR = os.path.dirname(__file__)
+CACHE_FILE = os.path.join(SCRIPT_DIR, "sentiment_cache.sqlite")
+
+# Model that produced the cached scores; scores from other models never collide
+MODEL_ID = "finiteautomata/bertweet-base-sentiment-analysis"
+
+# Least recently used entries are evicted above this size
+MAX_ENTRIES = 2_000_000
+# Pending writes are committed in groups of this size
+FLUSH_EVERY = 1000
+
+def normalize_text(text):
+    """Normalizes unicode and whitespace so trivial reposts share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def report_cache_counts(hits, misses):
+    total = hits + misses
+    rate = (hits / total * 100) if total else 0.0
+    print(f"Sentiment cache: {hits} hits, {misses} misses ({rate:.1f}% hit rate)")
+
+class SentimentCache:
+    def __init__(self, path=CACHE_FILE, model_id=MODEL_ID, max_entries=MAX_ENTRIES):
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        # Scores and access times waiting to be committed
+        self.pending_scores = dict()
+        self.pending_touches = dict()
+
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "key BLOB PRIMARY KEY, score REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self.conn.commit()
+
+    def key(self, text):
+        data = f"{self.model_id}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get(self, text):
+        """Returns the cached score for text, or None on a miss."""
+        return self.get_many([text]).get(text)
+
+    def get_many(self, texts):
+        """Returns a dict of text -> score for every text found in the cache."""
+        found = dict()
+        # Several raw texts can normalize to the same key
+        keys = dict()
+        for text in texts:
+            keys.setdefault(self.key(text), []).append(text)
+        key_list = list(keys)
+        now = time.time()
+
+        # Stay below SQLite's limit on query parameters
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, score FROM scores WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, score in rows:
+                for text in keys[key]:
+                    found[text] = score
+                self.pending_touches[key] = now
+
+        # Scores not yet committed count as hits too
+        for key, key_texts in keys.items():
+            if key in self.pending_scores:
+                for text in key_texts:
+                    found.setdefault(text, self.pending_scores[key])
+
+        self.hits += len(found)
+        self.misses += sum(len(key_texts) for key_texts in keys.values()) - len(found)
+        self.maybe_flush()
+        return found
+
+    def put(self, text, score):
+        self.put_many({text: score})
+
+    def put_many(self, scores):
+        """Stores a dict of text -> score."""
+        for text, score in scores.items():
+            self.pending_scores[self.key(text)] = score
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if len(self.pending_scores) + len(self.pending_touches) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scores (key, score, last_used) VALUES (?, ?, ?)",
+                [(key, score, now) for key, score in self.pending_scores.items()],
+            )
+            self.conn.executemany(
+                "UPDATE scores SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self.pending_touches.items()],
+            )
+            self.pending_scores.clear()
+            self.pending_touches.clear()
+            self.evict()
+
+    def evict(self):
+        # Drop the least recently used tenth once the cache is over its limit
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        self.conn.execute(
+            "DELETE FROM scores WHERE key IN "
+            "(SELECT key FROM scores ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+
+    def report(self):
+        report_cache_counts(self.hits, self.misses)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
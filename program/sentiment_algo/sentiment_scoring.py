@@ -0,0 +1,45 @@
+# --- Batched sentiment scoring shared by the sentiment scripts ---
+
+# Number of texts sent to the model in one predict() call
+BATCH_SIZE = 64
+
+def sentiment_from_probas(probas):
+    """Turns BERTweet class probabilities into a score between -0.5 and 0.5."""
+    return (probas['POS'] + 0.5 * probas['NEU']) - 0.5
+
+def score_texts(analyzer, texts, batch_size=BATCH_SIZE, cache=None):
+    """
+    Scores a list of texts with the analyzer, batch_size texts at a time.
+    Identical texts are only scored once, and unique texts are sorted by length
+    so each batch pads to a similar size. Scores are returned in the original order.
+    Empty or non-string texts score 0.0.
+    If a SentimentCache is given, cached texts skip the model and new scores are stored.
+    """
+    texts = list(texts)
+    scores = [0.0] * len(texts)
+
+    # Map each unique text to every position it appears at
+    positions = dict()
+    for i, text in enumerate(texts):
+        if isinstance(text, str) and text.strip():
+            positions.setdefault(text, []).append(i)
+
+    cached = cache.get_many(positions) if cache is not None else dict()
+    for text, score in cached.items():
+        for i in positions[text]:
+            scores[i] = score
+
+    unique_texts = sorted((t for t in positions if t not in cached), key=len)
+    for start in range(0, len(unique_texts), batch_size):
+        batch = unique_texts[start:start + batch_size]
+        results = analyzer.predict(batch)
+        new_scores = dict()
+        for text, result in zip(batch, results):
+            score = sentiment_from_probas(result.probas)
+            new_scores[text] = score
+            for i in positions[text]:
+                scores[i] = score
+        if cache is not None:
+            cache.put_many(new_scores)
+
+    return scores
@@ -1,7 +1,8 @@
 import pandas as pd
 import numpy as np
 import os
-import glob
+import sys
+import json
 from datetime import date
 
 # --- Define input and output directories ---
@@ -13,56 +14,229 @@ INPUT_DIR = os.path.join(PROJECT_ROOT, 'sentiment_algo', "daily_sentiment")
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'sentiment_algo', "daily_signals")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# --- Load and Combine All Daily Sentiment Files ---
-# NEW: Look for 'YY-MM-DD.csv' files. This pattern will find '25-10-13.csv' etc.
-file_pattern = os.path.join(INPUT_DIR, "??-??-??.csv") 
-all_files = glob.glob(file_pattern)
+# Last day's aggregates per ticker and the sentiment files already turned into signals
+STATE_FILE = os.path.join(PROJECT_ROOT, 'sentiment_algo', "signal_state.json")
 
-if not all_files:
-    print(f"Error: No daily sentiment files found in '{INPUT_DIR}' matching pattern 'YY-MM-DD.csv'.")
-    exit()
+sys.path.append(PROJECT_ROOT)
+from common import storage
+import svc
 
-print(f"Found {len(all_files)} combined daily sentiment files. Combining them...")
+# --- Run mode ---
+# By default only sentiment files that are new since the last run are read, and only
+# the signal rows they change are written. Pass --full to rebuild every signal from
+# all of history (this also happens automatically when the state can't be trusted).
+FULL_RECOMPUTE = '--full' in sys.argv
 
-df_list = [pd.read_csv(file) for file in all_files]
-df = pd.concat(df_list, ignore_index=True)
-df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce') # errors='coerce' ensures bad dates become NaT
+SIGNAL_COLUMNS = ['ticker', 'timestamp', 'mean_sentiment', 'comment_count', 'sentiment_change', 'volume_change', 'svc']
 
-# --- FIX IS HERE ---
-original_count = len(df)
-df.dropna(subset=['timestamp'], inplace=True) # Drop any rows where the timestamp is NaT
-new_count = len(df)
-if original_count > new_count:
-    print(f"INFO: Dropped {original_count - new_count} rows with invalid/missing timestamps.")
-# --- END FIX ---
+# --- Loading ---
+def list_sentiment_files():
+    """Returns {file name: [size, mtime]} for every Parquet partition of daily_sentiment."""
+    files = dict()
+    for path in storage.partition_files(INPUT_DIR):
+        stat = os.stat(path)
+        files[os.path.basename(path)] = [stat.st_size, stat.st_mtime]
+    return files
 
-print(f"Successfully combined all data. Total valid entries: {len(df)}")
+def csv_day(path):
+    """The day of a 'YY-MM-DD.csv' sentiment file, as its date= partition value."""
+    return pd.to_datetime(os.path.basename(path)[:8], format='%y-%m-%d')
 
-# --- Daily Aggregation ---
-df.set_index('timestamp', inplace=True)
-df.sort_index(inplace=True) # Sort by date to ensure correct .diff()
+def load_sentiment(file_names=None):
+    """Reads every daily sentiment row, or only those in file_names (partition file names)."""
+    # Days saved before the switch to Parquet are still read from their 'YY-MM-DD.csv' files,
+    # unless the day also has a Parquet partition
+    file_pattern = os.path.join(INPUT_DIR, "??-??-??.csv")
+    if file_names is None:
+        df = storage.read_table(INPUT_DIR, columns=['timestamp', 'ticker', 'sentiment_score'], csv_path=file_pattern, csv_partition=csv_day)
+    else:
+        dates = [name[len('date='):-len('.parquet')] for name in file_names]
+        df = storage.read_table(INPUT_DIR, columns=['timestamp', 'ticker', 'sentiment_score'], partitions={'date': dates})
 
-daily_stats = df.groupby('ticker').resample('D').agg(
-    mean_sentiment=('sentiment_score', 'mean'),
-    comment_count=('ticker', 'count') 
-).fillna(0)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce') # errors='coerce' ensures bad dates become NaT
+
+    # --- FIX IS HERE ---
+    original_count = len(df)
+    df.dropna(subset=['timestamp'], inplace=True) # Drop any rows where the timestamp is NaT
+    new_count = len(df)
+    if original_count > new_count:
+        print(f"INFO: Dropped {original_count - new_count} rows with invalid/missing timestamps.")
+    # --- END FIX ---
+    return df
 
 # --- SVC Calculation ---
-def calculate_svc(group):
-    group['sentiment_change'] = group['mean_sentiment'].diff()
-    group['volume_change'] = group['comment_count'].diff().abs()
-    group['svc'] = group['sentiment_change'] * group['volume_change']
-    return group
-
-print("Calculating overall SVC metric for each stock...")
-df_svc = daily_stats.groupby(level=0, group_keys=False).apply(calculate_svc)
-df_svc.replace([np.inf, -np.inf], np.nan, inplace=True)
-df_svc.fillna(0, inplace=True)
-
-print("📈 Overall SVC Calculation Complete.")
-
-# --- Save Master Signal File ---
-today_str = date.today().strftime('%y-%m-%d')
-output_path = os.path.join(OUTPUT_DIR, f"{today_str}_signals.csv")
-df_svc.to_csv(output_path)
-print(f"\n💾 Complete historical SVC signal data saved to: {output_path}")
\ No newline at end of file
+def full_recompute(df):
+    """Builds every signal row from all of history. Returns (signals, daily_stats)."""
+    df = df.set_index('timestamp')
+    df.sort_index(inplace=True) # Sort by date to ensure correct .diff()
+
+    # The sums are not part of the signals; they seed the state for the next incremental run
+    daily_stats = df.groupby('ticker').resample('D').agg(
+        mean_sentiment=('sentiment_score', 'mean'),
+        comment_count=('ticker', 'count'),
+        sentiment_sum=('sentiment_score', 'sum'),
+        scored_count=('sentiment_score', 'count')
+    ).fillna(0)
+
+    df_svc = svc.calculate_svc(daily_stats.reset_index())
+    df_svc.replace([np.inf, -np.inf], np.nan, inplace=True)
+    df_svc.fillna(0, inplace=True)
+    return df_svc[SIGNAL_COLUMNS], df_svc
+
+# --- Incremental State ---
+# For each ticker we keep its last day with mentions (later rows for that day are added
+# to its sums) and the mean/count of the day before it, which that day's diff needs.
+# Every other signal row is final: new data can only add days after it.
+STATE_FIELDS = ['last_day', 'sentiment_sum', 'scored_count', 'comment_count', 'prev_mean', 'prev_count']
+
+def state_entry(row):
+    return {
+        'last_day': row.timestamp.strftime('%Y-%m-%d'),
+        'sentiment_sum': float(row.sentiment_sum),
+        'scored_count': int(row.scored_count),
+        'comment_count': int(row.comment_count),
+        'prev_mean': None if pd.isna(row.prev_mean) else float(row.prev_mean),
+        'prev_count': None if pd.isna(row.prev_count) else int(row.prev_count),
+    }
+
+def state_from_daily(daily, previous=None):
+    """
+    Builds the per-ticker state from daily rows sorted by ticker and day (gap days included).
+    previous gives the day before each ticker's first row, as in svc.calculate_svc.
+    """
+    prev_mean = daily.groupby('ticker')['mean_sentiment'].shift(1)
+    prev_count = daily.groupby('ticker')['comment_count'].shift(1)
+    if previous is not None:
+        first = svc.ticker_starts(daily['ticker'].to_numpy())
+        prev_mean[first] = daily.loc[first, 'ticker'].map(previous['mean_sentiment'])
+        prev_count[first] = daily.loc[first, 'ticker'].map(previous['comment_count'])
+    last = daily.assign(prev_mean=prev_mean, prev_count=prev_count).groupby('ticker').tail(1)
+
+    return {row.ticker: state_entry(row) for row in last.itertuples(index=False)}
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return None
+    with open(STATE_FILE) as fh:
+        return json.load(fh)
+
+def save_state(files, tickers):
+    storage.write_json_atomic({'files': files, 'tickers': tickers}, STATE_FILE)
+
+def incremental_update(df, tickers):
+    """
+    Extends each mentioned ticker's daily series with the rows in df. Returns
+    (signal rows to write, updated state), or None if df holds rows for a day before
+    a ticker's last stored day, which only a full recompute can place correctly.
+    """
+    df = df.dropna(subset=['ticker'])
+    new_days = df.assign(timestamp=df['timestamp'].dt.floor('D')).groupby(['ticker', 'timestamp']).agg(
+        sentiment_sum=('sentiment_score', 'sum'),
+        scored_count=('sentiment_score', 'count'),
+        comment_count=('ticker', 'count')
+    ).reset_index()
+
+    mentioned = set(new_days['ticker'])
+    stored = pd.DataFrame([tickers[t] for t in mentioned if t in tickers], columns=STATE_FIELDS,
+                          index=pd.Index([t for t in mentioned if t in tickers], dtype=object))
+    stored['last_day'] = pd.to_datetime(stored['last_day'])
+
+    first_new_day = new_days.groupby('ticker')['timestamp'].min()
+    late = first_new_day.reindex(stored.index) < stored['last_day']
+    if late.any():
+        print(f"INFO: New rows for {int(late.sum())} tickers fall before their last stored day.")
+        return None
+
+    # Each stored last day is recomputed together with the new rows for it
+    stored_days = stored[['last_day', 'sentiment_sum', 'scored_count', 'comment_count']].rename(columns={'last_day': 'timestamp'})
+    stored_days = stored_days.rename_axis('ticker').reset_index()
+    daily = pd.concat([stored_days, new_days], ignore_index=True)
+    daily = daily.groupby(['ticker', 'timestamp']).sum()
+
+    # Days without mentions between a ticker's first and last day are zero rows, as with resample('D')
+    daily = daily.reset_index(level=0).groupby('ticker')[['sentiment_sum', 'scored_count', 'comment_count']].resample('D').sum()
+    daily = daily.reset_index()
+    daily['scored_count'] = daily['scored_count'].astype('int64')
+    daily['comment_count'] = daily['comment_count'].astype('int64')
+    daily['mean_sentiment'] = (daily['sentiment_sum'] / daily['scored_count'].where(daily['scored_count'] > 0)).fillna(0)
+
+    # The first day of each ticker diffs against the stored day before it (if any)
+    previous = stored[['prev_mean', 'prev_count']].rename(columns={'prev_mean': 'mean_sentiment', 'prev_count': 'comment_count'})
+    daily = svc.calculate_svc(daily, previous=previous)
+    daily.replace([np.inf, -np.inf], np.nan, inplace=True)
+    daily.fillna(0, inplace=True)
+
+    updated = dict(tickers)
+    updated.update(state_from_daily(daily, previous))
+    return daily[SIGNAL_COLUMNS], updated
+
+def write_signal_rows(rows):
+    """Replaces these tickers' rows in each day's signal partition, creating new days as needed."""
+    for day, day_rows in rows.groupby('timestamp'):
+        existing = storage.partition_files(OUTPUT_DIR, partitions={'timestamp': day})
+        if existing:
+            old_rows = storage.read_table(OUTPUT_DIR, partitions={'timestamp': day})
+            old_rows = old_rows[~old_rows['ticker'].isin(day_rows['ticker'])]
+            day_rows = pd.concat([old_rows, day_rows], ignore_index=True)
+        day_rows = day_rows.sort_values('ticker').reset_index(drop=True)
+        storage.write_partition(day_rows, OUTPUT_DIR, 'timestamp', day)
+
+# --- Main ---
+files = list_sentiment_files()
+state = None if FULL_RECOMPUTE else load_state()
+
+if state is not None:
+    processed = state['files']
+    changed = [name for name, identity in processed.items() if files.get(name) != identity]
+    if changed:
+        print(f"INFO: {len(changed)} sentiment files changed since the last run, recomputing everything.")
+        state = None
+    elif not storage.dataset_exists(OUTPUT_DIR):
+        state = None
+
+update = None
+if state is not None:
+    new_files = sorted(name for name in files if name not in state['files'])
+    if not new_files:
+        print("No new sentiment files since the last run. Signals are up to date.")
+        exit()
+
+    print(f"Incremental update from {len(new_files)} new sentiment files...")
+    df = load_sentiment(new_files)
+    print(f"Successfully loaded new data. Total valid entries: {len(df)}")
+    update = incremental_update(df, state['tickers'])
+
+if update is not None:
+    print("Calculating SVC for the new days...")
+    signal_rows, tickers = update
+    write_signal_rows(signal_rows)
+    save_state(files, tickers)
+    print("📈 Incremental SVC Calculation Complete.")
+    print(f"\n💾 {len(signal_rows)} signal rows written to: {OUTPUT_DIR}")
+    if storage.EXPORT_CSV:
+        today_str = date.today().strftime('%y-%m-%d')
+        storage.export_csv(storage.read_table(OUTPUT_DIR), os.path.join(OUTPUT_DIR, f"{today_str}_signals.csv"))
+else:
+    # --- Load and Combine All Daily Sentiment Files ---
+    try:
+        df = load_sentiment()
+    except FileNotFoundError:
+        print(f"Error: No daily sentiment data found in '{INPUT_DIR}'.")
+        exit()
+
+    print(f"Successfully combined all data. Total valid entries: {len(df)}")
+
+    print("Calculating overall SVC metric for each stock...")
+    df_svc, daily_stats = full_recompute(df)
+    print("📈 Overall SVC Calculation Complete.")
+
+    # --- Save Master Signal File ---
+    # One partition per day, so later incremental runs only rewrite the days they touch
+    today_str = date.today().strftime('%y-%m-%d')
+    csv_path = os.path.join(OUTPUT_DIR, f"{today_str}_signals.csv")
+    storage.write_table(df_svc, OUTPUT_DIR, partition_by='timestamp', csv_path=csv_path)
+
+    # Without Parquet inputs there is nothing to track, so the next run is a full one again
+    if files:
+        save_state(files, state_from_daily(daily_stats))
+    print(f"\n💾 Complete historical SVC signal data saved to: {OUTPUT_DIR}")
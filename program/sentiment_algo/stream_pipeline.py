@@ -0,0 +1,327 @@
+import pandas as pd
+import numpy as np
+import copy
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from sentiment_scoring import score_texts
+from sentiment_cache import SentimentCache
+from ticker_matcher import TickerMatcher, load_symbols
+from reddit_clients import PrawClient, ReplayClient
+from stream_reddit import HighWaterMarks, SUBREDDIT_LIST, BANNED_LIST
+
+SCRIPT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.join(SCRIPT_DIR, "..")
+sys.path.append(PROJECT_ROOT)
+from common import storage
+
+# --- Streaming pipeline: comment -> tickers -> sentiment -> SVC, in one process ---
+# Usage: python3 stream_pipeline.py [--replay <file>]
+# Instead of going through daily_comments, daily_sentiment and a nightly
+# signal_generator.py run, comments flow through four threads connected by bounded
+# queues:
+#   source  reads the comment stream (see stream_reddit.py), skipping comments seen before
+#   extract finds the tickers each comment mentions
+#   score   scores the sentiment of the comments with tickers, SCORE_BATCH_SIZE at a time
+#   signals updates each ticker's running day (sums, mean, counts) and its SVC
+# When a stage falls behind, its input queue fills up and the stage before it waits,
+# so memory stays bounded and the Reddit stream is simply read more slowly.
+# Updated signal rows are written to live_signals/ (same layout as daily_signals/)
+# every FLUSH_SECONDS. Per-ticker state is kept in LIVE_STATE_FILE, in the format of
+# signal_generator.py's state, and is seeded from it on the first run.
+# Every comment (with tickers or not) goes through all four stages, and its id is only
+# added to the seen comments saved in LIVE_STATE_FILE once the signals stage has added
+# its rows, so a restart reads again whatever was still in the queues.
+# Ctrl+C stops reading and lets the stages finish the comments already queued.
+
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "live_signals")
+LIVE_STATE_FILE = os.path.join(SCRIPT_DIR, "live_state.json")
+SIGNAL_STATE_FILE = os.path.join(SCRIPT_DIR, "signal_state.json")
+
+# Items each queue holds before the stage feeding it has to wait
+QUEUE_SIZE = 1000
+# Comments scored together; a partial batch is scored after SCORE_WAIT seconds
+SCORE_BATCH_SIZE = 64
+SCORE_WAIT = 0.5
+FLUSH_SECONDS = 10
+REPORT_SECONDS = 30
+# Replay speed for --replay (0: as fast as possible)
+REPLAY_SPEED = 0
+
+REPLAY_FILE = sys.argv[sys.argv.index('--replay') + 1] if '--replay' in sys.argv[:-1] else None
+
+SIGNAL_COLUMNS = ['ticker', 'timestamp', 'mean_sentiment', 'comment_count', 'sentiment_change', 'volume_change', 'svc']
+
+# Marks the end of the stream in the queues
+STOP = object()
+
+class OnlineSVC:
+    """
+    Per-ticker running version of signal_generator.py's daily aggregation and
+    svc.calculate_svc. Each ticker keeps its last day with mentions (sums and counts)
+    and the mean/count of the day before it; days without mentions between two days
+    with mentions get zero rows, as with resample('D').
+    """
+    def __init__(self, tickers=None):
+        self.tickers = tickers or dict()
+        self.late = 0
+
+    def add(self, ticker, day, score):
+        """
+        Adds one scored mention of ticker on day (a Timestamp at midnight). Returns the
+        signal rows it changes: the day's row, after a zero row for every day without
+        mentions since the ticker's last day. Empty if the mention is late.
+        """
+        entry = self.tickers.get(ticker)
+        day_str = day.strftime('%Y-%m-%d')
+        rows = []
+        if entry is None:
+            entry = {'last_day': day_str, 'sentiment_sum': 0.0, 'scored_count': 0, 'comment_count': 0,
+                     'prev_mean': None, 'prev_count': None}
+            self.tickers[ticker] = entry
+        elif day_str > entry['last_day']:
+            last_day = pd.Timestamp(entry['last_day'])
+            prev_mean, prev_count = self.mean(entry), entry['comment_count']
+            for gap_day in pd.date_range(last_day + pd.Timedelta(days=1), day - pd.Timedelta(days=1)):
+                rows.append(self.signal_row(ticker, gap_day, 0.0, 0, prev_mean, prev_count))
+                prev_mean, prev_count = 0.0, 0
+            entry.update(last_day=day_str, sentiment_sum=0.0, scored_count=0, comment_count=0,
+                         prev_mean=prev_mean, prev_count=prev_count)
+        elif day_str < entry['last_day']:
+            # That day's row is final already; the next signal_generator.py --full run includes it
+            self.late += 1
+            return rows
+
+        entry['sentiment_sum'] += score
+        entry['scored_count'] += 1
+        entry['comment_count'] += 1
+        rows.append(self.signal_row(ticker, day, self.mean(entry), entry['comment_count'], entry['prev_mean'], entry['prev_count']))
+        return rows
+
+    @staticmethod
+    def mean(entry):
+        return entry['sentiment_sum'] / entry['scored_count'] if entry['scored_count'] else 0.0
+
+    @staticmethod
+    def signal_row(ticker, day, mean, count, prev_mean, prev_count):
+        # Like signal_generator.py, a ticker's first day has no changes (0)
+        sentiment_change = 0.0 if prev_mean is None else mean - prev_mean
+        volume_change = 0.0 if prev_count is None else abs(count - prev_count)
+        return {
+            'ticker': ticker,
+            'timestamp': pd.Timestamp(day),
+            'mean_sentiment': mean,
+            'comment_count': count,
+            'sentiment_change': sentiment_change,
+            'volume_change': float(volume_change),
+            'svc': sentiment_change * volume_change,
+        }
+
+def load_state():
+    for path in (LIVE_STATE_FILE, SIGNAL_STATE_FILE):
+        if os.path.exists(path):
+            with open(path) as fh:
+                state = json.load(fh)
+            print(f"Loaded ticker state from {path}")
+            return state
+    return None
+
+def save_state(marks, tickers):
+    storage.write_json_atomic({'marks': marks, 'tickers': tickers}, LIVE_STATE_FILE)
+
+class SignalWriter:
+    """Keeps the signal rows of the days touched in this run and rewrites their partitions on flush()."""
+    def __init__(self, path):
+        self.path = path
+        self.days = dict()
+        self.dirty = set()
+
+    def add(self, row):
+        day = row['timestamp']
+        if day not in self.days:
+            # Keep the rows of tickers not mentioned in this run
+            existing = storage.partition_files(self.path, {'timestamp': day})
+            old_rows = storage.read_table(self.path, partitions={'timestamp': day}).to_dict('records') if existing else []
+            self.days[day] = {r['ticker']: r for r in old_rows}
+        self.days[day][row['ticker']] = row
+        self.dirty.add(day)
+
+    def flush(self):
+        for day in sorted(self.dirty):
+            rows = pd.DataFrame(list(self.days[day].values()), columns=SIGNAL_COLUMNS)
+            rows = rows.sort_values('ticker').reset_index(drop=True)
+            storage.write_partition(rows, self.path, 'timestamp', day)
+        written = len(self.dirty)
+        self.dirty = set()
+        return written
+
+class StreamPipeline:
+    """
+    Runs the four stages on their own threads. analyzer is a pysentimiento analyzer
+    (or anything with the same predict()); use_cache turns the SentimentCache on.
+    """
+    def __init__(self, client, subreddits, ticker_matcher, analyzer, output_dir=OUTPUT_DIR, state=None,
+                 queue_size=QUEUE_SIZE, score_batch_size=SCORE_BATCH_SIZE, score_wait=SCORE_WAIT,
+                 flush_seconds=FLUSH_SECONDS, report_seconds=REPORT_SECONDS, use_cache=True):
+        self.client = client
+        self.subreddits = subreddits
+        self.ticker_matcher = ticker_matcher
+        self.analyzer = analyzer
+        self.score_batch_size = score_batch_size
+        self.score_wait = score_wait
+        self.flush_seconds = flush_seconds
+        self.report_seconds = report_seconds
+        self.use_cache = use_cache
+
+        state = state or dict()
+        # marks: comments whose signals are added (owned by the signals stage and saved);
+        # seen: comments read by the source stage, which may still be in the queues
+        self.marks = HighWaterMarks(state.get('marks'))
+        self.seen = HighWaterMarks(copy.deepcopy(self.marks.marks))
+        self.svc = OnlineSVC(state.get('tickers'))
+        self.writer = SignalWriter(output_dir)
+
+        self.comments = queue.Queue(maxsize=queue_size)
+        self.mentions = queue.Queue(maxsize=queue_size)
+        self.scored = queue.Queue(maxsize=queue_size)
+        self.stopping = threading.Event()
+
+        self.counts = {'comments': 0, 'mentions': 0, 'scored': 0, 'signal_updates': 0}
+        # Seconds from a comment being read to its signals being updated
+        self.latencies = []
+
+    def put(self, q, item):
+        """Waits while q is full (backpressure). Nothing is dropped, also when stopping: the stages drain the queues."""
+        q.put(item)
+
+    # --- Stages ---
+    def source(self):
+        for comment in self.client.stream(self.subreddits):
+            if self.stopping.is_set():
+                break
+            if comment is None or not self.seen.is_new(comment):
+                continue
+            self.seen.update(comment)
+            self.counts['comments'] += 1
+            self.put(self.comments, (time.monotonic(), comment))
+        self.put(self.comments, STOP)
+
+    def extract(self):
+        while True:
+            item = self.comments.get()
+            if item is STOP:
+                break
+            read_at, comment = item
+            tickers = self.ticker_matcher.find(comment['body'])
+            self.counts['mentions'] += len(tickers)
+            # Comments without tickers are passed on too, so their marks move in order
+            self.put(self.mentions, (read_at, comment, tickers))
+        self.put(self.mentions, STOP)
+
+    def score(self):
+        # SQLite connections belong to the thread that opened them
+        cache = SentimentCache() if self.use_cache else None
+        done = False
+        while not done:
+            batch = []
+            deadline = None
+            while len(batch) < self.score_batch_size:
+                timeout = None if deadline is None else max(0, deadline - time.monotonic())
+                try:
+                    item = self.mentions.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is STOP:
+                    done = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.score_wait
+            if batch:
+                mentioned = [comment['body'] for _, comment, tickers in batch if tickers]
+                scores = iter(score_texts(self.analyzer, mentioned, cache=cache) if mentioned else [])
+                self.counts['scored'] += len(mentioned)
+                self.put(self.scored, [(read_at, comment, tickers, next(scores) if tickers else None)
+                                       for read_at, comment, tickers in batch])
+        if cache is not None:
+            cache.close()
+        self.put(self.scored, STOP)
+
+    def signals(self):
+        last_flush = time.monotonic()
+        last_report = time.monotonic()
+        while True:
+            try:
+                batch = self.scored.get(timeout=1)
+            except queue.Empty:
+                batch = []
+            if batch is STOP:
+                break
+            for read_at, comment, tickers, score in batch:
+                if tickers:
+                    day = pd.to_datetime(comment['created_utc'], unit='s').floor('D')
+                    for ticker in tickers:
+                        for row in self.svc.add(ticker, day, score):
+                            self.writer.add(row)
+                            self.counts['signal_updates'] += 1
+                    self.latencies.append(time.monotonic() - read_at)
+                # Only now is the comment done; the mark is saved with its rows on the next flush
+                self.marks.update(comment)
+
+            now = time.monotonic()
+            if now - last_flush >= self.flush_seconds:
+                self.flush()
+                last_flush = now
+            if now - last_report >= self.report_seconds:
+                self.report()
+                last_report = now
+        self.flush()
+
+    def flush(self):
+        days = self.writer.flush()
+        # Saved after the rows; a crash in between only makes the next run read some comments again
+        save_state(self.marks.marks, self.svc.tickers)
+        return days
+
+    def report(self):
+        latencies = np.array(self.latencies[-10000:])
+        self.latencies = []
+        lag = f", latency p50 {np.percentile(latencies, 50):.2f}s p99 {np.percentile(latencies, 99):.2f}s" if len(latencies) else ""
+        print(f"{self.counts['comments']} comments, {self.counts['mentions']} mentions, {self.counts['scored']} scored, "
+              f"{self.counts['signal_updates']} signal updates{lag}; queued {self.comments.qsize()}/{self.mentions.qsize()}/{self.scored.qsize()}"
+              + (f", {self.svc.late} late mentions skipped" if self.svc.late else ""))
+
+    def run(self):
+        """Runs until the client's stream ends or Ctrl+C, then writes what is left."""
+        threads = [threading.Thread(target=stage, daemon=True) for stage in (self.source, self.extract, self.score, self.signals)]
+        for thread in threads:
+            thread.start()
+        try:
+            while threads[-1].is_alive():
+                threads[-1].join(timeout=0.5)
+        except KeyboardInterrupt:
+            print("\nStopping, finishing the comments already read...")
+            self.stopping.set()
+            threads[-1].join()
+        self.report()
+
+if __name__ == "__main__":
+    NASDAQ_SYMBOLS = load_symbols()
+    if not NASDAQ_SYMBOLS:
+        print("Could not load NASDAQ symbols. Exiting.")
+        exit()
+    ticker_matcher = TickerMatcher(NASDAQ_SYMBOLS, banned=BANNED_LIST, skip_caps_runs=True)
+
+    print("Setting up the sentiment analyzer...")
+    from pysentimiento import create_analyzer
+    analyzer = create_analyzer(task="sentiment", lang="en")
+
+    client = ReplayClient(REPLAY_FILE, speed=REPLAY_SPEED) if REPLAY_FILE else PrawClient()
+    pipeline = StreamPipeline(client, SUBREDDIT_LIST, ticker_matcher, analyzer, state=load_state())
+
+    print(f"🔥 Streaming comments from {', '.join(SUBREDDIT_LIST)} into {OUTPUT_DIR}")
+    pipeline.run()
+    print(f"✅ Signals saved to: {OUTPUT_DIR}")
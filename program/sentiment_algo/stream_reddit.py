@@ -0,0 +1,185 @@
+import pandas as pd
+import bisect
+import json
+import os
+import sys
+import time
+from ticker_matcher import TickerMatcher, load_symbols
+from reddit_clients import PrawClient, ReplayClient, RecordingClient
+
+SCRIPT_DIR = os.path.dirname(__file__)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from common import storage
+
+# --- Long-running Reddit comment collector ---
+# Usage: python3 stream_reddit.py [--replay <file>] [--record <file>]
+# Unlike scrape_reddit.py, which sees only the newest 1000 comments of each subreddit
+# once a day, this follows the subreddits' comment streams and keeps every comment
+# that mentions a ticker. Rows (same columns as daily_comments) go to one partition per
+# hour, stream_comments/hour=YYYY-MM-DDTHH.parquet, written every FLUSH_SECONDS.
+# The ids of the last SEEN_IDS comments seen in each subreddit are saved in STATE_FILE,
+# so after a restart comments that were already stored are skipped.
+# --replay plays a recorded stream instead of connecting to Reddit; --record saves
+# the comments seen for later replays. Stop with Ctrl+C.
+
+SUBREDDIT_LIST = ['wallstreetbets', 'stocks', 'investing', 'StockMarket', 'personalfinance']
+BANNED_LIST = ['AI', 'FOR', 'IT', 'GF', 'OP', 'YOU', 'WAY', 'USA', 'IQ']
+
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "stream_comments")
+STATE_FILE = os.path.join(SCRIPT_DIR, "stream_state.json")
+
+# Write the current hours' files at least this often, and after this many new rows
+FLUSH_SECONDS = 30
+FLUSH_ROWS = 500
+# Comment ids remembered per subreddit; comments older than all of them count as seen
+SEEN_IDS = 5000
+# Replay speed for --replay (0: as fast as possible)
+REPLAY_SPEED = 0
+
+REPLAY_FILE = sys.argv[sys.argv.index('--replay') + 1] if '--replay' in sys.argv[:-1] else None
+RECORD_FILE = sys.argv[sys.argv.index('--record') + 1] if '--record' in sys.argv[:-1] else None
+
+def hour_key(created_utc):
+    return pd.to_datetime(created_utc, unit='s').strftime('%Y-%m-%dT%H')
+
+class HighWaterMarks:
+    """
+    Per subreddit, the ids of the last `size` comments seen, sorted. Reddit ids are base36
+    numbers that grow with every new comment, so a comment the stream delivers late is
+    still new as long as it is newer than the oldest id kept; anything older or already
+    listed has been seen.
+    """
+    def __init__(self, state=None, size=SEEN_IDS):
+        self.size = size
+        self.marks = dict()
+        for key, mark in (state or dict()).items():
+            # States saved before ids were kept as numbers hold base36 strings
+            self.marks[key] = {'ids': sorted(int(i, 36) if isinstance(i, str) else i for i in mark['ids'])}
+
+    def is_new(self, comment):
+        mark = self.marks.get(comment['subreddit'].lower())
+        if not mark or not mark['ids']:
+            return True
+        ids = mark['ids']
+        number = int(comment['id'], 36)
+        i = bisect.bisect_left(ids, number)
+        return i > 0 and (i == len(ids) or ids[i] != number)
+
+    def update(self, comment):
+        ids = self.marks.setdefault(comment['subreddit'].lower(), {'ids': []})['ids']
+        number = int(comment['id'], 36)
+        i = bisect.bisect_left(ids, number)
+        if i == len(ids) or ids[i] != number:
+            ids.insert(i, number)
+            if len(ids) > self.size:
+                del ids[0]
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return None
+    with open(STATE_FILE) as fh:
+        return json.load(fh)
+
+def save_state(marks):
+    storage.write_json_atomic(marks, STATE_FILE)
+
+class HourlyWriter:
+    """
+    Keeps the rows of the hours still receiving comments in memory and rewrites their
+    partitions on flush(). Hours are kept until an hour newer than them is flushed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.hours = dict()
+        self.dirty = set()
+        self.pending = 0
+
+    def add(self, rows):
+        for row in rows:
+            hour = hour_key(row['created_utc'])
+            if hour not in self.hours:
+                # Carry on with what an earlier run stored for this hour
+                existing = storage.partition_files(self.path, {'hour': hour})
+                self.hours[hour] = storage.read_table(self.path, partitions={'hour': hour}).to_dict('records') if existing else []
+            self.hours[hour].append({
+                'timestamp': pd.to_datetime(row['created_utc'], unit='s'),
+                'comment_id': row['comment_id'],
+                'comment_body': row['comment_body'],
+                'ticker': row['ticker'],
+                'subreddit': row['subreddit'],
+            })
+            self.dirty.add(hour)
+            self.pending += 1
+
+    def flush(self):
+        for hour in sorted(self.dirty):
+            df = pd.DataFrame(self.hours[hour])
+            # A comment stored before a crash but after the last saved state comes again
+            df = df.drop_duplicates(subset=['comment_id', 'ticker'], keep='first')
+            self.hours[hour] = df.to_dict('records')
+            storage.write_partition(df, self.path, 'hour', hour)
+        if self.dirty:
+            latest = max(self.dirty)
+            for hour in [h for h in self.hours if h < latest and h not in self.dirty]:
+                del self.hours[hour]
+        written = len(self.dirty)
+        self.dirty = set()
+        self.pending = 0
+        return written
+
+def collect(client, subreddits, ticker_matcher, writer, marks, flush_seconds=FLUSH_SECONDS, flush_rows=FLUSH_ROWS):
+    """Runs until the client's stream ends (replays) or Ctrl+C. Returns (comments seen, rows stored)."""
+    seen = 0
+    stored = 0
+    last_flush = time.monotonic()
+
+    def flush():
+        nonlocal last_flush
+        hours = writer.flush()
+        # Saved after the rows, so a crash in between only repeats comments
+        save_state(marks.marks)
+        last_flush = time.monotonic()
+        if hours:
+            print(f"💾 {seen} comments seen, {stored} rows stored (wrote {hours} hourly files)")
+
+    try:
+        for comment in client.stream(subreddits):
+            if comment is not None:
+                if not marks.is_new(comment):
+                    continue
+                marks.update(comment)
+                seen += 1
+                mentioned_stocks = ticker_matcher.find(comment['body'])
+                writer.add({
+                    'created_utc': comment['created_utc'],
+                    'comment_id': comment['id'],
+                    'comment_body': comment['body'],
+                    'ticker': ticker,
+                    'subreddit': comment['subreddit'],
+                } for ticker in mentioned_stocks)
+                stored += len(mentioned_stocks)
+
+            if writer.pending >= flush_rows or time.monotonic() - last_flush >= flush_seconds:
+                flush()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    flush()
+    return seen, stored
+
+if __name__ == "__main__":
+    NASDAQ_SYMBOLS = load_symbols()
+    if not NASDAQ_SYMBOLS:
+        print("Could not load NASDAQ symbols. Exiting.")
+        exit()
+    ticker_matcher = TickerMatcher(NASDAQ_SYMBOLS, banned=BANNED_LIST, skip_caps_runs=True)
+
+    client = ReplayClient(REPLAY_FILE, speed=REPLAY_SPEED) if REPLAY_FILE else PrawClient()
+    if RECORD_FILE:
+        client = RecordingClient(client, RECORD_FILE)
+
+    marks = HighWaterMarks(load_state())
+    writer = HourlyWriter(OUTPUT_DIR)
+
+    print(f"🔥 Streaming comments from: {', '.join(SUBREDDIT_LIST)}")
+    seen, stored = collect(client, SUBREDDIT_LIST, ticker_matcher, writer, marks)
+    print(f"✅ {seen} new comments seen, {stored} rows stored in: {OUTPUT_DIR}")
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# --- Shared SVC (sentiment-volume change) calculation ---
+# sentiment_change = day-over-day change in mean_sentiment
+# volume_change    = absolute day-over-day change in comment_count
+# svc              = sentiment_change * volume_change
+# The changes are taken between consecutive rows of the same ticker, so the frame is
+# sorted by ticker and date once and every ticker is handled in the same NumPy pass,
+# instead of calling a Python function per ticker with groupby().apply.
+
+def ticker_starts(tickers):
+    """Returns a boolean array marking the first row of each ticker in a ticker-sorted array."""
+    codes, _ = pd.factorize(tickers)
+    starts = np.ones(len(codes), dtype=bool)
+    starts[1:] = codes[1:] != codes[:-1]
+    return starts
+
+def calculate_svc(daily, ticker_column='ticker', date_column='timestamp', previous=None):
+    """
+    Adds sentiment_change, volume_change and svc to daily (one row per ticker and day,
+    with mean_sentiment and comment_count). Returns a copy sorted by ticker and date.
+    The first row of each ticker has no previous day, so its changes are NaN, unless
+    previous (indexed by ticker, with mean_sentiment and comment_count) gives the day
+    before it, e.g. from an earlier run.
+    """
+    # groupby output is usually sorted already, and checking is much cheaper than sorting
+    starts = ticker_starts(daily[ticker_column].to_numpy())
+    dates = daily[date_column].to_numpy()
+    if daily[ticker_column].is_monotonic_increasing and (starts[1:] | (dates[1:] > dates[:-1])).all():
+        daily = daily.reset_index(drop=True)
+    else:
+        daily = daily.sort_values([ticker_column, date_column], kind='mergesort').reset_index(drop=True)
+        starts = ticker_starts(daily[ticker_column].to_numpy())
+
+    mean = daily['mean_sentiment'].to_numpy(dtype=float)
+    count = daily['comment_count'].to_numpy(dtype=float)
+
+    prev_mean = np.empty_like(mean)
+    prev_count = np.empty_like(count)
+    prev_mean[1:] = mean[:-1]
+    prev_count[1:] = count[:-1]
+
+    if previous is None:
+        prev_mean[starts] = np.nan
+        prev_count[starts] = np.nan
+    else:
+        first_tickers = daily[ticker_column].to_numpy()[starts]
+        prev_mean[starts] = previous['mean_sentiment'].reindex(first_tickers).to_numpy(dtype=float)
+        prev_count[starts] = previous['comment_count'].reindex(first_tickers).to_numpy(dtype=float)
+
+    with np.errstate(invalid='ignore'):
+        daily['sentiment_change'] = mean - prev_mean
+        daily['volume_change'] = np.abs(count - prev_count)
+        daily['svc'] = daily['sentiment_change'].to_numpy() * daily['volume_change'].to_numpy()
+    return daily
@@ -3,20 +3,24 @@ from sklearn.svm import SVC
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, accuracy_score
 import os
+import sys
 import numpy as np
 import trading_strategies
 
 print("Starting SVM multiclass model training script...")
 
-INPUT_FILE = "merged_data.csv"
+INPUT_FILE = "merged_data"
 
 SCRIPT_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.join(SCRIPT_DIR, "..")
 INPUT = os.path.join(ROOT_DIR, INPUT_FILE)
 
+sys.path.append(ROOT_DIR)
+from common import storage
+
 data = None
 try:
-    data = pd.read_csv(INPUT, parse_dates=['date'])
+    data = storage.read_table(INPUT, csv_path=f"{INPUT}.csv", parse_dates=['date'])
     print(f"Successfully loaded {INPUT}")
 except FileNotFoundError:
     print(f"Error: '{INPUT}' not found. Please run download_price_history.py first.")
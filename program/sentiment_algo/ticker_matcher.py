@@ -0,0 +1,91 @@
+import os
+import re
+import pandas as pd
+
+# --- Shared ticker matcher used by the scrapers and the sentiment scripts ---
+
+SCRIPT_DIR = os.path.dirname(__file__)
+SCREENER_FILE = os.path.join(SCRIPT_DIR, '..', 'data', 'nasdaq_screener.csv')
+
+def load_symbols(screener_path=SCREENER_FILE):
+    """Returns the set of alphabetic symbols in the NASDAQ screener file."""
+    try:
+        df = pd.read_csv(screener_path)
+        ticker_column = 'Symbol'
+        if ticker_column in df.columns:
+            return {s for s in df[ticker_column].dropna().unique() if s.isalpha()}
+        else:
+            print(f"Error: Could not find '{ticker_column}' column in {screener_path}.")
+            return set()
+    except FileNotFoundError:
+        print(f"Error: '{screener_path}' not found.")
+        return set()
+
+def trie_pattern(words):
+    """
+    Builds a regex alternation shaped like a trie of the words, e.g. AA, AAPL, AMD -> A(?:A(?:PL)?|MD).
+    The regex engine walks it one character at a time instead of trying every word.
+    """
+    trie = dict()
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, dict())
+        node[''] = True
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word ends here, so the rest is optional (greedy: longer symbols are tried first)
+        if '' in node:
+            body = '(?:' + body + ')?'
+        return body
+
+    return emit(trie)
+
+class TickerMatcher:
+    """
+    Finds known ticker symbols in text with one precompiled regex.
+    A ticker is a whole word of 2-5 capital letters (AAPL), or with cashtags=True,
+    a 1-5 letter symbol after a dollar sign ($F). Symbols in banned are never returned.
+    With skip_caps_runs=True, words next to other all-caps words (BUY NOW, YOLO GME)
+    are ignored, since they are usually shouting rather than tickers.
+    """
+    def __init__(self, symbols, banned=(), cashtags=True, skip_caps_runs=False):
+        self.symbols = frozenset(s for s in symbols if s.isalpha() and s.isupper() and s not in banned)
+
+        # An empty trie would be an empty group, which matches at every capitalised word
+        branches = []
+        if cashtags:
+            cash = trie_pattern(s for s in self.symbols if len(s) <= 5)
+            if cash:
+                branches.append(f'\\$({cash})')
+        bare = trie_pattern(s for s in self.symbols if 2 <= len(s) <= 5)
+        if bare:
+            branches.append(f'(?=[A-Z]{{2}})({bare})')
+        if not branches:
+            # Never matches
+            branches.append('(?!)')
+
+        # The cheap checks come first so most positions are rejected immediately
+        pattern = r'(?<!\w)(?=[$A-Z])'
+        if skip_caps_runs:
+            pattern += r'(?<!\b[A-Z]{2}\s)(?<!\b[A-Z]{3}\s)(?<!\b[A-Z]{4}\s)(?<!\b[A-Z]{5}\s)'
+        pattern += '(?:' + '|'.join(branches) + r')\b'
+        if skip_caps_runs:
+            pattern += r'(?!\s[A-Z]{2,}\b)'
+
+        self.regex = re.compile(pattern)
+        self.groups = self.regex.groups
+
+    def find(self, text):
+        """Returns the tickers mentioned in text, without duplicates, in order of first mention."""
+        if not isinstance(text, str):
+            return []
+        if self.groups == 0:
+            return []
+        if self.groups == 1:
+            return list(dict.fromkeys(self.regex.findall(text)))
+        return list(dict.fromkeys(cash or bare for cash, bare in self.regex.findall(text)))